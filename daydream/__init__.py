@@ -13,6 +13,7 @@ from firebase_admin import auth as firebase_auth
 import google.generativeai as genai
 
 from .state_manager import StateManager
+from .term_matcher import TermMatcher
 
 # Define globals that will be initialized in create_app
 # Refactor: We will move service objects (db, model, etc.) into the app config
@@ -45,12 +46,19 @@ except ImportError as e:
 thetopia_lore = {}
 world_map = {}
 lore_vocabulary = {}
+lore_matcher = TermMatcher({})
 try:
     from .lore import thetopia_lore as imported_thetopia_lore
     thetopia_lore = imported_thetopia_lore
     world_map = thetopia_lore.get('locations', {})
-    with open('lore_vocabulary.json', 'r', encoding='utf-8') as f:
-        lore_vocabulary = json.load(f)
+    from .vocabulary import VOCABULARY_STORE
+    from .vocabulary.store import DEFAULT_SOURCES
+    if VOCABULARY_STORE:
+        lore_vocabulary = VOCABULARY_STORE.lore
+    else:
+        with open(DEFAULT_SOURCES['lore'], 'r', encoding='utf-8') as f:
+            lore_vocabulary = json.load(f)
+    lore_matcher = TermMatcher(lore_vocabulary)
 except (ImportError, FileNotFoundError, json.JSONDecodeError) as e:
     logging.warning(f"Could not load lore data: {e}")
 
@@ -80,7 +88,16 @@ def create_app(test_config=None):
         MAX_CONVO_LINES=100,
         STARTING_LOCATION="Thetopia - Town Square",
         BASE_FATE_POINTS=1,
-        APPLICATION_ROOT='/'
+        APPLICATION_ROOT='/',
+        STORAGE_BACKEND=os.environ.get('STORAGE_BACKEND', 'firestore'),
+        SQLITE_PATH=os.environ.get('SQLITE_PATH'),
+        AI_PROVIDER=os.environ.get('AI_PROVIDER', 'gemini'),
+        AI_MODEL_NAME=os.environ.get('AI_MODEL_NAME', 'gemini-1.5-flash-latest'),
+        # Bump when prompt templates change, so cached responses are not reused
+        AI_PROMPT_VERSION='1',
+        AI_CACHE_PATH=os.environ.get('AI_CACHE_PATH'),
+        # Directory shared by this host's workers to coalesce identical AI calls across them
+        AI_SINGLEFLIGHT_DIR=os.environ.get('AI_SINGLEFLIGHT_DIR')
     )
 
     if test_config is None:
@@ -110,6 +127,50 @@ def create_app(test_config=None):
     # instance or return the existing one.
     state_manager = StateManager()
 
+    # --- Per-worker caches ---
+    from .vocabulary.user_vocab import UserVocabularyCache, USER_VOCAB_CACHE_TTL
+    app.extensions['user_vocab_cache'] = UserVocabularyCache(
+        ttl=app.config.get('USER_VOCAB_CACHE_TTL', USER_VOCAB_CACHE_TTL))
+
+    from .persona.models import PersonaContentCache, PERSONA_CACHE_TTL
+    app.extensions['persona_cache'] = PersonaContentCache(
+        ttl=app.config.get('PERSONA_CACHE_TTL', PERSONA_CACHE_TTL))
+
+    from .ai.cache import AIResponseCache, AI_CACHE_MAX_ENTRIES
+    # The on-disk tier defaults to the instance folder; tests stay in memory unless AI_CACHE_PATH is set.
+    ai_cache_path = app.config.get('AI_CACHE_PATH') or (
+        None if app.testing else os.path.join(app.instance_path, 'ai_cache.sqlite3'))
+    # Identifies the provider, model and prompts in cache and coalescing keys, so
+    # responses from the local stand-in are never served as the model's
+    app.config['AI_MODEL_VERSION'] = (
+        f"{app.config['AI_PROVIDER']}:{app.config['AI_MODEL_NAME']}/{app.config['AI_PROMPT_VERSION']}")
+    app.extensions['ai_response_cache'] = AIResponseCache(
+        app.config['AI_MODEL_VERSION'],
+        ttls=app.config.get('AI_CACHE_TTLS'),
+        max_entries=app.config.get('AI_CACHE_MAX_ENTRIES', AI_CACHE_MAX_ENTRIES),
+        path=ai_cache_path)
+    from .ai.singleflight import SingleFlight, AI_SINGLEFLIGHT_TIMEOUT
+    app.extensions['ai_singleflight'] = SingleFlight(
+        app.config.get('AI_SINGLEFLIGHT_DIR'),
+        timeout=app.config.get('AI_SINGLEFLIGHT_TIMEOUT', AI_SINGLEFLIGHT_TIMEOUT))
+
+    # --- Storage ---
+    from .storage.character_cache import CharacterCache, CHARACTER_CACHE_TTL
+    app.extensions['character_cache'] = CharacterCache(
+        ttl=app.config.get('CHARACTER_CACHE_TTL', CHARACTER_CACHE_TTL))
+    from .storage.profile_cache import ProfileCache, PROFILE_CACHE_TTL
+    app.extensions['profile_cache'] = ProfileCache(
+        ttl=app.config.get('PROFILE_CACHE_TTL', PROFILE_CACHE_TTL))
+    from .utils import commit_unit_of_work, commit_unit_of_work_on_teardown
+    app.after_request(commit_unit_of_work)
+    app.teardown_request(commit_unit_of_work_on_teardown)
+    from .storage.fanout import create_read_pool, READ_POOL_WORKERS
+    app.extensions['read_pool'] = create_read_pool(app.config.get('READ_POOL_WORKERS', READ_POOL_WORKERS))
+    if app.config.get('STORAGE_BACKEND') == 'sqlite':
+        from .storage import SQLiteRepository
+        app.extensions['sqlite_repository'] = SQLiteRepository(
+            app.config.get('SQLITE_PATH') or os.path.join(app.instance_path, 'daydream.sqlite3'))
+
     @app.before_request
     def manage_app_state():
         """
@@ -190,13 +251,22 @@ def create_app(test_config=None):
 
             genai.configure(api_key=GEMINI_API_KEY)
             # Store the model in the app config
-            app.config['MODEL'] = genai.GenerativeModel("gemini-1.5-flash-latest")
-            logging.info("Google AI Model 'gemini-1.5-flash-latest' initialized.")
+            app.config['MODEL'] = genai.GenerativeModel(app.config['AI_MODEL_NAME'])
+            logging.info(f"Google AI Model '{app.config['AI_MODEL_NAME']}' initialized.")
         except Exception as e:
             logging.critical(f"FATAL ERROR: Could not initialize Google AI: {e}")
             # We don't exit here anymore, the diagnostics will show the error.
             # exit(1)
 
+    # --- AI Provider ---
+    # 'gemini' wraps the model above; 'local' is the offline stand-in (see ai/providers.py)
+    from .ai.providers import create_provider
+    app.extensions['ai_provider'] = create_provider(app.config)
+
+    # End-of-chapter grading runs off the request (see eoc/jobs.py)
+    from .eoc.jobs import EOCJobRunner, EOC_JOB_WORKERS
+    app.extensions['eoc_jobs'] = EOCJobRunner(app.config.get('EOC_JOB_WORKERS', EOC_JOB_WORKERS))
+
     # --- Register Blueprints ---
     from .auth import bp as auth_bp
     app.register_blueprint(auth_bp)
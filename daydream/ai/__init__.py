@@ -0,0 +1,6 @@
+# ai - Services around the model gateway (daydream.utils.get_ai_response)
+
+from .cache import AIResponseCache, AI_CACHE_TTLS
+from .singleflight import SingleFlight
+from .providers import (AIProvider, AIProviderError, GeminiProvider, LocalStandInProvider,
+                        create_provider, get_ai_provider)
@@ -0,0 +1,188 @@
+# cache.py - Persistent response cache for get_ai_response
+#
+# Some prompts give the same answer for the same input: brainstormed vocabulary
+# for a subject, the review of an identical character sheet, a re-rendered
+# final review. Their responses are cached under
+#     prompt type + hash of the canonicalized context + model/prompt version
+# for a per-prompt-type TTL. Prompt types without a TTL (chat, per-turn
+# analysis) are never cached.
+#
+# Entries live in an in-memory LRU tier per worker, backed by a SQLite file
+# shared by every worker and kept across restarts.
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+AI_CACHE_TTLS = {  # seconds; override per prompt type with the AI_CACHE_TTLS config
+    'BRAINSTORM_VOCABULARY': 7 * 24 * 3600,
+    'REVIEW_CHARACTER_SHEET': 24 * 3600,
+    'GENERATE_FINAL_REVIEW': 24 * 3600,
+}
+AI_CACHE_MAX_ENTRIES = 512
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_responses (
+    key TEXT PRIMARY KEY,
+    prompt_type TEXT NOT NULL,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ai_responses_expires_at ON ai_responses (expires_at);
+"""
+
+
+def canonical_context(context) -> str:
+    """Serializes a prompt context so that equal contexts give equal text (key order, set order)."""
+    return json.dumps(context, sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+                      default=lambda o: sorted(o, key=str) if isinstance(o, (set, frozenset)) else str(o))
+
+
+def cache_key(prompt_type: str, context, model_version: str) -> str:
+    digest = hashlib.sha256(canonical_context(context).encode('utf-8')).hexdigest()
+    return f"{prompt_type}:{model_version}:{digest}"
+
+
+class DiskResponseStore:
+    """
+    The on-disk tier: a SQLite file of serialized responses with expiry times.
+
+    Connections are per thread, as in storage/sqlite_backend.py.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        conn.execute("DELETE FROM ai_responses WHERE expires_at <= ?", (time.time(),))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> tuple[str, float] | None:
+        """Returns (serialized response, expires_at) if present and not expired."""
+        row = self._connection().execute(
+            "SELECT response, expires_at FROM ai_responses WHERE key = ? AND expires_at > ?",
+            (key, time.time())).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, key: str, prompt_type: str, response: str, expires_at: float):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO ai_responses (key, prompt_type, response, expires_at) VALUES (?, ?, ?, ?)",
+            (key, prompt_type, response, expires_at))
+
+    def delete(self, prompt_type: str | None = None):
+        if prompt_type is None:
+            self._connection().execute("DELETE FROM ai_responses")
+        else:
+            self._connection().execute("DELETE FROM ai_responses WHERE prompt_type = ?", (prompt_type,))
+
+
+class AIResponseCache:
+    """
+    Two-tier cache of model responses (see module comment).
+
+    Args:
+        model_version: Identifies the model and prompt templates; changing it
+            makes every existing entry unreachable.
+        ttls: Per-prompt-type TTLs in seconds, merged over AI_CACHE_TTLS.
+        max_entries: Size of the in-memory LRU tier.
+        path: SQLite file for the on-disk tier, or None for memory only.
+    """
+
+    def __init__(self, model_version: str, ttls: dict | None = None,
+                 max_entries: int = AI_CACHE_MAX_ENTRIES, path: str | None = None):
+        self.model_version = model_version
+        self.ttls = {**AI_CACHE_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (prompt_type, serialized response, expires_at)
+        self._lock = threading.Lock()
+        self.disk = None
+        if path:
+            try:
+                self.disk = DiskResponseStore(path)
+            except sqlite3.Error as e:
+                logging.error(f"AI response cache at {path} unavailable, using memory only: {e}", exc_info=True)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def ttl_for(self, prompt_type: str) -> float:
+        return self.ttls.get(prompt_type) or 0
+
+    def _remember(self, key: str, prompt_type: str, serialized: str, expires_at: float):
+        with self._lock:
+            self._entries[key] = (prompt_type, serialized, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, prompt_type: str, context) -> str | dict | None:
+        """Returns a fresh copy of the cached response, or None (also for uncached prompt types)."""
+        if self.ttl_for(prompt_type) <= 0:
+            return None
+        key = cache_key(prompt_type, context, self.model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[1])
+            if entry is not None:
+                del self._entries[key]
+
+        if self.disk is not None:
+            try:
+                stored = self.disk.get(key)
+            except sqlite3.Error as e:
+                logging.error(f"AI response cache read failed: {e}", exc_info=True)
+                stored = None
+            if stored is not None:
+                self._remember(key, prompt_type, *stored)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return json.loads(stored[0])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, prompt_type: str, context, response: str | dict):
+        """Caches a successful response for its prompt type's TTL (no-op for uncached types)."""
+        ttl = self.ttl_for(prompt_type)
+        if ttl <= 0 or response is None:
+            return
+        key = cache_key(prompt_type, context, self.model_version)
+        serialized = json.dumps(response)
+        expires_at = time.time() + ttl
+        self._remember(key, prompt_type, serialized, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, prompt_type, serialized, expires_at)
+            except sqlite3.Error as e:
+                logging.error(f"AI response cache write failed: {e}", exc_info=True)
+
+    def invalidate(self, prompt_type: str | None = None):
+        """Drops every cached response (or those of one prompt type) from both tiers."""
+        with self._lock:
+            if prompt_type is None:
+                self._entries.clear()
+            else:
+                for key in [k for k, entry in self._entries.items() if entry[0] == prompt_type]:
+                    del self._entries[key]
+        if self.disk is not None:
+            self.disk.delete(prompt_type)
@@ -0,0 +1,250 @@
+# providers.py - Model backends behind get_ai_response
+#
+# The provider is chosen by the AI_PROVIDER config value:
+#   'gemini' (default) - the Gemini model in app.config['MODEL']
+#   'local'            - LocalStandInProvider: no network, schema-correct JSON
+#                        for every prompt type, with simulated latency, errors
+#                        and token rate, for offline load tests and benchmarks
+#
+# Every provider returns the parsed JSON response as a dict, or
+# {'error': True, 'reason': ...} on failure, which is what the callers of
+# get_ai_response expect.
+
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from flask import current_app
+
+# prompt type -> (instruction, {response field: description})
+PROMPTS = {
+    'GENERAL_CHAT': (
+        "You are the storyteller of Thetopia. Reply in character to the player's message.",
+        {'response_text': "your reply"}),
+    'REVIEW_CHARACTER_SHEET': (
+        "Review this player-made character concept for a story-driven learning game.",
+        {'recommendations': "a list of 2-4 short suggestions"}),
+    'BRAINSTORM_VOCABULARY': (
+        "Suggest academic vocabulary a learner would meet when studying the subject.",
+        {'vocabulary': "a list of 8-12 objects with 'word' and 'definition'"}),
+    'EVALUATE_CHAPTER_COMPREHENSION': (
+        "Evaluate the player's answers to the chapter comprehension questions.",
+        {'overall_comprehension_score': "a number from 0 to 10", 'feedback': "one short paragraph"}),
+    'ANALYZE_PLAYER_WRITING': (
+        "Analyze the player's writing from this chapter.",
+        {'awl_words_used': "a list of Academic Word List words the player used",
+         'relevance_coherence_score': "an integer from 0 to 5",
+         'style_rating': "'L', 'M' or 'H'", 'thinking_rating': "'L', 'M' or 'H'",
+         'descriptive_language_rating': "'L', 'M' or 'H'", 'avg_length_category': "'S', 'M' or 'L'"}),
+    'GENERATE_FINAL_REVIEW': (
+        "Write a final review of the character's whole hero's journey from the chapter summaries.",
+        {'final_narrative': "a few paragraphs of narrative review"}),
+    'GENERATE_NEXT_QUEST': (
+        "Create the character's next quest for the given stage of the hero's journey.",
+        {'quest_id': "a short unique id", 'title': "the quest title",
+         'starting_step_id': "the first step's id", 'starting_step_description': "the first step"}),
+}
+
+# Prompt types that can be streamed, and the response field streamed as plain text
+STREAM_FIELDS = {
+    'GENERAL_CHAT': 'response_text',
+    'GENERATE_FINAL_REVIEW': 'final_narrative',
+}
+
+
+class AIProviderError(Exception):
+    """Raised by a provider's stream() when generation fails part-way."""
+
+
+def build_prompt(prompt_type: str, context: dict, plain_text: bool = False) -> str:
+    """The prompt for a prompt type: instruction, context, and the expected JSON fields (or plain text)."""
+    instruction, fields = PROMPTS[prompt_type]
+    parts = [instruction, "Context:", json.dumps(context, sort_keys=True, default=str)]
+    if plain_text:
+        parts.append(f"Respond with {fields[STREAM_FIELDS[prompt_type]]} as plain text only.")
+    else:
+        parts.append("Respond with a single JSON object with these fields:")
+        parts.extend(f"- {name}: {description}" for name, description in fields.items())
+    return "\n".join(parts)
+
+
+class AIProvider(ABC):
+    """Interface of a model backend."""
+
+    name = 'base'
+
+    @abstractmethod
+    def generate(self, prompt_type: str, context: dict) -> dict:
+        """Returns the response object for a prompt type, or {'error': True, 'reason': ...}."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream(self, prompt_type: str, context: dict):
+        """
+        Yields the STREAM_FIELDS text of the response in chunks as it is generated.
+        Raises AIProviderError if generation fails.
+        """
+        raise NotImplementedError
+
+
+class GeminiProvider(AIProvider):
+    """Google Gemini, using the model initialized by create_app."""
+
+    name = 'gemini'
+
+    def __init__(self, model):
+        self.model = model
+
+    def generate(self, prompt_type: str, context: dict) -> dict:
+        if self.model is None:
+            return {'error': True, 'reason': 'AI model not initialized.'}
+        if prompt_type not in PROMPTS:
+            return {'error': True, 'reason': f'Unknown prompt type {prompt_type}.'}
+        try:
+            response = self.model.generate_content(
+                build_prompt(prompt_type, context),
+                generation_config={'response_mime_type': 'application/json'})
+            return json.loads(response.text)
+        except json.JSONDecodeError as e:
+            logging.error(f"Malformed {prompt_type} response from Gemini: {e}", exc_info=True)
+            return {'error': True, 'reason': 'Malformed AI response.'}
+        except Exception as e:
+            logging.error(f"Gemini request for {prompt_type} failed: {e}", exc_info=True)
+            return {'error': True, 'reason': 'AI service unavailable.'}
+
+    def stream(self, prompt_type: str, context: dict):
+        if self.model is None:
+            raise AIProviderError('AI model not initialized.')
+        try:
+            for chunk in self.model.generate_content(build_prompt(prompt_type, context, plain_text=True), stream=True):
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            raise AIProviderError('AI service unavailable.') from e
+
+
+# --- Local stand-in ---
+
+_WORDS = ("analyze concept context derive establish evident framework interpret "
+          "method principle require significant structure theory vary").split()
+_STORY = ("The lanterns of Thetopia flicker as you speak, and the old map-keeper leans closer, "
+          "tracing a path across the square toward the river gate where the next part of your story waits.").split()
+
+
+def _standin_response(prompt_type: str, context: dict, rng: random.Random) -> dict:
+    """A plausible, schema-correct response, the same for the same context."""
+    if prompt_type == 'GENERAL_CHAT':
+        return {'response_text': " ".join(_STORY[:rng.randint(12, len(_STORY))]) + "."}
+    if prompt_type == 'REVIEW_CHARACTER_SHEET':
+        return {'recommendations': [f"Consider how the backstory shapes the character's {word}." for word in rng.sample(_WORDS, 3)]}
+    if prompt_type == 'BRAINSTORM_VOCABULARY':
+        subject = context.get('subject', 'the subject')
+        return {'vocabulary': [{'word': word, 'definition': f"A term used when discussing {subject}."}
+                               for word in rng.sample(_WORDS, 10)]}
+    if prompt_type == 'EVALUATE_CHAPTER_COMPREHENSION':
+        return {'overall_comprehension_score': round(rng.uniform(4, 10), 1),
+                'feedback': "Your answers show a clear understanding of the chapter's events."}
+    if prompt_type == 'ANALYZE_PLAYER_WRITING':
+        return {'awl_words_used': rng.sample(_WORDS, rng.randint(0, 4)),
+                'relevance_coherence_score': rng.randint(2, 5),
+                'style_rating': rng.choice('LMH'), 'thinking_rating': rng.choice('LMH'),
+                'descriptive_language_rating': rng.choice('LMH'), 'avg_length_category': rng.choice('SML')}
+    if prompt_type == 'GENERATE_FINAL_REVIEW':
+        return {'final_narrative': " ".join(_STORY * 3)}
+    if prompt_type == 'GENERATE_NEXT_QUEST':
+        quest_id = f"Q_{rng.getrandbits(32):08x}"
+        return {'quest_id': quest_id, 'title': f"The {rng.choice(_WORDS).title()} at the River Gate",
+                'starting_step_id': "STEP_01", 'starting_step_description': "Meet the map-keeper at the river gate."}
+    return {'error': True, 'reason': f'Unknown prompt type {prompt_type}.'}
+
+
+class LocalStandInProvider(AIProvider):
+    """
+    An offline stand-in for the model with a realistic cost profile.
+
+    Each call waits a time-to-first-token drawn from a log-normal distribution
+    (given by its median and 95th percentile), then one token interval per
+    output token at `tokens_per_second`; `error_rate` of calls fail.
+
+    Args:
+        latency_median: Median time to first token, in seconds.
+        latency_p95: 95th percentile time to first token, in seconds.
+        error_rate: Fraction of calls (0-1) that fail.
+        tokens_per_second: Output rate; 0 for instant output.
+        seed: Seeds the latency/error draws, for repeatable runs.
+        sleep: Replaces time.sleep (tests).
+    """
+
+    name = 'local'
+
+    def __init__(self, latency_median: float = 0.8, latency_p95: float = 2.5, error_rate: float = 0.0,
+                 tokens_per_second: float = 40.0, seed=None, sleep=time.sleep):
+        self.latency_median = latency_median
+        self.latency_sigma = math.log(latency_p95 / latency_median) / 1.645 if 0 < latency_median < latency_p95 else 0.0
+        self.error_rate = error_rate
+        self.tokens_per_second = tokens_per_second
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._sleep = sleep
+
+    def _draw(self) -> tuple[float, bool]:
+        """(time to first token, whether this call fails)"""
+        with self._rng_lock:
+            latency = self.latency_median * math.exp(self._rng.gauss(0, self.latency_sigma)) if self.latency_median > 0 else 0.0
+            return latency, self._rng.random() < self.error_rate
+
+    def _response(self, prompt_type: str, context: dict) -> dict:
+        seed = hashlib.sha256(f"{prompt_type}:{json.dumps(context, sort_keys=True, default=str)}".encode('utf-8')).digest()
+        return _standin_response(prompt_type, context, random.Random(seed))
+
+    def _token_interval(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def generate(self, prompt_type: str, context: dict) -> dict:
+        latency, fails = self._draw()
+        self._sleep(latency)
+        if fails:
+            return {'error': True, 'reason': 'Simulated AI service error.'}
+        response = self._response(prompt_type, context)
+        self._sleep(len(json.dumps(response).split()) * self._token_interval())
+        return response
+
+    def stream(self, prompt_type: str, context: dict):
+        if prompt_type not in STREAM_FIELDS:
+            raise AIProviderError(f'{prompt_type} cannot be streamed.')
+        latency, fails = self._draw()
+        self._sleep(latency)
+        words = self._response(prompt_type, context)[STREAM_FIELDS[prompt_type]].split(' ')
+        # A failing call breaks off part-way, as a dropped connection would
+        fail_at = len(words) // 2 if fails else None
+        for i, word in enumerate(words):
+            if i == fail_at:
+                raise AIProviderError('Simulated AI service error.')
+            if i:
+                self._sleep(self._token_interval())
+            yield word if i == 0 else ' ' + word
+
+
+def create_provider(config) -> AIProvider:
+    """Builds the provider selected by AI_PROVIDER from an app config."""
+    name = config.get('AI_PROVIDER', 'gemini')
+    if name == 'local':
+        return LocalStandInProvider(
+            latency_median=config.get('AI_STANDIN_LATENCY_MEDIAN', 0.8),
+            latency_p95=config.get('AI_STANDIN_LATENCY_P95', 2.5),
+            error_rate=config.get('AI_STANDIN_ERROR_RATE', 0.0),
+            tokens_per_second=config.get('AI_STANDIN_TOKENS_PER_SECOND', 40.0),
+            seed=config.get('AI_STANDIN_SEED'))
+    if name != 'gemini':
+        raise ValueError(f"Unknown AI_PROVIDER '{name}'.")
+    return GeminiProvider(config.get('MODEL'))
+
+
+def get_ai_provider() -> AIProvider:
+    """Returns the current app's provider."""
+    return current_app.extensions['ai_provider']
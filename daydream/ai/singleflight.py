@@ -0,0 +1,175 @@
+# singleflight.py - Coalesces concurrent identical model calls
+#
+# When a class runs the same exercise, many requests ask get_ai_response the
+# same thing at the same moment. The first caller for a key (the canonical
+# prompt hash, see ai/cache.py) makes the call; concurrent callers with the
+# same key wait for it and receive a copy of its result.
+#
+# Within a worker this uses threading primitives. With a shared directory
+# (AI_SINGLEFLIGHT_DIR) it also works across the workers of one host: the call
+# is made while holding an exclusive lock on <dir>/<key hash>.lock, and its
+# result is left in <dir>/<key hash>.json for the workers waiting on the lock.
+# Cross-worker coalescing needs fcntl (POSIX); elsewhere only threads coalesce.
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+AI_SINGLEFLIGHT_TIMEOUT = 60  # seconds a duplicate waits before calling the model itself
+SHARED_POLL_INTERVAL = 0.05  # seconds
+SHARED_FILE_MAX_AGE = 3600  # seconds before leftover lock/result files are removed
+_PURGE_EVERY = 100  # shared writes
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; duplicates share its result.
+
+    Args:
+        shared_dir: Directory shared by the host's workers for cross-worker
+            coalescing, or None for threads only.
+        timeout: How long a duplicate waits for the call in flight before
+            making its own.
+
+    Counters: `misses` calls made, `hits` duplicates served another call's
+    result (`shared_hits` of them from another worker).
+    """
+
+    def __init__(self, shared_dir: str | None = None, timeout: float = AI_SINGLEFLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self.shared_dir = shared_dir if fcntl is not None else None
+        if shared_dir and fcntl is None:
+            logging.warning("Cross-worker AI call coalescing needs fcntl; coalescing within this worker only.")
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def do(self, key: str, fn):
+        """Returns fn(), or a copy of the result of the identical call already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(self.timeout):
+                logging.warning(f"Coalesced AI call {key} still running after {self.timeout}s; calling directly.")
+                return self._call(fn)
+            if call.error is not None:
+                raise call.error
+            with self._lock:
+                self.hits += 1
+            return copy.deepcopy(call.result)
+
+        try:
+            result = self._shared(key, fn) if self.shared_dir else self._call(fn)
+            call.result = copy.deepcopy(result)  # the leader's caller may modify its own copy
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _call(self, fn):
+        with self._lock:
+            self.misses += 1
+        return fn()
+
+    # --- Across workers ---
+
+    def _shared(self, key: str, fn):
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        lock_path = os.path.join(self.shared_dir, f"{name}.lock")
+        result_path = os.path.join(self.shared_dir, f"{name}.json")
+        started = time.time()
+        with open(lock_path, 'a') as lock_file:
+            waited = False
+            while not self._try_lock(lock_file):
+                waited = True
+                if time.time() - started > self.timeout:
+                    logging.warning(f"AI call {key} locked by another worker for {self.timeout}s; calling directly.")
+                    return self._call(fn)
+                time.sleep(SHARED_POLL_INTERVAL)
+            try:
+                os.utime(lock_path)  # in use: keep it from being purged
+                if waited:
+                    shared = self._read(result_path, since=started)
+                    if shared is not None:
+                        with self._lock:
+                            self.hits += 1
+                            self.shared_hits += 1
+                        return shared['result']
+                result = self._call(fn)
+                self._write(result_path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _try_lock(lock_file) -> bool:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    @staticmethod
+    def _read(path: str, since: float) -> dict | None:
+        """The result written at or after `since` (by the call this worker waited for), or None."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                shared = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return shared if shared.get('written_at', 0) >= since else None
+
+    def _write(self, path: str, result):
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.shared_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'written_at': time.time(), 'result': result}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.error(f"Could not share AI call result at {path}: {e}", exc_info=True)
+            return
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            self._purge()
+
+    def _purge(self):
+        """Removes lock/result files nobody has used for SHARED_FILE_MAX_AGE."""
+        cutoff = time.time() - SHARED_FILE_MAX_AGE
+        for entry in os.scandir(self.shared_dir):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
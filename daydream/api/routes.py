@@ -1,7 +1,12 @@
-from flask import jsonify, request, session
+import json
+import logging
+from flask import jsonify, request, session, Response
 from . import bp
 from ..utils import get_ai_response, login_required
-from ..ethics.gateway import analyze_content
+from ..ethics.gateway import analyze_content, get_moderation_engine
+from ..ai.providers import get_ai_provider, AIProviderError
+
+BLOCKED_REPLY = "The generated response was blocked for safety reasons."
 
 @bp.route('/hello')
 def hello():
@@ -40,11 +45,73 @@ def chat():
         # Analyze AI output with the Ethical Gateway
         ai_safety_check = analyze_content(ai_message)
         if not ai_safety_check.get('safe'):
-            return jsonify({'reply': "The generated response was blocked for safety reasons."}), 200
+            return jsonify({'reply': BLOCKED_REPLY}), 200
 
         # 4. Send successful response back to the UI
         return jsonify({'reply': ai_message})
     else:
         # Handle errors from the AI service
         error_reason = ai_response_data.get('reason', 'Unknown AI error') if isinstance(ai_response_data, dict) else 'AI communication failure'
-        return jsonify({'reply': f"Sorry, I encountered an error: {error_reason}"}), 200
\ No newline at end of file
+        return jsonify({'reply': f"Sorry, I encountered an error: {error_reason}"}), 200
+
+def _sse(event: str, data: dict) -> str:
+    """Formats one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _moderated_reply_events(provider, moderation, context: dict):
+    """
+    Streams a GENERAL_CHAT reply as 'token' events, releasing text only once
+    the moderation stream has cleared it, and ends with exactly one 'done',
+    'blocked' or 'error' event.
+    """
+    reply = []
+    try:
+        for chunk in provider.stream("GENERAL_CHAT", context):
+            verdict = moderation.feed(chunk)
+            if not verdict['safe']:
+                yield _sse('blocked', {'reply': BLOCKED_REPLY})
+                return
+            if verdict['text']:
+                reply.append(verdict['text'])
+                yield _sse('token', {'text': verdict['text']})
+    except AIProviderError as e:
+        logging.error(f"Chat stream failed: {e}", exc_info=True)
+        yield _sse('error', {'reply': "Sorry, I encountered an error: AI communication failure"})
+        return
+    verdict = moderation.close()
+    if not verdict['safe']:
+        yield _sse('blocked', {'reply': BLOCKED_REPLY})
+        return
+    if verdict['text']:
+        reply.append(verdict['text'])
+        yield _sse('token', {'text': verdict['text']})
+    yield _sse('done', {'reply': ''.join(reply)})
+
+@bp.route('/chat/stream', methods=['POST'])
+@login_required
+def chat_stream():
+    """
+    Streaming variant of chat: the reply is sent as server-sent events while
+    it is generated, so the user sees the first words instead of waiting for
+    the whole reply.
+
+    Events (data is JSON):
+        token   {'text': ...}   the next piece of moderated reply text
+        done    {'reply': ...}  the complete reply; the stream ends
+        blocked {'reply': ...}  the input or reply tripped moderation; the stream ends
+        error   {'reply': ...}  generation failed; the stream ends
+    """
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({'error': 'Invalid request format. "message" field is required.'}), 400
+
+    safety_check = analyze_content(data['message'])
+    if not safety_check.get('safe'):
+        reason = safety_check.get('reason', 'Content policy violation.')
+        events = [_sse('blocked', {'reply': f"I cannot process this request. Reason: {reason}"})]
+    else:
+        # The generator runs after the request context is gone: bind what it needs now.
+        events = _moderated_reply_events(get_ai_provider(), get_moderation_engine().stream(),
+                                         {'user_input': data['message']})
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
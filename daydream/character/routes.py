@@ -6,11 +6,12 @@ import os
 import json
 import logging
 from ..utils import (
-    login_required, instructor_required, get_ai_response, save_character_data,
+    login_required, instructor_required, get_ai_response, save_character_data, remove_character_summary,
     SESSION_USER_ID, SESSION_NEW_CHAR_DETAILS, SESSION_AI_RECOMMENDATIONS,
     STARTING_LOCATION, BASE_FATE_POINTS, FS_CONVERSATION, FS_CHAPTER_INPUTS,
     FS_QUEST_FLAGS, FS_INVENTORY, SESSION_EOC_PROMPTED
 )
+from ..storage import get_repository
 
 def load_character_template_data(filename):
     """Loads character template data from a JSON file."""
@@ -203,27 +204,29 @@ def upload_template(template_type):
 @login_required
 def delete_character(char_id):
     user_id = session[SESSION_USER_ID]
-    db = current_app.config.get('DB')
+    repository = get_repository()
 
     if not char_id:
         flash("Invalid request: Missing character ID.", "error")
         return redirect(url_for('profile.profile'))
 
-    if current_app.config.get('BYPASS_EXTERNAL_SERVICES') or not db:
+    if repository is None:
         flash("Character deletion is disabled in Bypass Mode.", "warning")
         return redirect(url_for('profile.profile'))
 
     try:
-        char_ref = db.collection('characters').document(char_id)
-        char_doc = char_ref.get(['user_id', 'name'])
-        if not char_doc.exists:
+        char_data, _ = repository.get_character(char_id)
+        if char_data is None:
             flash("Character not found.", "warning")
             return redirect(url_for('profile.profile'))
-        if char_doc.to_dict().get('user_id') != user_id:
+        if char_data.get('user_id') != user_id:
             flash("Permission denied to delete this character.", "error")
             return redirect(url_for('profile.profile'))
-        char_name = char_doc.to_dict().get('name', 'Unknown Character')
-        char_ref.delete()
+        char_name = char_data.get('name', 'Unknown Character')
+        repository.delete_character(char_id)
+        repository.delete_conversation(char_id)
+        remove_character_summary(user_id, char_id)
+        current_app.extensions['character_cache'].invalidate(char_id)
         flash(f"Character '{char_name}' deleted successfully.", "success")
         if session.get('character_id') == char_id:
             session.clear()
@@ -1,5 +1,5 @@
 from flask import Blueprint, render_template, g, redirect, url_for
-from .vocabulary.core import load_vocabulary_from_file
+from .vocabulary.core import get_vocabulary_snapshot
 
 bp = Blueprint('creator_cockpit', __name__, url_prefix='/cockpit')
 
@@ -14,8 +14,7 @@ def cockpit():
 
     # Load vocabulary for the contextual tagger
     try:
-        vocab_data = load_vocabulary_from_file()
-        vocab_words = list(vocab_data.keys())
+        vocab_words = list(get_vocabulary_snapshot().words.keys())
     except Exception:
         vocab_words = []
 
@@ -0,0 +1,188 @@
+# jobs.py - End-of-chapter analysis as a background job
+#
+# Grading a chapter takes two model calls (comprehension evaluation and
+# writing analysis) that do not depend on each other. Run inside the request
+# they could outlast the worker timeout, so the EOC route records a job in the
+# repository and returns at once; a per-worker EOCJobRunner makes both calls
+# concurrently, commits the chapter report, XP and level atomically, and marks
+# the job done. The report page polls the job (see eoc/routes.py).
+#
+# The character names the one job allowed to commit its chapter report
+# (FS_EOC_JOB). The job's commit clears that field and is guarded by the
+# character's version, so a report is committed at most once. A job that is
+# still pending after EOC_JOB_TIMEOUT is reported as failed, and the report
+# page cancels it by clearing the field, so a late job cannot award the XP a
+# second time. Each report records its job id, so a report whose job could not
+# be marked done is still found and shown.
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..storage import UnitOfWork, ConflictError, OwnershipError, get_repository
+from ..utils import get_ai_response, commit_unit_of_work_now, FS_CHAPTER_INPUTS, FS_EOC_JOB
+
+EOC_JOB_WORKERS = 4
+EOC_JOB_TIMEOUT = 300  # seconds
+EOC_JOB_KIND = 'eoc_analysis'
+
+JOB_PENDING = 'pending'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class JobCancelledError(Exception):
+    """Raised when a job may no longer commit its report (it was cancelled or superseded)."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"End-of-chapter job {job_id} was cancelled.")
+        self.job_id = job_id
+
+
+def build_chapter_report(comp_res, anal_res) -> dict:
+    """
+    Scores a chapter from the two AI responses (either may be an error).
+
+    Returns {'comprehension_score', 'xp_gained', 'summary', 'analysis'}.
+    """
+    comp_score = 0.0
+    if isinstance(comp_res, dict) and 'overall_comprehension_score' in comp_res:
+        try:
+            comp_score = float(comp_res['overall_comprehension_score'])
+            comp_score = max(0.0, min(10.0, comp_score))
+        except (ValueError, TypeError):
+            logging.warning(f"Invalid comprehension score format from AI: {comp_res['overall_comprehension_score']}")
+    if not isinstance(anal_res, dict) or 'error' in anal_res:
+        anal_res = {}
+    xp_gained = (5 + {'S':1, 'M':3, 'L':5}.get(anal_res.get('avg_length_category'), 0) + len(anal_res.get('awl_words_used', [])) * 2 + int(anal_res.get('relevance_coherence_score', 0)) + {'L':1, 'M':3, 'H':5}.get(anal_res.get('style_rating'), 0) + {'L':1, 'M':3, 'H':5}.get(anal_res.get('thinking_rating'), 0) + {'L':1, 'M':3, 'H':5}.get(anal_res.get('descriptive_language_rating'), 0) + max(0, int(comp_score) - 5))
+    xp_gained = max(0, xp_gained)
+    summary_text = f"**Chapter Complete!**\n\n* **Comprehension Score:** {comp_score:.1f} / 10\n* **Player XP Gained:** +{xp_gained}\n\n* **Writing Analysis:**\n"
+    summary_text += f"    * AWL Words Used ({len(anal_res.get('awl_words_used', []))}): {', '.join(anal_res.get('awl_words_used', [])) if anal_res.get('awl_words_used') else 'None'}\n"
+    summary_text += f"    * Relevance & Coherence: {anal_res.get('relevance_coherence_score','?')} / 5\n"
+    summary_text += f"    * Style Complexity: {anal_res.get('style_rating','?')}\n"
+    summary_text += f"    * Critical Thinking: {anal_res.get('thinking_rating','?')}\n"
+    summary_text += f"    * Average Length: {anal_res.get('avg_length_category','?')}\n"
+    summary_text += f"    * Descriptive Language: {anal_res.get('descriptive_language_rating','?')}\n"
+    return {'comprehension_score': comp_score, 'xp_gained': xp_gained, 'summary': summary_text,
+            'analysis': anal_res, 'comprehension_ok': isinstance(comp_res, dict) and 'overall_comprehension_score' in comp_res}
+
+
+def persist_chapter_report(user_id: str, char_id: str, report: dict, job_id: str) -> int | None:
+    """
+    Appends the report to the character's summaries, clears its chapter inputs
+    and awards the XP (and any level-up) in one unit of work, re-reading once
+    if the character changed concurrently. Returns the new player level, if any.
+
+    Raises JobCancelledError, without writing, unless the character still names
+    `job_id` as its pending job.
+    """
+    repository = get_repository()
+    for attempt in range(2):
+        char_data, update_time = repository.get_character(char_id)
+        if char_data is None or char_data.get('user_id') != user_id:
+            raise OwnershipError(char_id, user_id)
+        if char_data.get(FS_EOC_JOB) != job_id:
+            raise JobCancelledError(job_id)
+        summaries = char_data.get('report_summaries', [])
+        summaries.append({"chapter": len(summaries) + 1, "summary": report['summary'],
+                          "comprehension_score": report['comprehension_score'],
+                          "player_xp_gained": report['xp_gained'], "analysis_raw": report['analysis'],
+                          "job_id": job_id})
+        unit = UnitOfWork()
+        unit.save_character(char_id, {'report_summaries': summaries, FS_CHAPTER_INPUTS: [], FS_EOC_JOB: None},
+                            user_id, update_time)
+        unit.increment_profile_field(user_id, 'total_player_xp', report['xp_gained'])
+        new_level = None
+        profile_data = repository.get_profile(user_id, ['total_player_xp', 'player_level'])
+        if profile_data is not None:
+            if profile_data.get('total_player_xp', 0) + report['xp_gained'] >= (profile_data.get('player_level', 1) * 100):
+                new_level = profile_data.get('player_level', 1) + 1
+                unit.update_profile(user_id, {'player_level': new_level})
+        try:
+            commit_unit_of_work_now(unit)
+            return new_level
+        except ConflictError:
+            if attempt:
+                raise
+
+
+def find_committed_report(char_data: dict, job_id: str) -> dict | None:
+    """Returns the report committed by `job_id` (in the form the job records), or None."""
+    for summary in reversed(char_data.get('report_summaries', [])):
+        if job_id and summary.get('job_id') == job_id:
+            return {'summary': summary['summary'], 'xp_gained': summary['player_xp_gained']}
+    return None
+
+
+def job_status(job: dict | None, now: float | None = None) -> str:
+    """A job's status, treating pending jobs older than EOC_JOB_TIMEOUT as failed."""
+    if job is None:
+        return JOB_FAILED
+    if job.get('status') == JOB_PENDING and (now or time.time()) - job.get('submitted_at', 0) > EOC_JOB_TIMEOUT:
+        return JOB_FAILED
+    return job.get('status', JOB_FAILED)
+
+
+class EOCJobRunner:
+    """
+    Per-worker executor for end-of-chapter jobs.
+
+    Jobs run on one pool and their model calls on another, so a job waiting
+    for its calls never holds up the threads those calls need.
+    """
+
+    def __init__(self, max_workers: int = EOC_JOB_WORKERS):
+        self._jobs = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='daydream-eoc')
+        self._calls = ThreadPoolExecutor(max_workers=max_workers * 2, thread_name_prefix='daydream-eoc-ai')
+
+    def _call(self, app, prompt_type: str, context: dict):
+        with app.app_context():
+            return get_ai_response(prompt_type, context)
+
+    def evaluate(self, app, eval_ctx: dict, anal_ctx: dict) -> tuple:
+        """Runs the comprehension evaluation and writing analysis concurrently. Returns both responses."""
+        comp = self._calls.submit(self._call, app, "EVALUATE_CHAPTER_COMPREHENSION", eval_ctx)
+        anal = self._calls.submit(self._call, app, "ANALYZE_PLAYER_WRITING", anal_ctx)
+        return comp.result(), anal.result()
+
+    def submit(self, app, user_id: str, char_id: str, eval_ctx: dict, anal_ctx: dict) -> str:
+        """
+        Records a pending job, names it as the character's pending job (replacing
+        any earlier one) and starts it. Returns the job id.
+        """
+        job_id = get_repository().create_job({'kind': EOC_JOB_KIND, 'user_id': user_id, 'char_id': char_id,
+                                              'status': JOB_PENDING, 'submitted_at': time.time()})
+        unit = UnitOfWork()
+        unit.save_character(char_id, {FS_EOC_JOB: job_id}, user_id)
+        commit_unit_of_work_now(unit)
+        self._jobs.submit(self._run, app, job_id, user_id, char_id, eval_ctx, anal_ctx)
+        return job_id
+
+    def _run(self, app, job_id: str, user_id: str, char_id: str, eval_ctx: dict, anal_ctx: dict):
+        with app.app_context():
+            repository = get_repository()
+            try:
+                report = build_chapter_report(*self.evaluate(app, eval_ctx, anal_ctx))
+                new_level = persist_chapter_report(user_id, char_id, report, job_id)
+            except Exception as e:
+                if isinstance(e, JobCancelledError):
+                    logging.warning(f"{e} Its report for character {char_id} was discarded.")
+                else:
+                    logging.error(f"End-of-chapter job {job_id} for character {char_id} failed: {e}", exc_info=True)
+                try:
+                    repository.update_job(job_id, {'status': JOB_FAILED, 'finished_at': time.time()})
+                except Exception as e:
+                    logging.error(f"Could not record failure of job {job_id}: {e}", exc_info=True)
+                return
+            try:
+                repository.update_job(job_id, {
+                    'status': JOB_DONE, 'finished_at': time.time(), 'summary': report['summary'],
+                    'xp_gained': report['xp_gained'], 'new_level': new_level,
+                    'comprehension_ok': report['comprehension_ok']})
+            except Exception as e:
+                # The report is committed; the report page finds it on the character.
+                logging.error(f"Could not record completion of job {job_id}: {e}", exc_info=True)
+
+    def shutdown(self, wait: bool = True):
+        self._jobs.shutdown(wait=wait)
+        self._calls.shutdown(wait=wait)
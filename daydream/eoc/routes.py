@@ -1,13 +1,14 @@
 import logging
-from flask import render_template, request, redirect, url_for, session, flash
+from flask import render_template, request, redirect, url_for, session, flash, jsonify, current_app
 from . import bp
 from ..utils import (
     login_required, load_character_data, save_character_data, get_ai_response,
     SESSION_USER_ID, SESSION_CHARACTER_ID, SESSION_EOC_STATE,
-    FS_CHAPTER_INPUTS, HERO_JOURNEY_STAGES, SESSION_EOC_QUESTIONS,
-    SESSION_EOC_SUMMARY
+    FS_CHAPTER_INPUTS, FS_EOC_JOB, HERO_JOURNEY_STAGES, SESSION_EOC_QUESTIONS,
+    SESSION_EOC_SUMMARY, SESSION_CHAPTER_INPUTS, SESSION_EOC_JOB
 )
-from flask import current_app
+from ..storage import get_repository
+from .jobs import build_chapter_report, find_committed_report, job_status, JOB_DONE, JOB_FAILED
 
 @bp.route('/', methods=['GET', 'POST'])
 @login_required
@@ -36,55 +37,28 @@ def end_of_chapter():
                 flash("Please answer all comprehension questions.", "warning")
                 return render_template('eoc/comprehension_check.html', questions=questions)
             eval_ctx = {'questions': questions, 'answers': answers}
-            comp_res = get_ai_response("EVALUATE_CHAPTER_COMPREHENSION", eval_ctx)
-            comp_score = 0.0
-            if isinstance(comp_res, dict) and 'overall_comprehension_score' in comp_res:
-                try:
-                    comp_score = float(comp_res['overall_comprehension_score'])
-                    comp_score = max(0.0, min(10.0, comp_score))
-                except (ValueError, TypeError):
-                    logging.warning(f"Invalid comprehension score format from AI: {comp_res['overall_comprehension_score']}")
-            else:
-                flash("The AI storyteller had trouble evaluating your comprehension.", "warning")
             chapter_text = "\n---\n".join(p_data.get(FS_CHAPTER_INPUTS,[])) or "(No player inputs recorded for this chapter)"
             anal_ctx = {'chapter_player_text': chapter_text}
-            anal_res = get_ai_response("ANALYZE_PLAYER_WRITING", anal_ctx)
-            if not isinstance(anal_res, dict) or 'error' in anal_res:
-                anal_res = {}
-            xp_gained = (5 + {'S':1, 'M':3, 'L':5}.get(anal_res.get('avg_length_category'), 0) + len(anal_res.get('awl_words_used', [])) * 2 + int(anal_res.get('relevance_coherence_score', 0)) + {'L':1, 'M':3, 'H':5}.get(anal_res.get('style_rating'), 0) + {'L':1, 'M':3, 'H':5}.get(anal_res.get('thinking_rating'), 0) + {'L':1, 'M':3, 'H':5}.get(anal_res.get('descriptive_language_rating'), 0) + max(0, int(comp_score) - 5))
-            xp_gained = max(0, xp_gained)
-            flash(f"Chapter Complete! You earned {xp_gained} Player XP!", "success")
-            db = current_app.config.get('DB')
-            if db and not current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
-                try:
-                    profile_ref = db.collection('player_profiles').document(user_id)
-                    profile_ref.update({'total_player_xp': db.firestore.Increment(xp_gained)})
-                    profile_doc = profile_ref.get(['total_player_xp', 'player_level'])
-                    if profile_doc.exists:
-                        profile_data = profile_doc.to_dict()
-                        if profile_data.get('total_player_xp', 0) >= (profile_data.get('player_level', 1) * 100):
-                            new_level = profile_data.get('player_level', 1) + 1
-                            profile_ref.update({'player_level': new_level})
-                            flash(f"Congratulations! You've reached Player Level {new_level}!", "success")
-                except Exception as e:
-                    logging.error(f"Failed to update player XP/Level in Firestore for user {user_id}: {e}", exc_info=True)
-            summary_text = f"**Chapter Complete!**\n\n* **Comprehension Score:** {comp_score:.1f} / 10\n* **Player XP Gained:** +{xp_gained}\n\n* **Writing Analysis:**\n"
-            summary_text += f"    * AWL Words Used ({len(anal_res.get('awl_words_used', []))}): {', '.join(anal_res.get('awl_words_used', [])) if anal_res.get('awl_words_used') else 'None'}\n"
-            summary_text += f"    * Relevance & Coherence: {anal_res.get('relevance_coherence_score','?')} / 5\n"
-            summary_text += f"    * Style Complexity: {anal_res.get('style_rating','?')}\n"
-            summary_text += f"    * Critical Thinking: {anal_res.get('thinking_rating','?')}\n"
-            summary_text += f"    * Average Length: {anal_res.get('avg_length_category','?')}\n"
-            summary_text += f"    * Descriptive Language: {anal_res.get('descriptive_language_rating','?')}\n"
-            summaries = p_data.get('report_summaries', [])
-            current_chapter_num = len(summaries) + 1
-            summaries.append({"chapter": current_chapter_num, "summary": summary_text, "comprehension_score": comp_score, "player_xp_gained": xp_gained, "analysis_raw": anal_res})
-            p_data['report_summaries'] = summaries
-            p_data[FS_CHAPTER_INPUTS] = []
-            session[SESSION_EOC_SUMMARY] = summary_text
-            session[SESSION_EOC_STATE] = 'AWAIT_REPORT_ACK'
-            session.pop(SESSION_CHAPTER_INPUTS, None)
-            session.pop(SESSION_EOC_QUESTIONS, None)
-            save_character_data(user_id, p_data)
+            runner = current_app.extensions['eoc_jobs']
+            if get_repository() is None:
+                # Nowhere to record a job: grade in the request (the two calls still run concurrently).
+                report = build_chapter_report(*runner.evaluate(current_app._get_current_object(), eval_ctx, anal_ctx))
+                summaries = p_data.get('report_summaries', [])
+                summaries.append({"chapter": len(summaries) + 1, "summary": report['summary'], "comprehension_score": report['comprehension_score'], "player_xp_gained": report['xp_gained'], "analysis_raw": report['analysis']})
+                p_data['report_summaries'] = summaries
+                p_data[FS_CHAPTER_INPUTS] = []
+                save_character_data(user_id, p_data)
+                _show_chapter_report(report)
+                return redirect(url_for('eoc.end_of_chapter'))
+            try:
+                session[SESSION_EOC_JOB] = runner.submit(current_app._get_current_object(), user_id, char_id, eval_ctx, anal_ctx)
+            except Exception as e:
+                logging.error(f"Could not start end-of-chapter job for character {char_id}: {e}", exc_info=True)
+                flash("Your answers could not be submitted. Please try again.", "error")
+                return render_template('eoc/comprehension_check.html', questions=questions)
+            session[SESSION_EOC_STATE] = 'AWAIT_ANALYSIS'
+            return redirect(url_for('eoc.end_of_chapter'))
+        elif eoc_state == 'AWAIT_ANALYSIS':
             return redirect(url_for('eoc.end_of_chapter'))
         elif eoc_state == 'AWAIT_REPORT_ACK':
             summaries = p_data.get('report_summaries', [])
@@ -151,6 +125,33 @@ def end_of_chapter():
             session[SESSION_EOC_QUESTIONS] = questions
             session[SESSION_EOC_STATE] = 'AWAIT_COMP_ANSWERS'
             return render_template('eoc/comprehension_check.html', questions=questions)
+        elif eoc_state == 'AWAIT_ANALYSIS':
+            job_id = session.get(SESSION_EOC_JOB)
+            job = get_repository().get_job(job_id) if job_id and get_repository() is not None else None
+            status = job_status(job)
+            if status == JOB_DONE:
+                session.pop(SESSION_EOC_JOB, None)
+                # The job committed the report from another thread (maybe another worker).
+                current_app.extensions['character_cache'].invalidate(char_id)
+                _show_chapter_report(job)
+                return redirect(url_for('eoc.end_of_chapter'))
+            committed = find_committed_report(p_data, job_id)
+            if committed is not None:
+                # The report was committed but the job could not be marked done.
+                session.pop(SESSION_EOC_JOB, None)
+                _show_chapter_report(committed)
+                return redirect(url_for('eoc.end_of_chapter'))
+            if status == JOB_FAILED:
+                if job_id and p_data.get(FS_EOC_JOB) == job_id:
+                    # Cancel it, so that a job still running past the timeout cannot commit later.
+                    p_data[FS_EOC_JOB] = None
+                    save_character_data(user_id, p_data)
+                session.pop(SESSION_EOC_JOB, None)
+                session[SESSION_EOC_STATE] = 'AWAIT_COMP_ANSWERS'
+                flash("The AI storyteller could not grade this chapter. Please submit your answers again.", "error")
+                return render_template('eoc/comprehension_check.html', questions=session.get(SESSION_EOC_QUESTIONS, []))
+            return render_template('eoc/analysis_pending.html',
+                                   status_url=url_for('eoc.job_status_view', job_id=job_id))
         elif eoc_state == 'AWAIT_FINAL_REVIEW_ACK':
             final_review_html = session.get(SESSION_EOC_SUMMARY, "<p>Your final review is not available at this moment.</p>")
             return render_template('eoc/final_review.html', final_review_html=final_review_html)
@@ -183,4 +184,32 @@ def start_new_journey():
     save_character_data(user_id, p_data)
 
     flash("A new journey begins! Your previous accomplishments have been archived.", "success")
-    return redirect(url_for('game.game_view'))
\ No newline at end of file
+    return redirect(url_for('game.game_view'))
+
+def _show_chapter_report(report: dict):
+    """Moves the EOC flow on to the report page for a graded chapter (a report or a finished job)."""
+    if not report.get('comprehension_ok', True):
+        flash("The AI storyteller had trouble evaluating your comprehension.", "warning")
+    flash(f"Chapter Complete! You earned {report['xp_gained']} Player XP!", "success")
+    if report.get('new_level'):
+        flash(f"Congratulations! You've reached Player Level {report['new_level']}!", "success")
+    session[SESSION_EOC_SUMMARY] = report['summary']
+    session[SESSION_EOC_STATE] = 'AWAIT_REPORT_ACK'
+    session.pop(SESSION_CHAPTER_INPUTS, None)
+    session.pop(SESSION_EOC_QUESTIONS, None)
+
+@bp.route('/job/<job_id>', methods=['GET'])
+@login_required
+def job_status_view(job_id):
+    """Status of one of the user's end-of-chapter jobs, polled by the pending report page."""
+    repository = get_repository()
+    job = repository.get_job(job_id) if repository is not None else None
+    if job is None or job.get('user_id') != session[SESSION_USER_ID]:
+        return jsonify({'error': 'Job not found.'}), 404
+    status = job_status(job)
+    if status != JOB_DONE:
+        # The report may be committed even though the job could not be marked done.
+        char_data = load_character_data(session[SESSION_USER_ID], job.get('char_id')) or {}
+        if find_committed_report(char_data, job_id) is not None:
+            status = JOB_DONE
+    return jsonify({'status': status})
@@ -1,3 +1,177 @@
+# gateway.py - Ethical gateway: rule-based content moderation
+#
+# Rules are loaded from rules.json and compiled once into a TermMatcher, so a
+# check is a single pass over the text with word-boundary semantics:
+#
+#   {"block_severity": "medium",
+#    "rules": [{"category": "hate", "severity": "high", "terms": ["hate", ...]}, ...]}
+#
+# A match whose severity is at or above block_severity makes the content
+# unsafe; lower-severity matches are reported as flags.
+
+import json
+import logging
+import os
+import threading
+
+from ..term_matcher import TermMatcher
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+
+SEVERITY_LEVELS = {'low': 1, 'medium': 2, 'high': 3}
+DEFAULT_BLOCK_SEVERITY = 'medium'
+
+
+class ModerationEngine:
+    """
+    Checks text against a compiled set of moderation rules.
+
+    Build one engine when the rules are loaded and reuse it; use `stream()` to
+    check text that arrives in chunks (e.g. a streamed AI response).
+    """
+
+    def __init__(self, rules: list, block_severity: str = DEFAULT_BLOCK_SEVERITY):
+        terms = {}
+        for rule in rules:
+            severity = rule.get('severity', DEFAULT_BLOCK_SEVERITY)
+            if severity not in SEVERITY_LEVELS:
+                raise ValueError(f"Unknown severity '{severity}' in moderation rule {rule.get('category')!r}.")
+            for term in rule.get('terms', []):
+                terms.setdefault(term, {'category': rule.get('category', 'other'), 'severity': severity})
+        self.block_level = SEVERITY_LEVELS[block_severity]
+        self.matcher = TermMatcher(terms)
+        # Longest term, in characters: how much text a stream must hold back.
+        self.max_term_length = max((len(term) for term in terms), default=0)
+
+    @classmethod
+    def from_file(cls, path: str = RULES_FILE) -> 'ModerationEngine':
+        """Builds an engine from a rules file (see the module comment for the format)."""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('rules', []), config.get('block_severity', DEFAULT_BLOCK_SEVERITY))
+
+    def _verdict(self, matches) -> dict:
+        """Turns (term, rule) matches into the gateway's result dict."""
+        flags = []
+        for term, rule in matches:
+            if SEVERITY_LEVELS[rule['severity']] >= self.block_level:
+                return {'safe': False, 'reason': f'Content contains forbidden keyword: {term}',
+                        'category': rule['category'], 'severity': rule['severity']}
+            flags.append({'term': term, 'category': rule['category'], 'severity': rule['severity']})
+        result = {'safe': True}
+        if flags:
+            result['flags'] = flags
+        return result
+
+    def check(self, content: str) -> dict:
+        """
+        Checks a complete piece of content.
+
+        Returns:
+            {'safe': True} (plus 'flags' for low-severity matches), or
+            {'safe': False, 'reason': ..., 'category': ..., 'severity': ...}.
+        """
+        return self._verdict((term, rule) for _, _, term, rule in self.matcher.find(content or ''))
+
+    def stream(self) -> 'ModerationStream':
+        """Starts an incremental check of chunked content."""
+        return ModerationStream(self)
+
+
+class ModerationStream:
+    """
+    Incrementally checks text fed in chunks.
+
+    Only the last `max_term_length + 1` characters are kept between chunks, so
+    a term split across a chunk boundary is still found. A match that ends at
+    the end of the text seen so far is not decided until more text arrives (the
+    word may continue, e.g. "hate" + "ful"). Text is released once no
+    undecided term can overlap it, so released text never contains part of a
+    blocked term.
+    """
+
+    def __init__(self, engine: ModerationEngine):
+        self._engine = engine
+        self._hold_back = engine.max_term_length
+        self._buffer = ''
+        self._base = 0       # absolute offset of self._buffer[0]
+        self._decided = 0    # matches ending before this offset have been checked
+        self._released = 0   # text before this offset has been returned to the caller
+        self._flags = []
+        self._blocked = None
+
+    def _scan(self, final: bool):
+        end = self._base + len(self._buffer)
+        matches = []
+        for start, stop, term, rule in self._engine.matcher.find(self._buffer):
+            if start == 0 and self._base > 0:
+                continue  # Artificial word boundary where the buffer was trimmed
+            if self._base + stop < self._decided:
+                continue  # Checked by an earlier chunk
+            if self._base + stop == end and not final:
+                continue  # The word may continue in the next chunk
+            matches.append((term, rule))
+        self._decided = end
+        verdict = self._engine._verdict(matches)
+        self._flags.extend(verdict.pop('flags', []))
+        if not verdict['safe']:
+            self._blocked = verdict
+        return verdict
+
+    def _release(self, upto: int) -> str:
+        upto = max(self._released, upto)
+        text = self._buffer[self._released - self._base:upto - self._base]
+        self._released = upto
+        keep_from = max(self._base, min(upto, self._base + len(self._buffer) - self._hold_back - 1))
+        self._buffer = self._buffer[keep_from - self._base:]
+        self._base = keep_from
+        return text
+
+    def feed(self, chunk: str) -> dict:
+        """
+        Adds a chunk of text.
+
+        Returns:
+            {'safe': True, 'text': <text now safe to pass on>}, or the blocking
+            verdict once a forbidden term is found. After a block, every further
+            call returns the same verdict.
+        """
+        if self._blocked:
+            return self._blocked
+        self._buffer += chunk or ''
+        verdict = self._scan(final=False)
+        if not verdict['safe']:
+            return verdict
+        end = self._base + len(self._buffer)
+        return {'safe': True, 'text': self._release(end - self._hold_back)}
+
+    def close(self) -> dict:
+        """Finishes the stream, checking and releasing any held-back text."""
+        if self._blocked:
+            return self._blocked
+        verdict = self._scan(final=True)
+        if not verdict['safe']:
+            return verdict
+        result = {'safe': True, 'text': self._release(self._base + len(self._buffer))}
+        if self._flags:
+            result['flags'] = list(self._flags)
+        return result
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_moderation_engine() -> ModerationEngine:
+    """Returns the process-wide engine, compiling rules.json on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ModerationEngine.from_file()
+                logging.info(f"Compiled {len(_engine.matcher)} moderation terms from {RULES_FILE}")
+    return _engine
+
+
 def analyze_content(content):
     """
     Analyzes content for ethical concerns.
@@ -5,11 +179,6 @@ def analyze_content(content):
     In a real-world scenario, this would be a much more sophisticated system,
     likely involving a machine learning model or a third-party service.
 
-    For now, this is a placeholder that checks for a few keywords.
+    For now, this checks the content against the keyword rules in rules.json.
     """
-    # Placeholder for ethical analysis
-    forbidden_keywords = ['hate', 'violence', 'self-harm']
-    for keyword in forbidden_keywords:
-        if keyword in content.lower():
-            return {'safe': False, 'reason': f'Content contains forbidden keyword: {keyword}'}
-    return {'safe': True}
\ No newline at end of file
+    return get_moderation_engine().check(content)
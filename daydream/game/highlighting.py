@@ -0,0 +1,135 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from ..utils import find_terms_in_text, process_text_for_highlighting
+
+# Bounds for the per-worker cache of rendered conversation messages.
+HIGHLIGHT_CACHE_MAX_ENTRIES = 4096
+HIGHLIGHT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+
+class HighlightCache:
+    """
+    LRU cache of highlighted message HTML, keyed by a hash of the message text.
+
+    Conversation messages never change once written, so a rendered message can
+    be reused on every page load. The cache is bounded both by entry count and
+    by the total size of the stored HTML. Entries are tied to the vocabulary
+    they were rendered with: when a different vocabulary or lore matcher is
+    passed in, the whole cache is dropped.
+    """
+
+    def __init__(self, max_entries=HIGHLIGHT_CACHE_MAX_ENTRIES, max_bytes=HIGHLIGHT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._vocab_key = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, text: str, vocab_key, render) -> str:
+        """
+        Returns the cached HTML for `text`, calling `render(text)` on a miss.
+
+        Args:
+            text: The raw message text.
+            vocab_key: Identifies the vocabulary/lore set used by `render`.
+            render: A function producing the highlighted HTML for `text`.
+        """
+        key = hashlib.sha1(text.encode('utf-8')).digest()
+        with self._lock:
+            if vocab_key != self._vocab_key:
+                self._entries.clear()
+                self._size = 0
+                self._vocab_key = vocab_key
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = render(text)
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            return html
+
+        with self._lock:
+            if vocab_key != self._vocab_key or key in self._entries:
+                return html
+            self._entries[key] = html
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.encode('utf-8'))
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._vocab_key = None
+
+
+highlight_cache = HighlightCache()
+
+
+def render_highlighted_text(text: str, awl_matcher, lore_matcher, definitions: dict | None = None) -> str:
+    """
+    Highlights lore terms and AWL words in a message.
+
+    Lore terms take precedence; AWL words overlapping a lore term are skipped.
+    `awl_matcher` may map terms to their details dict, or (as a vocabulary
+    snapshot's matcher does) map every surface form to its headword, in which
+    case the span is tagged with the headword it belongs to.
+    """
+    if not text:
+        return text
+    lore_terms = find_terms_in_text(text, lore_matcher)
+    taken = [(start, end) for start, end, _, _ in lore_terms]
+    awl_terms = [t for t in find_terms_in_text(text, awl_matcher)
+                 if not any(t[0] < end and start < t[1] for start, end in taken)]
+    terms = sorted([(s, e, o, ('lore', d)) for s, e, o, d in lore_terms] +
+                   [(s, e, o, ('awl', (o, d))) for s, e, o, d in awl_terms], key=lambda item: item[0])
+    definitions = definitions or {}
+
+    def title(data):
+        kind, value = data
+        if kind != 'awl':
+            return ''
+        word, details = value
+        if isinstance(details, dict) and details.get('definition'):
+            return details['definition']
+        if isinstance(details, str):
+            word = details
+        return definitions.get(word, '')
+
+    def data_attrs(data):
+        kind, value = data
+        if kind == 'lore' and isinstance(value, dict) and value.get('lore_path'):
+            return {'lore-path': json.dumps(value['lore_path'])}
+        if kind == 'awl' and isinstance(value[1], str):
+            return {'headword': value[1]}
+        return {}
+
+    return process_text_for_highlighting(
+        text, terms, 'vocab-awl',
+        class_formatter=lambda data: 'lore-term' if data[0] == 'lore' else 'vocab-awl',
+        title_formatter=title,
+        data_attrs_formatter=data_attrs)
+
+
+def render_conversation(messages: list, awl_matcher, lore_matcher, definitions: dict | None = None) -> list:
+    """Returns copies of `messages` with highlighted text, reusing cached renders."""
+    vocab_key = (awl_matcher.generation, lore_matcher.generation)
+    render = lambda text: render_highlighted_text(text, awl_matcher, lore_matcher, definitions)
+    display_log = []
+    for message in messages:
+        processed_message = message.copy()
+        processed_message['text'] = highlight_cache.get_or_render(message.get('text', ''), vocab_key, render)
+        display_log.append(processed_message)
+    return display_log
@@ -1,13 +1,44 @@
+import logging
 from flask import render_template, session, flash, redirect, url_for
 from . import bp
 from ..utils import (
     login_required, load_character_data, get_active_vocab_data, check_premium_access,
-    SESSION_USER_ID, SESSION_CHARACTER_ID, FS_CONVERSATION, FS_CHAPTER_INPUTS,
-    FS_QUEST_FLAGS, FS_INVENTORY
+    player_profile_reader, use_player_profile,
+    SESSION_USER_ID, SESSION_CHARACTER_ID, FS_CONVERSATION, FS_CONVERSATION_COUNT,
+    FS_CHAPTER_INPUTS, FS_QUEST_FLAGS, FS_INVENTORY
 )
 from ..quests import get_quest
+from ..storage import get_repository, fetch_concurrently
 from flask import current_app
 
+def _fetch_vocab_report_data(user_id: str, char_id: str):
+    """
+    Reads the character, the player profile and all of the user's custom lists
+    in parallel (see storage/fanout.py), so the page waits for the slowest read
+    rather than all three in turn.
+
+    Returns (character, active vocabulary, custom lists), or None for the lists
+    when they could not be read and the page should fall back to sequential loads.
+    """
+    repository = get_repository()
+    if repository is None:
+        return load_character_data(user_id, char_id), get_active_vocab_data(user_id), None
+    character_cache = current_app.extensions['character_cache']
+    try:
+        reads = fetch_concurrently({
+            'character': lambda: character_cache.get(repository, char_id),
+            'profile': player_profile_reader(user_id),
+            'lists': lambda: repository.list_custom_vocab_lists(user_id, active_only=False)
+        })
+    except Exception as e:
+        logging.error(f"Concurrent vocab report reads failed for user {user_id}: {e}", exc_info=True)
+        return load_character_data(user_id, char_id), get_active_vocab_data(user_id), None
+
+    use_player_profile(user_id, reads['profile'])
+    p_data = load_character_data(user_id, char_id, loaded=reads['character'])
+    active_lists = [vocab_list for vocab_list in reads['lists'] if vocab_list.get('is_active')]
+    return p_data, get_active_vocab_data(user_id, custom_lists=active_lists), reads['lists']
+
 @bp.route('/vocab', methods=['GET'])
 @login_required
 def journal_vocab_report():
@@ -17,12 +48,11 @@ def journal_vocab_report():
         flash("No character loaded.", "warning")
         return redirect(url_for('profile.profile'))
 
-    p_data = load_character_data(user_id, char_id)
+    p_data, user_vocab, custom_lists = _fetch_vocab_report_data(user_id, char_id)
     if not p_data:
         return redirect(url_for('profile.profile'))
 
-    active_vocab_data = get_active_vocab_data(user_id)
-    combined_vocab = active_vocab_data.get("vocab", {})
+    combined_vocab = user_vocab.vocab
     awl_words = []
     ai_words_by_list = {}
     for word, data in sorted(combined_vocab.items()):
@@ -36,23 +66,23 @@ def journal_vocab_report():
             ai_words_by_list[source].append(entry)
 
     ai_lists_metadata = []
-    db = current_app.config.get('DB')
-    if db and not current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    if custom_lists is None and get_repository() is not None:
         try:
-            profile_ref = db.collection('player_profiles').document(user_id)
-            ai_lists_query = profile_ref.collection('custom_vocab_lists').where('is_ai_generated', '==', True).stream()
-            for list_doc in ai_lists_query:
-                list_data = list_doc.to_dict()
-                ai_lists_metadata.append({
-                    "id": list_doc.id,
-                    "name": list_data.get("name", "Unnamed AI List"),
-                    "is_active": list_data.get("is_active", False),
-                    "word_count": len(list_data.get("words", [])),
-                    "created_at": list_data.get("created_at")
-                })
-            ai_lists_metadata.sort(key=lambda x: x.get('created_at', 0), reverse=True)
+            custom_lists = get_repository().list_custom_vocab_lists(user_id, active_only=False)
         except Exception as e:
+            logging.error(f"Error loading vocabulary lists for user {user_id}: {e}", exc_info=True)
             flash("Error loading vocabulary list details.", "warning")
+    for list_data in custom_lists or []:
+        if not list_data.get('is_ai_generated'):
+            continue
+        ai_lists_metadata.append({
+            "id": list_data['id'],
+            "name": list_data.get("name", "Unnamed AI List"),
+            "is_active": list_data.get("is_active", False),
+            "word_count": len(list_data.get("words", [])),
+            "created_at": list_data.get("created_at")
+        })
+    ai_lists_metadata.sort(key=lambda x: x.get('created_at') or 0, reverse=True)
 
     report_summaries = p_data.get('report_summaries', [])
     report_summaries.sort(key=lambda x: x.get('chapter', 0))
@@ -78,7 +108,7 @@ def journal_char_quest():
         return redirect(url_for('profile.profile'))
 
     sheet_data = p_data.copy()
-    fields_to_pop = [FS_CONVERSATION, FS_CHAPTER_INPUTS, FS_QUEST_FLAGS]
+    fields_to_pop = [FS_CONVERSATION, FS_CONVERSATION_COUNT, FS_CHAPTER_INPUTS, FS_QUEST_FLAGS]
     for field in fields_to_pop:
         sheet_data.pop(field, None)
     if isinstance(sheet_data.get('learned_vocab'), set):
@@ -1,14 +1,19 @@
+import base64
+import binascii
+import json
 import logging
-from flask import jsonify, request, current_app, session
+from datetime import datetime
+from flask import jsonify, request, session
 from . import bp
 from ..utils import login_required, SESSION_USER_ID
+from ..storage import get_repository
 
 @bp.route('/connect', methods=['POST'])
 @login_required
 def connect():
     """Learner requests a connection with a mentor."""
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    repository = get_repository()
+    if repository is None:
         return jsonify({"error": "Database service is not available."}), 500
 
     mentor_username = request.json.get('mentor_username')
@@ -19,33 +24,26 @@ def connect():
 
     try:
         # Find mentor by email (assuming username is email for now)
-        users_ref = db.collection('player_profiles')
-        query = users_ref.where('email', '==', mentor_username).limit(1)
-        mentors = list(query.stream())
-
-        if not mentors:
+        mentor = repository.find_profile_by_email(mentor_username)
+        if not mentor:
             return jsonify({"error": "Mentor not found."}), 404
 
-        mentor = mentors[0]
-        mentor_id = mentor.id
+        mentor_id = mentor['id']
 
         if learner_id == mentor_id:
             return jsonify({"error": "You cannot connect with yourself."}), 400
 
         # Check if a connection already exists
-        connections_ref = db.collection('mentor_connections')
-        existing_query = connections_ref.where('learner_id', '==', learner_id).where('mentor_id', '==', mentor_id)
-        if len(list(existing_query.stream())) > 0:
+        if repository.find_connections(learner_id, mentor_id):
              return jsonify({"error": "Connection request already sent or exists."}), 409
 
-        # Create a new connection request
+        # Create a new connection request (the backend stamps requested_at)
         connection_data = {
             'learner_id': learner_id,
             'mentor_id': mentor_id,
-            'status': 'pending',
-            'requested_at': db.SERVER_TIMESTAMP
+            'status': 'pending'
         }
-        connections_ref.add(connection_data)
+        repository.add_connection(connection_data)
 
         return jsonify({"status": "pending"}), 201
 
@@ -53,58 +51,118 @@ def connect():
         logging.error(f"Error creating mentor connection: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred."}), 500
 
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+
+def _encode_token(reflection: dict) -> str:
+    """Wraps a reflection's (shared_at, id) position in an opaque, URL-safe token."""
+    position = {'t': reflection['shared_at'], 'id': reflection['id']}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def _decode_token(token: str) -> tuple:
+    """Returns the (shared_at, id) position inside a token; raises ValueError if it is malformed."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode()))
+        shared_at, reflection_id = position['t'], position['id']
+        datetime.fromisoformat(shared_at)
+        if not isinstance(reflection_id, str):
+            raise TypeError(reflection_id)
+        return shared_at, reflection_id
+    except (ValueError, TypeError, KeyError, binascii.Error) as e:
+        raise ValueError(f"Invalid token: {token}") from e
+
+
 @bp.route('/inbox', methods=['GET'])
 @login_required
 def inbox():
-    """Fetches all reflections shared with the current mentor."""
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    """
+    Fetches reflections shared with the current mentor, newest first.
+
+    Query parameters:
+        limit: page size (default INBOX_PAGE_SIZE, at most INBOX_MAX_PAGE_SIZE).
+        cursor: the `next_cursor` of the previous page, to continue paging back.
+        since: a `sync_token` from an earlier response; only reflections
+            shared after it are returned.
+
+    The response carries `next_cursor` (None on the last page), `sync_token`
+    (on first pages: pass it as `since` on the next sync) and `unread_count`.
+    """
+    repository = get_repository()
+    if repository is None:
         return jsonify({"error": "Database service is not available."}), 500
 
     mentor_id = session[SESSION_USER_ID]
+    limit = max(1, min(request.args.get('limit', INBOX_PAGE_SIZE, type=int), INBOX_MAX_PAGE_SIZE))
+    try:
+        before = _decode_token(request.args['cursor']) if request.args.get('cursor') else None
+        after = _decode_token(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or since token."}), 400
 
     try:
-        shared_reflections_ref = db.collection('shared_reflections')
-        query = shared_reflections_ref.where('mentor_id', '==', mentor_id).order_by('shared_at', direction='DESCENDING')
+        # One extra row tells us whether there is another page.
+        reflections = repository.list_shared_reflections(mentor_id, limit=limit + 1, before=before, after=after)
+        has_more = len(reflections) > limit
+        reflections = reflections[:limit]
+
+        sync_token = None
+        if before is None:
+            if reflections:
+                sync_token = _encode_token(reflections[0])
+            elif after is not None:
+                sync_token = request.args['since']
+
+        return jsonify({
+            "reflections": reflections,
+            "next_cursor": _encode_token(reflections[-1]) if has_more else None,
+            "sync_token": sync_token,
+            "unread_count": repository.count_unviewed_reflections(mentor_id)
+        }), 200
 
-        reflections = []
-        for doc in query.stream():
-            reflection_data = doc.to_dict()
-            # Convert timestamp to ISO 8601 format string
-            if 'shared_at' in reflection_data and hasattr(reflection_data['shared_at'], 'isoformat'):
-                reflection_data['shared_at'] = reflection_data['shared_at'].isoformat()
-            reflections.append(reflection_data)
+    except Exception as e:
+        logging.error(f"Error fetching mentor inbox: {e}", exc_info=True)
+        return jsonify({"error": "An internal error occurred."}), 500
 
-        return jsonify(reflections), 200
+@bp.route('/inbox/viewed', methods=['POST'])
+@login_required
+def mark_viewed():
+    """Marks shared reflections (by the ids returned from the inbox) as viewed."""
+    repository = get_repository()
+    if repository is None:
+        return jsonify({"error": "Database service is not available."}), 500
 
+    shared_ids = (request.json or {}).get('ids')
+    if not isinstance(shared_ids, list) or not shared_ids:
+        return jsonify({"error": "A list of reflection ids is required."}), 400
+
+    mentor_id = session[SESSION_USER_ID]
+    try:
+        updated = repository.mark_reflections_viewed(mentor_id, shared_ids[:INBOX_MAX_PAGE_SIZE])
+        return jsonify({"updated": updated, "unread_count": repository.count_unviewed_reflections(mentor_id)}), 200
     except Exception as e:
-        logging.error(f"Error fetching mentor inbox: {e}", exc_info=True)
+        logging.error(f"Error marking reflections viewed: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred."}), 500
 
 @bp.route('/accept/<learner_id>', methods=['PUT'])
 @login_required
 def accept_connection(learner_id):
     """Mentor accepts a connection request from a learner."""
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    repository = get_repository()
+    if repository is None:
         return jsonify({"error": "Database service is not available."}), 500
 
     mentor_id = session[SESSION_USER_ID]
 
     try:
         # Find the connection request
-        connections_ref = db.collection('mentor_connections')
-        query = connections_ref.where('learner_id', '==', learner_id).where('mentor_id', '==', mentor_id).where('status', '==', 'pending').limit(1)
-        requests = list(query.stream())
+        requests = repository.find_connections(learner_id, mentor_id, status='pending', limit=1)
 
         if not requests:
             return jsonify({"error": "Connection request not found or already accepted."}), 404
 
-        request_doc = requests[0]
-        request_doc.reference.update({
-            'status': 'accepted',
-            'accepted_at': db.SERVER_TIMESTAMP
-        })
+        repository.update_connection(requests[0]['id'], {'status': 'accepted'}, timestamp_field='accepted_at')
 
         return jsonify({"status": "accepted"}), 200
 
@@ -1,20 +1,76 @@
+import copy
+import threading
+import time
+
 from flask import current_app
 
+from ..storage import get_repository
+
+PERSONA_CACHE_TTL = 600  # seconds between content version checks
+
+
+class PersonaContentCache:
+    """
+    Per-process cache of the quiz content: archetypes and dilemmas with their choices.
+
+    Within `ttl` seconds of the last check the content is served from memory.
+    After that a single small read of the content version decides whether it
+    is re-read; `invalidate` forces the next request to re-read it.
+    """
+
+    def __init__(self, ttl: float = PERSONA_CACHE_TTL):
+        self.ttl = ttl
+        self._content = None  # {'archetypes': [...], 'dilemmas': [...]}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def get(self, repository) -> dict:
+        """Returns a private copy of {'archetypes', 'dilemmas'}, reading through to `repository` as needed."""
+        now = time.monotonic()
+        with self._lock:
+            if self._content is not None and now - self._checked_at < self.ttl:
+                self.hits += 1
+                return copy.deepcopy(self._content)
+            content = self._content
+
+        version = repository.get_persona_content_version()
+        if content is not None and version is not None and version == self._version:
+            with self._lock:
+                self._checked_at = now
+                self.revalidations += 1
+                return copy.deepcopy(content)
+
+        content = {'archetypes': repository.list_archetypes(), 'dilemmas': repository.list_dilemmas()}
+        with self._lock:
+            self.misses += 1
+            self._content, self._version, self._checked_at = content, version, now
+            return copy.deepcopy(content)
+
+    def invalidate(self):
+        """Drops the cached content (call after editing archetypes, dilemmas or choices)."""
+        with self._lock:
+            self._content = None
+            self._version = None
+
+
 class PersonaService:
     """
-    A service for interacting with the Persona Engine's Firestore collections.
-    If the database is not available (i.e., BYPASS_EXTERNAL_SERVICES is True),
-    it returns hardcoded mock data for verification and testing.
+    A service for reading the Persona Engine's archetypes and dilemmas.
+    If no storage backend is available (i.e., BYPASS_EXTERNAL_SERVICES is True
+    with the Firestore backend), it returns hardcoded mock data for verification and testing.
+    Otherwise the content is served from the app's PersonaContentCache.
     """
     def __init__(self):
-        self.db = current_app.config.get('DB')
-        if self.db:
-            self.archetypes_collection = self.db.collection('archetypes')
-            self.dilemmas_collection = self.db.collection('dilemmas')
+        self.repository = get_repository()
+        self.cache = current_app.extensions['persona_cache']
 
     def get_all_archetypes(self):
         """Retrieves all archetypes from the database or returns mock data."""
-        if not self.db:
+        if self.repository is None:
             # Return mock data if external services are bypassed
             return [
                 {'id': 'archetype1', 'name': 'Hero', 'description': 'You are a brave and courageous warrior, always ready to stand up for what is right.', 'stat_buffs': {'Courage': 2, 'Strength': 1}},
@@ -23,16 +79,11 @@ class PersonaService:
                 {'id': 'archetype4', 'name': 'Caregiver', 'description': 'You are a compassionate and empathetic soul, always looking to help others.', 'stat_buffs': {'Empathy': 2, 'Wisdom': 1}},
             ]
 
-        archetypes = []
-        for doc in self.archetypes_collection.stream():
-            archetype = doc.to_dict()
-            archetype['id'] = doc.id
-            archetypes.append(archetype)
-        return archetypes
+        return self.cache.get(self.repository)['archetypes']
 
     def get_all_dilemmas(self):
         """Retrieves all dilemmas and their choices from the database or returns mock data."""
-        if not self.db:
+        if self.repository is None:
             # Return mock data if external services are bypassed
             return [
                 {
@@ -64,18 +115,7 @@ class PersonaService:
                 },
             ]
 
-        dilemmas = []
-        for doc in self.dilemmas_collection.stream():
-            dilemma = doc.to_dict()
-            dilemma['id'] = doc.id
-            choices_collection = doc.reference.collection('choices')
-            dilemma['choices'] = []
-            for choice_doc in choices_collection.stream():
-                choice = choice_doc.to_dict()
-                choice['id'] = choice_doc.id
-                dilemma['choices'].append(choice)
-            dilemmas.append(dilemma)
-        return dilemmas
+        return self.cache.get(self.repository)['dilemmas']
 
 class Archetype:
     """Represents a player archetype (e.g., Sage, Hero)."""
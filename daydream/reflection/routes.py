@@ -1,14 +1,15 @@
 import logging
-from flask import jsonify, request, current_app, session
+from flask import jsonify, request, session
 from . import bp
 from ..utils import login_required, SESSION_USER_ID
+from ..storage import get_repository
 
 @bp.route('/share/<reflection_id>', methods=['POST'])
 @login_required
 def share(reflection_id):
     """Learner shares a reflection with a mentor."""
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    repository = get_repository()
+    if repository is None:
         return jsonify({"error": "Database service is not available."}), 500
 
     mentor_id = request.json.get('mentor_id')
@@ -19,9 +20,7 @@ def share(reflection_id):
 
     try:
         # Verify that the learner and mentor are connected
-        connections_ref = db.collection('mentor_connections')
-        query = connections_ref.where('learner_id', '==', learner_id).where('mentor_id', '==', mentor_id).where('status', '==', 'accepted').limit(1)
-        if not list(query.stream()):
+        if not repository.find_connections(learner_id, mentor_id, status='accepted', limit=1):
             return jsonify({"error": "You are not connected with this mentor."}), 403
 
         # For now, we'll just create a record that the reflection was shared.
@@ -30,10 +29,9 @@ def share(reflection_id):
             'reflection_id': reflection_id,
             'learner_id': learner_id,
             'mentor_id': mentor_id,
-            'shared_at': db.SERVER_TIMESTAMP,
             'viewed': False
         }
-        db.collection('shared_reflections').add(shared_reflection_data)
+        repository.add_shared_reflection(shared_reflection_data)
 
         return jsonify({"status": "shared"}), 200
 
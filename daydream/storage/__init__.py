@@ -0,0 +1,40 @@
+# storage - Repository layer over Firestore or an embedded SQLite database
+#
+# The backend is chosen by the STORAGE_BACKEND config value:
+#   'firestore' (default) - the Firestore client in app.config['DB']
+#   'sqlite'              - a local database at SQLITE_PATH, usable offline and
+#                           in BYPASS_EXTERNAL_SERVICES mode
+
+import os
+
+from flask import current_app
+
+from .base import Repository
+from .character_cache import CharacterCache
+from .profile_cache import ProfileCache
+from .errors import StorageError, OwnershipError, ConflictError
+from .fanout import fetch_concurrently
+from .unit_of_work import UnitOfWork
+from .firestore_backend import FirestoreRepository
+from .sqlite_backend import SQLiteRepository
+
+
+def get_repository() -> Repository | None:
+    """
+    Returns the repository for the current app.
+
+    Returns None when the Firestore backend is selected but unavailable (no
+    client, or external services are bypassed); callers fall back to their
+    dummy data exactly as before.
+    """
+    if current_app.config.get('STORAGE_BACKEND') == 'sqlite':
+        repository = current_app.extensions.get('sqlite_repository')
+        if repository is None:
+            path = current_app.config.get('SQLITE_PATH') or os.path.join(current_app.instance_path, 'daydream.sqlite3')
+            repository = current_app.extensions['sqlite_repository'] = SQLiteRepository(path)
+        return repository
+
+    db = current_app.config.get('DB')
+    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+        return None
+    return FirestoreRepository(db)
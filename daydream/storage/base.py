@@ -0,0 +1,225 @@
+# base.py - The repository interface every storage backend implements
+#
+# Documents are plain dicts. Where callers need a document's id (characters,
+# profiles found by email, connections, persona data) it is included under 'id'.
+
+from abc import ABC, abstractmethod
+
+
+class Repository(ABC):
+    """
+    Data access for characters, player profiles, mentor connections, shared
+    reflections, background jobs and the persona quiz.
+
+    Implementations: FirestoreRepository (production) and SQLiteRepository
+    (embedded, for offline use and local workloads).
+    """
+
+    # --- Characters ---
+
+    @abstractmethod
+    def list_characters(self, user_id: str, fields: list | None = None) -> list[dict]:
+        """Returns every character owned by `user_id` (only `fields` and 'id', if given)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_character(self, char_id: str) -> tuple[dict | None, object]:
+        """
+        Returns (document, update_time), or (None, None) if it does not exist.
+        update_time identifies the stored version of the document.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_character_version(self, char_id: str) -> object:
+        """Returns the character's update_time without reading the document, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def new_character_id(self) -> str:
+        """Allocates an id for a character that has not been saved yet."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_character(self, char_id: str, data: dict) -> object:
+        """
+        Creates a character. Returns its update_time.
+        Raises ConflictError if a document with that id already exists.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_character(self, char_id: str, data: dict, owner_id: str | None = None,
+                      expected_update_time=None) -> object:
+        """
+        Updates a character, merging `data` into the stored document, in a single
+        guarded write. Returns the new update_time (None if the backend cannot report it).
+
+        expected_update_time: the version the caller loaded. The write only
+            applies if the stored document still has that version; otherwise
+            ConflictError is raised.
+        owner_id: the user the document must belong to (OwnershipError if not).
+            With an expected_update_time the caller has already checked the
+            owner of that version, so backends may rely on the version alone.
+
+        Without an expected_update_time a missing document is created (it must
+        then belong to owner_id); with neither argument the document is created
+        or merged unconditionally.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_character(self, char_id: str):
+        raise NotImplementedError
+
+    # --- Conversation Log ---
+    #
+    # A character's conversation is an append-only log of messages addressed by
+    # their absolute index, stored in fixed-size segments (index // segment_size)
+    # so that a turn writes only its new messages.
+
+    @abstractmethod
+    def append_conversation(self, char_id: str, start: int, messages: list, segment_size: int):
+        """Writes `messages` at indices start, start + 1, ... in one batch."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_conversation(self, char_id: str, start: int, end: int, segment_size: int) -> list:
+        """Returns the messages with indices in [start, end), oldest first, reading only the segments that hold them."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_conversation(self, char_id: str):
+        raise NotImplementedError
+
+    # --- Player Profiles ---
+
+    @abstractmethod
+    def get_profile(self, user_id: str, fields: list | None = None) -> dict | None:
+        """Returns a player profile (only `fields`, if given), or None if it does not exist."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_profile_by_email(self, email: str) -> dict | None:
+        """Returns the first profile with the given email, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_profile(self, user_id: str, updates: dict):
+        """Merges `updates` into a profile, creating it if it does not exist."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def increment_profile_field(self, user_id: str, field: str, amount):
+        """Atomically adds `amount` to a numeric profile field (a missing profile or field counts as 0)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_custom_vocab_lists(self, user_id: str, active_only: bool = True) -> list[dict]:
+        """Returns a user's custom vocabulary lists (only active ones by default)."""
+        raise NotImplementedError
+
+    # --- Mentor Connections ---
+
+    @abstractmethod
+    def find_connections(self, learner_id: str, mentor_id: str, status: str | None = None,
+                         limit: int | None = None) -> list[dict]:
+        """Returns connections between a learner and a mentor, optionally filtered by status."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_connection(self, data: dict) -> str:
+        """Creates a mentor connection; 'requested_at' is set by the backend. Returns its id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_connection(self, connection_id: str, updates: dict, timestamp_field: str | None = None):
+        """Updates a connection, optionally setting `timestamp_field` to the current time."""
+        raise NotImplementedError
+
+    # --- Shared Reflections ---
+
+    @abstractmethod
+    def add_shared_reflection(self, data: dict) -> str:
+        """Records a reflection shared with a mentor; 'shared_at' is set by the backend."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_shared_reflections(self, mentor_id: str, limit: int | None = None,
+                                before: tuple | None = None, after: tuple | None = None) -> list[dict]:
+        """
+        Returns reflections shared with a mentor, newest first (ties on
+        'shared_at' broken by id, descending), each with its 'id' and
+        'shared_at' as an ISO 8601 string.
+
+        before/after: exclusive (shared_at, id) bounds in that order, for paging
+        back through the inbox and for fetching only what was shared since a
+        sync. Reflections shared at the same instant are neither skipped nor repeated.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_unviewed_reflections(self, mentor_id: str) -> int:
+        """Counts a mentor's reflections not yet marked viewed, using an index/aggregation rather than a scan."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark_reflections_viewed(self, mentor_id: str, shared_ids: list) -> int:
+        """Marks the mentor's shared reflections with the given ids as viewed. Returns how many were updated."""
+        raise NotImplementedError
+
+    # --- Units of Work ---
+
+    @abstractmethod
+    def commit(self, unit) -> dict:
+        """
+        Applies every mutation in a UnitOfWork atomically, in one round trip
+        where the backend allows it. Character writes follow the rules of
+        create_character/set_character; profile updates and increments are
+        merged field by field (creating the profile if needed), and character
+        summaries are set or removed by key within the profile's
+        'character_summaries' map. Conversation appends are written with the
+        character they belong to, so a turn rejected as a conflict does not
+        leave its messages in the log.
+
+        Returns {char_id: new update_time (None if unknown)}. Raises
+        ConflictError or OwnershipError, in which case nothing is written.
+        """
+        raise NotImplementedError
+
+    # --- Background Jobs ---
+
+    @abstractmethod
+    def create_job(self, data: dict) -> str:
+        """Records a background job (see eoc/jobs.py). Returns its id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_job(self, job_id: str, updates: dict):
+        """Merges `updates` (status, results) into a job."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> dict | None:
+        """Returns a job, or None if it does not exist."""
+        raise NotImplementedError
+
+    # --- Persona Quiz ---
+
+    @abstractmethod
+    def list_archetypes(self) -> list[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_dilemmas(self) -> list[dict]:
+        """Returns every dilemma with its 'choices' list, in a fixed number of queries."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_persona_content_version(self) -> object:
+        """
+        Returns the quiz content version (the 'version' field of
+        persona_meta/content), bumped by whoever edits archetypes, dilemmas or
+        choices (see seed_persona_quiz.py). None if it has never been set.
+        """
+        raise NotImplementedError
@@ -0,0 +1,97 @@
+# character_cache.py - Per-worker read-through cache of character documents
+#
+# Game turns load and save the same character document on every request. The
+# cache keeps the last known version of each character (with its update_time)
+# so that:
+#   - a load costs a metadata-only version check, and the document is re-read
+#     only if another worker changed it,
+#   - the ownership check on save runs against the cached user_id.
+#
+# A CHARACTER_CACHE_TTL above 0 skips the version check for that many seconds
+# after an entry was last checked. Only use it when each character is served by
+# one worker (sticky sessions): otherwise a turn can start from a stale copy
+# and its save is rejected as a conflict.
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+CHARACTER_CACHE_TTL = 0  # seconds; 0 checks the version on every load
+CHARACTER_CACHE_MAX_ENTRIES = 2048
+
+
+class CharacterCache:
+    """LRU cache of character documents keyed by char_id."""
+
+    def __init__(self, ttl: float = CHARACTER_CACHE_TTL, max_entries: int = CHARACTER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # char_id -> [data, update_time, checked_at]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def _store(self, char_id: str, data: dict, update_time, checked_at: float):
+        self._entries[char_id] = [data, update_time, checked_at]
+        self._entries.move_to_end(char_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, repository, char_id: str) -> tuple[dict | None, object]:
+        """
+        Returns (private copy of the character, its update_time), reading through
+        to `repository` when the entry is missing or has changed since it was cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(char_id)
+            if entry is not None and now - entry[2] < self.ttl:
+                self._entries.move_to_end(char_id)
+                self.hits += 1
+                return copy.deepcopy(entry[0]), entry[1]
+            cached_version = entry[1] if entry is not None else None
+
+        if entry is not None and cached_version is not None:
+            if repository.get_character_version(char_id) == cached_version:
+                with self._lock:
+                    current = self._entries.get(char_id)
+                    if current is not None and current[1] == cached_version:
+                        current[2] = now
+                        self.revalidations += 1
+                        return copy.deepcopy(current[0]), cached_version
+
+        data, update_time = repository.get_character(char_id)
+        with self._lock:
+            self.misses += 1
+            if data is None:
+                self._entries.pop(char_id, None)
+                return None, None
+            self._store(char_id, data, update_time, now)
+            return copy.deepcopy(data), update_time
+
+    def peek(self, char_id: str) -> tuple[dict | None, object]:
+        """Returns the cached (document, update_time) without copying or revalidating (read-only use)."""
+        with self._lock:
+            entry = self._entries.get(char_id)
+            return (entry[0], entry[1]) if entry is not None else (None, None)
+
+    def update(self, char_id: str, data: dict, update_time=None):
+        """
+        Merges `data` into the cached document (as set(merge=True) does).
+        Pass the update_time returned by the write once it has been persisted.
+        """
+        with self._lock:
+            entry = self._entries.get(char_id)
+            merged = {**(entry[0] if entry is not None else {}), **copy.deepcopy(data)}
+            version = update_time if update_time is not None else (entry[1] if entry is not None else None)
+            self._store(char_id, merged, version, time.monotonic())
+
+    def invalidate(self, char_id: str | None = None):
+        """Drops one character (or every character if None)."""
+        with self._lock:
+            if char_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(char_id, None)
@@ -0,0 +1,22 @@
+# errors.py - Typed storage errors
+
+
+class StorageError(Exception):
+    """Base class for errors raised by the storage layer."""
+
+
+class OwnershipError(StorageError):
+    """A user tried to write a document they do not own."""
+
+    def __init__(self, doc_id: str, user_id: str):
+        super().__init__(f"User {user_id} does not own {doc_id}.")
+        self.doc_id = doc_id
+        self.user_id = user_id
+
+
+class ConflictError(StorageError):
+    """A guarded write failed because the document changed (or was created or deleted) since it was read."""
+
+    def __init__(self, doc_id: str, message: str | None = None):
+        super().__init__(message or f"{doc_id} was modified concurrently.")
+        self.doc_id = doc_id
@@ -0,0 +1,42 @@
+# fanout.py - Issue independent storage reads in parallel
+#
+# A page that needs several unrelated documents (a character, a profile, a
+# subcollection) can fetch them concurrently on a bounded per-app thread pool,
+# so its data latency is roughly that of the slowest read rather than the sum.
+#
+# The pooled callables run outside the request: they must not use flask.g,
+# session or current_app. Capture what they need (repository, caches) first,
+# and hand the results back to the request in the calling thread.
+
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+READ_POOL_WORKERS = 8
+
+
+def create_read_pool(max_workers: int = READ_POOL_WORKERS) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='daydream-read')
+
+
+def fetch_concurrently(calls: dict) -> dict:
+    """
+    Runs each callable in `calls` ({name: callable}) on the app's read pool and
+    returns {name: result} once all have finished. The first exception raised
+    by a callable is re-raised after the others complete.
+
+    Must not be called from a pooled callable (the pool is bounded).
+    """
+    if len(calls) <= 1:
+        return {name: call() for name, call in calls.items()}
+    pool = current_app.extensions['read_pool']
+    futures = {name: pool.submit(call) for name, call in calls.items()}
+    results, error = {}, None
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return results
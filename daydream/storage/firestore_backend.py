@@ -0,0 +1,295 @@
+# firestore_backend.py - Repository implementation on the Firestore client
+
+from datetime import datetime
+
+from google.api_core import exceptions as gcp_exceptions
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from .base import Repository
+from .errors import ConflictError, OwnershipError
+
+
+def _with_id(doc) -> dict:
+    data = doc.to_dict() or {}
+    data['id'] = doc.id
+    return data
+
+
+class FirestoreRepository(Repository):
+    """Reads and writes the app's Firestore collections."""
+
+    def __init__(self, db):
+        self.db = db
+
+    # --- Characters ---
+
+    def list_characters(self, user_id: str, fields: list | None = None) -> list[dict]:
+        query = self.db.collection('characters').where(filter=FieldFilter('user_id', '==', user_id))
+        if fields:
+            query = query.select(fields)  # the server returns only these fields
+        return [_with_id(doc) for doc in query.stream()]
+
+    def get_character(self, char_id: str) -> tuple[dict | None, object]:
+        doc = self.db.collection('characters').document(char_id).get()
+        return (doc.to_dict(), doc.update_time) if doc.exists else (None, None)
+
+    def get_character_version(self, char_id: str) -> object:
+        # Projecting a single small field returns the metadata without the document body.
+        doc = self.db.collection('characters').document(char_id).get(['user_id'])
+        return doc.update_time if doc.exists else None
+
+    def new_character_id(self) -> str:
+        return self.db.collection('characters').document().id
+
+    def create_character(self, char_id: str, data: dict) -> object:
+        try:
+            return self.db.collection('characters').document(char_id).create(data).update_time
+        except gcp_exceptions.AlreadyExists:
+            raise ConflictError(char_id, f"Character {char_id} already exists.")
+
+    def set_character(self, char_id: str, data: dict, owner_id: str | None = None,
+                      expected_update_time=None) -> object:
+        ref = self.db.collection('characters').document(char_id)
+        if expected_update_time is not None:
+            # One precondition-guarded write: the server rejects it if the
+            # document changed since the caller loaded it.
+            option = self.db.write_option(last_update_time=expected_update_time)
+            try:
+                return ref.update(data, option=option).update_time
+            except (gcp_exceptions.FailedPrecondition, gcp_exceptions.NotFound):
+                raise ConflictError(char_id)
+        if owner_id is not None:
+            # No known version: check the owner and write in one transaction.
+            @firestore.transactional
+            def guarded_write(transaction):
+                snapshot = ref.get(['user_id'], transaction=transaction)
+                owner = (snapshot.to_dict() or {}).get('user_id') if snapshot.exists else data.get('user_id')
+                if owner != owner_id:
+                    raise OwnershipError(char_id, owner_id)
+                transaction.set(ref, data, merge=True)
+            guarded_write(self.db.transaction())
+            return None  # commit times are not exposed by the transaction helper
+        return ref.set(data, merge=True).update_time
+
+    def delete_character(self, char_id: str):
+        self.db.collection('characters').document(char_id).delete()
+
+    # --- Conversation Log ---
+    # Segments live in characters/{char_id}/conversation_segments/{seq}, each a
+    # map of {offset: message}. Appends merge into that map, so only the new
+    # messages are sent; the character document itself stays small.
+
+    def _segments(self, char_id: str):
+        return self.db.collection('characters').document(char_id).collection('conversation_segments')
+
+    def _stage_conversation(self, writer, char_id: str, start: int, messages: list, segment_size: int):
+        segments = {}
+        for index, message in enumerate(messages, start):
+            segments.setdefault(index // segment_size, {})[str(index % segment_size)] = message
+        for seq, entries in segments.items():
+            writer.set(self._segments(char_id).document(f"{seq:06d}"), {'seq': seq, 'messages': entries}, merge=True)
+
+    def append_conversation(self, char_id: str, start: int, messages: list, segment_size: int):
+        batch = self.db.batch()
+        self._stage_conversation(batch, char_id, start, messages, segment_size)
+        batch.commit()
+
+    def get_conversation(self, char_id: str, start: int, end: int, segment_size: int) -> list:
+        if end <= start:
+            return []
+        refs = [self._segments(char_id).document(f"{seq:06d}")
+                for seq in range(start // segment_size, (end - 1) // segment_size + 1)]
+        by_index = {}
+        for doc in self.db.get_all(refs):
+            if doc.exists:
+                data = doc.to_dict()
+                for offset, message in data.get('messages', {}).items():
+                    by_index[data['seq'] * segment_size + int(offset)] = message
+        return [by_index[i] for i in range(start, end) if i in by_index]
+
+    def delete_conversation(self, char_id: str):
+        for doc in self._segments(char_id).stream():
+            doc.reference.delete()
+
+    # --- Player Profiles ---
+
+    def _profile_ref(self, user_id: str):
+        return self.db.collection('player_profiles').document(user_id)
+
+    def get_profile(self, user_id: str, fields: list | None = None) -> dict | None:
+        ref = self._profile_ref(user_id)
+        doc = ref.get(fields) if fields else ref.get()
+        return doc.to_dict() if doc.exists else None
+
+    def find_profile_by_email(self, email: str) -> dict | None:
+        query = self.db.collection('player_profiles').where('email', '==', email).limit(1)
+        docs = list(query.stream())
+        return _with_id(docs[0]) if docs else None
+
+    def update_profile(self, user_id: str, updates: dict):
+        # set(merge=True) rather than update(), which fails on a missing profile.
+        self._profile_ref(user_id).set(updates, merge=True)
+
+    def increment_profile_field(self, user_id: str, field: str, amount):
+        self._profile_ref(user_id).set({field: firestore.Increment(amount)}, merge=True)
+
+    def list_custom_vocab_lists(self, user_id: str, active_only: bool = True) -> list[dict]:
+        lists_ref = self._profile_ref(user_id).collection('custom_vocab_lists')
+        query = lists_ref.where('is_active', '==', True) if active_only else lists_ref
+        return [_with_id(doc) for doc in query.stream()]
+
+    # --- Mentor Connections ---
+
+    def find_connections(self, learner_id: str, mentor_id: str, status: str | None = None,
+                         limit: int | None = None) -> list[dict]:
+        query = self.db.collection('mentor_connections').where('learner_id', '==', learner_id).where('mentor_id', '==', mentor_id)
+        if status is not None:
+            query = query.where('status', '==', status)
+        if limit is not None:
+            query = query.limit(limit)
+        return [_with_id(doc) for doc in query.stream()]
+
+    def add_connection(self, data: dict) -> str:
+        ref = self.db.collection('mentor_connections').document()
+        ref.set({**data, 'requested_at': firestore.SERVER_TIMESTAMP})
+        return ref.id
+
+    def update_connection(self, connection_id: str, updates: dict, timestamp_field: str | None = None):
+        if timestamp_field:
+            updates = {**updates, timestamp_field: firestore.SERVER_TIMESTAMP}
+        self.db.collection('mentor_connections').document(connection_id).update(updates)
+
+    # --- Shared Reflections ---
+
+    def add_shared_reflection(self, data: dict) -> str:
+        ref = self.db.collection('shared_reflections').document()
+        ref.set({**data, 'shared_at': firestore.SERVER_TIMESTAMP})
+        return ref.id
+
+    def list_shared_reflections(self, mentor_id: str, limit: int | None = None,
+                                before: tuple | None = None, after: tuple | None = None) -> list[dict]:
+        query = (self.db.collection('shared_reflections').where('mentor_id', '==', mentor_id)
+                 .order_by('shared_at', direction='DESCENDING')
+                 .order_by('__name__', direction='DESCENDING'))
+        # Cursors on (shared_at, document id) in query order: `before` is further down the list.
+        if before is not None:
+            query = query.start_after({'shared_at': datetime.fromisoformat(before[0]), '__name__': before[1]})
+        if after is not None:
+            query = query.end_before({'shared_at': datetime.fromisoformat(after[0]), '__name__': after[1]})
+        if limit is not None:
+            query = query.limit(limit)
+        reflections = []
+        for doc in query.stream():
+            data = _with_id(doc)
+            if hasattr(data.get('shared_at'), 'isoformat'):
+                data['shared_at'] = data['shared_at'].isoformat()
+            reflections.append(data)
+        return reflections
+
+    def count_unviewed_reflections(self, mentor_id: str) -> int:
+        query = self.db.collection('shared_reflections').where('mentor_id', '==', mentor_id).where('viewed', '==', False)
+        return int(query.count().get()[0][0].value)
+
+    def mark_reflections_viewed(self, mentor_id: str, shared_ids: list) -> int:
+        refs = [self.db.collection('shared_reflections').document(shared_id) for shared_id in shared_ids]
+        batch = self.db.batch()
+        updated = 0
+        for doc in (self.db.get_all(refs, field_paths=['mentor_id', 'viewed']) if refs else []):
+            data = doc.to_dict() if doc.exists else None
+            if data and data.get('mentor_id') == mentor_id and not data.get('viewed'):
+                batch.update(doc.reference, {'viewed': True})
+                updated += 1
+        if updated:
+            batch.commit()
+        return updated
+
+    # --- Units of Work ---
+
+    def commit(self, unit) -> dict:
+        characters = self.db.collection('characters')
+        profiles = self.db.collection('player_profiles')
+
+        def stage(writer):
+            # Characters first, so their WriteResults come first.
+            for char_id, write in unit.characters.items():
+                ref = characters.document(char_id)
+                if write['create']:
+                    writer.create(ref, write['data'])
+                elif write['expected'] is not None:
+                    writer.update(ref, write['data'], option=self.db.write_option(last_update_time=write['expected']))
+                else:
+                    writer.set(ref, write['data'], merge=True)
+            for user_id, write in unit.profiles.items():
+                fields = {**write['updates'], **{field: firestore.Increment(amount) for field, amount in write['increments'].items()}}
+                if write['summaries']:
+                    # set(merge=True) merges nested maps, so only these entries change.
+                    fields['character_summaries'] = {
+                        char_id: summary if summary is not None else firestore.DELETE_FIELD
+                        for char_id, summary in write['summaries'].items()}
+                writer.set(profiles.document(user_id), fields, merge=True)
+            for char_id, append in unit.conversations.items():
+                self._stage_conversation(writer, char_id, append['start'], append['messages'], append['segment_size'])
+
+        unchecked = [char_id for char_id, write in unit.characters.items()
+                     if not write['create'] and write['expected'] is None and write['owner_id'] is not None]
+        try:
+            if not unchecked:
+                # Every character write carries its own precondition: one batched commit.
+                batch = self.db.batch()
+                stage(batch)
+                results = batch.commit()
+                return {char_id: result.update_time for char_id, result in zip(unit.characters, results)}
+
+            # Some owners have not been checked: read them in a transaction first.
+            @firestore.transactional
+            def write_all(transaction):
+                for char_id in unchecked:
+                    snapshot = characters.document(char_id).get(['user_id'], transaction=transaction)
+                    # A document that does not exist yet is created by the merge (it must name its owner).
+                    owner = (snapshot.to_dict() or {}).get('user_id') if snapshot.exists else unit.characters[char_id]['data'].get('user_id')
+                    if owner != unit.characters[char_id]['owner_id']:
+                        raise OwnershipError(char_id, unit.characters[char_id]['owner_id'])
+                stage(transaction)
+            write_all(self.db.transaction())
+            return dict.fromkeys(unit.characters)  # commit times are not exposed by the transaction helper
+        except (gcp_exceptions.FailedPrecondition, gcp_exceptions.NotFound, gcp_exceptions.AlreadyExists) as e:
+            raise ConflictError(next(iter(unit.characters), 'unit of work'), f"Commit rejected: {e}")
+
+    # --- Background Jobs ---
+
+    def create_job(self, data: dict) -> str:
+        ref = self.db.collection('jobs').document()
+        ref.set(data)
+        return ref.id
+
+    def update_job(self, job_id: str, updates: dict):
+        self.db.collection('jobs').document(job_id).set(updates, merge=True)
+
+    def get_job(self, job_id: str) -> dict | None:
+        snapshot = self.db.collection('jobs').document(job_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    # --- Persona Quiz ---
+
+    def list_archetypes(self) -> list[dict]:
+        return [_with_id(doc) for doc in self.db.collection('archetypes').stream()]
+
+    def list_dilemmas(self) -> list[dict]:
+        # Two queries in total: the dilemmas, and every 'choices' subcollection
+        # at once through a collection group query, grouped by parent dilemma.
+        choices = {}
+        for choice_doc in self.db.collection_group('choices').stream():
+            dilemma_ref = choice_doc.reference.parent.parent
+            if dilemma_ref is not None and dilemma_ref.parent.id == 'dilemmas':
+                choices.setdefault(dilemma_ref.id, []).append(_with_id(choice_doc))
+        dilemmas = []
+        for doc in self.db.collection('dilemmas').stream():
+            dilemma = _with_id(doc)
+            dilemma['choices'] = choices.get(doc.id, [])
+            dilemmas.append(dilemma)
+        return dilemmas
+
+    def get_persona_content_version(self) -> object:
+        doc = self.db.collection('persona_meta').document('content').get(['version'])
+        return (doc.to_dict() or {}).get('version') if doc.exists else None
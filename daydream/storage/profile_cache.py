@@ -0,0 +1,72 @@
+# profile_cache.py - Optional per-worker cache of player profile projections
+#
+# Several consumers read the same player_profiles/<uid> document during a
+# request (instructor_required, check_premium_access, the vocabulary merge,
+# the profile page and its character listing). utils.get_player_profile loads it once per request with
+# the union of the fields they need (PROFILE_FIELDS); this cache lets
+# consecutive requests share that read for PROFILE_CACHE_TTL seconds.
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+PROFILE_CACHE_TTL = 0  # seconds; 0 disables the cache (profiles are still read once per request)
+PROFILE_CACHE_MAX_ENTRIES = 1024
+
+# Profile fields read by the app's consumers. A request fetches all of them in
+# one projected read, so later consumers never need a second round trip.
+PROFILE_FIELDS = frozenset({'role', 'has_premium', 'vocab_settings', 'email', 'player_level', 'total_player_xp',
+                            'character_summaries'})
+
+
+def covers(fetched: frozenset | None, wanted: frozenset | None) -> bool:
+    """True if a read of `fetched` fields (None = the whole document) includes `wanted`."""
+    return fetched is None or (wanted is not None and wanted <= fetched)
+
+
+class ProfileCache:
+    """LRU cache of profile projections keyed by user_id."""
+
+    def __init__(self, ttl: float = PROFILE_CACHE_TTL, max_entries: int = PROFILE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user_id -> (expires_at, fields, profile)
+        self._epoch = 0  # bumped by invalidate so in-flight reads aren't stored
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, fields: frozenset | None, load):
+        """
+        Returns (fields, profile) for `user_id`, calling `load()` on a miss.
+        `load` must return the profile projected to `fields` (or None).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if self.ttl > 0 and entry is not None and entry[0] > now and covers(entry[1], fields):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1], copy.deepcopy(entry[2])
+            self.misses += 1
+            epoch = self._epoch
+
+        profile = load()
+        if self.ttl > 0:
+            with self._lock:
+                if epoch == self._epoch:
+                    self._entries[user_id] = (now + self.ttl, fields, copy.deepcopy(profile))
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return fields, profile
+
+    def invalidate(self, user_id: str | None = None):
+        """Drops the cached profile for `user_id` (everyone if None)."""
+        with self._lock:
+            self._epoch += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
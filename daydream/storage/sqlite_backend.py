@@ -0,0 +1,446 @@
+# sqlite_backend.py - Embedded SQLite repository for offline use
+#
+# Each collection is a table holding the document as JSON in a `data` column.
+# The fields the app filters or sorts on are generated columns extracted from
+# that JSON, so they can be indexed without being stored twice by hand. The
+# database runs in WAL mode so readers never block the (single) writer.
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .base import Repository
+from .errors import ConflictError, OwnershipError
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    update_time INTEGER NOT NULL DEFAULT 0,
+    user_id TEXT GENERATED ALWAYS AS (json_extract(data, '$.user_id')) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS idx_characters_user_id ON characters (user_id);
+
+CREATE TABLE IF NOT EXISTS conversation_segments (
+    char_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    messages TEXT NOT NULL,
+    PRIMARY KEY (char_id, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS player_profiles (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    email TEXT GENERATED ALWAYS AS (json_extract(data, '$.email')) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS idx_player_profiles_email ON player_profiles (email);
+
+CREATE TABLE IF NOT EXISTS custom_vocab_lists (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    is_active INTEGER GENERATED ALWAYS AS (json_extract(data, '$.is_active')) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS idx_custom_vocab_lists_user_id ON custom_vocab_lists (user_id, is_active);
+
+CREATE TABLE IF NOT EXISTS mentor_connections (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    learner_id TEXT GENERATED ALWAYS AS (json_extract(data, '$.learner_id')) VIRTUAL,
+    mentor_id TEXT GENERATED ALWAYS AS (json_extract(data, '$.mentor_id')) VIRTUAL,
+    status TEXT GENERATED ALWAYS AS (json_extract(data, '$.status')) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS idx_mentor_connections_pair ON mentor_connections (learner_id, mentor_id, status);
+CREATE INDEX IF NOT EXISTS idx_mentor_connections_mentor ON mentor_connections (mentor_id, status);
+
+CREATE TABLE IF NOT EXISTS shared_reflections (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    mentor_id TEXT GENERATED ALWAYS AS (json_extract(data, '$.mentor_id')) VIRTUAL,
+    shared_at TEXT GENERATED ALWAYS AS (json_extract(data, '$.shared_at')) VIRTUAL,
+    viewed INTEGER GENERATED ALWAYS AS (json_extract(data, '$.viewed')) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS idx_shared_reflections_mentor ON shared_reflections (mentor_id, shared_at);
+CREATE INDEX IF NOT EXISTS idx_shared_reflections_viewed ON shared_reflections (mentor_id, viewed);
+
+CREATE TABLE IF NOT EXISTS archetypes (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS dilemmas (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS persona_meta (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS choices (
+    id TEXT PRIMARY KEY,
+    dilemma_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_choices_dilemma_id ON choices (dilemma_id);
+"""
+
+
+def _now() -> str:
+    """Current UTC time as an ISO 8601 string (sorts chronologically as text)."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _dumps(data: dict) -> str:
+    # Sets (e.g. learned_vocab) are stored as sorted lists, as Firestore would reject them.
+    return json.dumps(data, default=lambda o: sorted(o) if isinstance(o, (set, frozenset)) else str(o))
+
+
+class SQLiteRepository(Repository):
+    """
+    Repository backed by a local SQLite database file.
+
+    Connections are per thread; a single instance can be shared by every
+    request handled in a worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        self._migrate(conn)
+        conn.executescript(_SCHEMA)
+        logging.info(f"SQLite storage ready at {path}")
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Adds columns introduced after a database file was created."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(shared_reflections)")}
+        if columns and 'viewed' not in columns:
+            conn.execute("ALTER TABLE shared_reflections ADD COLUMN viewed INTEGER "
+                         "GENERATED ALWAYS AS (json_extract(data, '$.viewed')) VIRTUAL")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql: str, params=()) -> list:
+        return self._connection().execute(sql, params).fetchall()
+
+    def _execute(self, sql: str, params=()) -> int:
+        return self._connection().execute(sql, params).rowcount
+
+    @staticmethod
+    def _doc(row, with_id: bool = True) -> dict:
+        data = json.loads(row['data'])
+        if with_id:
+            data['id'] = row['id']
+        return data
+
+    def _get(self, table: str, doc_id: str) -> dict | None:
+        rows = self._query(f"SELECT id, data FROM {table} WHERE id = ?", (doc_id,))
+        return self._doc(rows[0], with_id=False) if rows else None
+
+    @contextmanager
+    def _transaction(self):
+        """Runs the block in a write transaction (taking the write lock up front)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _merge_in(conn, table: str, doc_id: str, updates: dict, increments: dict | None = None,
+                  summaries: dict | None = None):
+        """
+        Shallow-merges `updates` (adds `increments`, sets or removes `summaries`
+        in 'character_summaries') into a document within a transaction, creating it if needed.
+        """
+        rows = conn.execute(f"SELECT data FROM {table} WHERE id = ?", (doc_id,)).fetchall()
+        data = json.loads(rows[0]['data']) if rows else {}
+        data.update(updates)
+        for field, amount in (increments or {}).items():
+            data[field] = (data.get(field) or 0) + amount
+        for char_id, summary in (summaries or {}).items():
+            if summary is None:
+                data.get('character_summaries', {}).pop(char_id, None)
+            else:
+                data.setdefault('character_summaries', {})[char_id] = summary
+        conn.execute(f"INSERT INTO {table} (id, data) VALUES (?, ?) "
+                     f"ON CONFLICT(id) DO UPDATE SET data = excluded.data", (doc_id, _dumps(data)))
+
+    def _merge(self, table: str, doc_id: str, updates: dict):
+        """Shallow-merges `updates` into a document, creating it if needed."""
+        with self._transaction() as conn:
+            self._merge_in(conn, table, doc_id, updates)
+
+    # --- Characters ---
+
+    def list_characters(self, user_id: str, fields: list | None = None) -> list[dict]:
+        if not fields:
+            return [self._doc(row) for row in self._query("SELECT id, data FROM characters WHERE user_id = ?", (user_id,))]
+        # Extract only the requested fields instead of decoding whole documents.
+        columns = ', '.join(f"json_extract(data, ?) AS f{i}" for i in range(len(fields)))
+        rows = self._query(f"SELECT id, {columns} FROM characters WHERE user_id = ?",
+                           [f'$.{field}' for field in fields] + [user_id])
+        return [{'id': row['id'], **{field: row[f'f{i}'] for i, field in enumerate(fields) if row[f'f{i}'] is not None}}
+                for row in rows]
+
+    def get_character(self, char_id: str) -> tuple[dict | None, object]:
+        rows = self._query("SELECT data, update_time FROM characters WHERE id = ?", (char_id,))
+        return (json.loads(rows[0]['data']), rows[0]['update_time']) if rows else (None, None)
+
+    def get_character_version(self, char_id: str) -> object:
+        rows = self._query("SELECT update_time FROM characters WHERE id = ?", (char_id,))
+        return rows[0]['update_time'] if rows else None
+
+    def new_character_id(self) -> str:
+        return _new_id()
+
+    @staticmethod
+    def _create_character_in(conn, char_id: str, data: dict) -> int:
+        update_time = time.time_ns()
+        try:
+            conn.execute("INSERT INTO characters (id, data, update_time) VALUES (?, ?, ?)",
+                         (char_id, _dumps(data), update_time))
+        except sqlite3.IntegrityError:
+            raise ConflictError(char_id, f"Character {char_id} already exists.")
+        return update_time
+
+    @staticmethod
+    def _set_character_in(conn, char_id: str, data: dict, owner_id: str | None, expected_update_time) -> int:
+        rows = conn.execute("SELECT data, update_time FROM characters WHERE id = ?", (char_id,)).fetchall()
+        if not rows and expected_update_time is not None:
+            raise ConflictError(char_id, f"Character {char_id} no longer exists.")
+        if not rows and owner_id is not None and data.get('user_id') != owner_id:
+            raise OwnershipError(char_id, owner_id)
+        stored = json.loads(rows[0]['data']) if rows else {}
+        if expected_update_time is not None and rows[0]['update_time'] != expected_update_time:
+            raise ConflictError(char_id)
+        if rows and owner_id is not None and stored.get('user_id') != owner_id:
+            raise OwnershipError(char_id, owner_id)
+        stored.update(data)
+        # Strictly increasing, so every write yields a distinct version.
+        update_time = max(time.time_ns(), rows[0]['update_time'] + 1 if rows else 0)
+        conn.execute("INSERT INTO characters (id, data, update_time) VALUES (?, ?, ?) "
+                     "ON CONFLICT(id) DO UPDATE SET data = excluded.data, update_time = excluded.update_time",
+                     (char_id, _dumps(stored), update_time))
+        return update_time
+
+    def create_character(self, char_id: str, data: dict) -> object:
+        with self._transaction() as conn:
+            return self._create_character_in(conn, char_id, data)
+
+    def set_character(self, char_id: str, data: dict, owner_id: str | None = None,
+                      expected_update_time=None) -> object:
+        with self._transaction() as conn:
+            return self._set_character_in(conn, char_id, data, owner_id, expected_update_time)
+
+    def delete_character(self, char_id: str):
+        self._execute("DELETE FROM characters WHERE id = ?", (char_id,))
+
+    # --- Conversation Log ---
+    # Each segment row holds a JSON object of {offset: message}; appends are
+    # json_patch()ed in, so only the new messages are written.
+
+    @staticmethod
+    def _append_conversation_in(conn, char_id: str, start: int, messages: list, segment_size: int):
+        segments = {}
+        for index, message in enumerate(messages, start):
+            segments.setdefault(index // segment_size, {})[str(index % segment_size)] = message
+        conn.executemany(
+            "INSERT INTO conversation_segments (char_id, seq, messages) VALUES (?, ?, ?) "
+            "ON CONFLICT(char_id, seq) DO UPDATE SET messages = json_patch(messages, excluded.messages)",
+            [(char_id, seq, _dumps(entries)) for seq, entries in segments.items()])
+
+    def append_conversation(self, char_id: str, start: int, messages: list, segment_size: int):
+        with self._transaction() as conn:
+            self._append_conversation_in(conn, char_id, start, messages, segment_size)
+
+    def get_conversation(self, char_id: str, start: int, end: int, segment_size: int) -> list:
+        if end <= start:
+            return []
+        rows = self._query("SELECT seq, messages FROM conversation_segments WHERE char_id = ? AND seq BETWEEN ? AND ? ORDER BY seq",
+                           (char_id, start // segment_size, (end - 1) // segment_size))
+        by_index = {}
+        for row in rows:
+            for offset, message in json.loads(row['messages']).items():
+                by_index[row['seq'] * segment_size + int(offset)] = message
+        return [by_index[i] for i in range(start, end) if i in by_index]
+
+    def delete_conversation(self, char_id: str):
+        self._execute("DELETE FROM conversation_segments WHERE char_id = ?", (char_id,))
+
+    # --- Player Profiles ---
+
+    def get_profile(self, user_id: str, fields: list | None = None) -> dict | None:
+        profile = self._get('player_profiles', user_id)
+        if profile is not None and fields:
+            profile = {field: profile[field] for field in fields if field in profile}
+        return profile
+
+    def find_profile_by_email(self, email: str) -> dict | None:
+        rows = self._query("SELECT id, data FROM player_profiles WHERE email = ? LIMIT 1", (email,))
+        return self._doc(rows[0]) if rows else None
+
+    def update_profile(self, user_id: str, updates: dict):
+        self._merge('player_profiles', user_id, updates)
+
+    def increment_profile_field(self, user_id: str, field: str, amount):
+        path = '$.' + field
+        updated = self._execute(
+            "UPDATE player_profiles SET data = json_set(data, ?, coalesce(json_extract(data, ?), 0) + ?) WHERE id = ?",
+            (path, path, amount, user_id))
+        if not updated:
+            self._merge('player_profiles', user_id, {field: amount})
+
+    def list_custom_vocab_lists(self, user_id: str, active_only: bool = True) -> list[dict]:
+        sql = "SELECT id, data FROM custom_vocab_lists WHERE user_id = ?"
+        if active_only:
+            sql += " AND is_active"
+        return [self._doc(row) for row in self._query(sql, (user_id,))]
+
+    # --- Mentor Connections ---
+
+    def find_connections(self, learner_id: str, mentor_id: str, status: str | None = None,
+                         limit: int | None = None) -> list[dict]:
+        sql = "SELECT id, data FROM mentor_connections WHERE learner_id = ? AND mentor_id = ?"
+        params = [learner_id, mentor_id]
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._doc(row) for row in self._query(sql, params)]
+
+    def add_connection(self, data: dict) -> str:
+        connection_id = _new_id()
+        self._execute("INSERT INTO mentor_connections (id, data) VALUES (?, ?)",
+                      (connection_id, _dumps({**data, 'requested_at': _now()})))
+        return connection_id
+
+    def update_connection(self, connection_id: str, updates: dict, timestamp_field: str | None = None):
+        if timestamp_field:
+            updates = {**updates, timestamp_field: _now()}
+        self._merge('mentor_connections', connection_id, updates)
+
+    # --- Shared Reflections ---
+
+    def add_shared_reflection(self, data: dict) -> str:
+        reflection_id = _new_id()
+        self._execute("INSERT INTO shared_reflections (id, data) VALUES (?, ?)",
+                      (reflection_id, _dumps({**data, 'shared_at': _now()})))
+        return reflection_id
+
+    def list_shared_reflections(self, mentor_id: str, limit: int | None = None,
+                                before: tuple | None = None, after: tuple | None = None) -> list[dict]:
+        # ISO 8601 UTC strings in one format compare chronologically.
+        sql = "SELECT id, data FROM shared_reflections WHERE mentor_id = ?"
+        params = [mentor_id]
+        if before is not None:
+            sql += " AND (shared_at, id) < (?, ?)"
+            params.extend(before)
+        if after is not None:
+            sql += " AND (shared_at, id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY shared_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._doc(row) for row in self._query(sql, params)]
+
+    def count_unviewed_reflections(self, mentor_id: str) -> int:
+        return self._query("SELECT count(*) FROM shared_reflections WHERE mentor_id = ? AND NOT viewed", (mentor_id,))[0][0]
+
+    def mark_reflections_viewed(self, mentor_id: str, shared_ids: list) -> int:
+        if not shared_ids:
+            return 0
+        placeholders = ', '.join('?' for _ in shared_ids)
+        return self._execute(
+            f"UPDATE shared_reflections SET data = json_set(data, '$.viewed', json('true')) "
+            f"WHERE mentor_id = ? AND NOT viewed AND id IN ({placeholders})", [mentor_id, *shared_ids])
+
+    # --- Units of Work ---
+
+    def commit(self, unit) -> dict:
+        update_times = {}
+        with self._transaction() as conn:
+            for char_id, write in unit.characters.items():
+                if write['create']:
+                    update_times[char_id] = self._create_character_in(conn, char_id, write['data'])
+                else:
+                    update_times[char_id] = self._set_character_in(conn, char_id, write['data'],
+                                                                    write['owner_id'], write['expected'])
+            for user_id, write in unit.profiles.items():
+                self._merge_in(conn, 'player_profiles', user_id, write['updates'], write['increments'], write['summaries'])
+            for char_id, append in unit.conversations.items():
+                self._append_conversation_in(conn, char_id, append['start'], append['messages'], append['segment_size'])
+        return update_times
+
+    # --- Background Jobs ---
+
+    def create_job(self, data: dict) -> str:
+        job_id = _new_id()
+        self._execute("INSERT INTO jobs (id, data) VALUES (?, ?)", (job_id, _dumps(data)))
+        return job_id
+
+    def update_job(self, job_id: str, updates: dict):
+        self._merge('jobs', job_id, updates)
+
+    def get_job(self, job_id: str) -> dict | None:
+        return self._get('jobs', job_id)
+
+    # --- Persona Quiz ---
+
+    def list_archetypes(self) -> list[dict]:
+        return [self._doc(row) for row in self._query("SELECT id, data FROM archetypes ORDER BY id")]
+
+    def list_dilemmas(self) -> list[dict]:
+        choices = {}
+        for row in self._query("SELECT id, dilemma_id, data FROM choices ORDER BY id"):
+            choices.setdefault(row['dilemma_id'], []).append(self._doc(row))
+        dilemmas = []
+        for row in self._query("SELECT id, data FROM dilemmas ORDER BY id"):
+            dilemma = self._doc(row)
+            dilemma['choices'] = choices.get(row['id'], [])
+            dilemmas.append(dilemma)
+        return dilemmas
+
+    def get_persona_content_version(self) -> object:
+        content = self._get('persona_meta', 'content')
+        return content.get('version') if content else None
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,58 @@
+# unit_of_work.py - Mutations collected during a request and committed together
+#
+# Route handlers and helpers record character saves and profile updates as they
+# go; the repository commits the whole unit at the end of the request in one
+# batch/transaction, so a request costs one write round trip and its changes to
+# several documents apply atomically (see Repository.commit).
+
+
+class UnitOfWork:
+    """
+    Pending character and profile mutations.
+
+    characters: char_id -> {'data', 'owner_id', 'expected', 'create'}; `data`
+        is merged field by field across saves, `expected` is the update_time the
+        first save was based on (see Repository.set_character).
+    profiles: user_id -> {'updates': {field: value}, 'increments': {field: amount},
+        'summaries': {char_id: summary, or None to remove it}}
+    conversations: char_id -> {'start', 'messages', 'segment_size'}; messages
+        appended to the character's conversation log from index `start` on.
+    """
+
+    def __init__(self):
+        self.characters = {}
+        self.profiles = {}
+        self.conversations = {}
+
+    def __bool__(self):
+        return bool(self.characters or self.profiles or self.conversations)
+
+    def save_character(self, char_id: str, data: dict, owner_id: str, expected_update_time=None, create: bool = False):
+        write = self.characters.setdefault(char_id, {
+            'data': {}, 'owner_id': owner_id, 'expected': expected_update_time, 'create': create})
+        write['data'].update(data)
+
+    def _profile(self, user_id: str) -> dict:
+        return self.profiles.setdefault(user_id, {'updates': {}, 'increments': {}, 'summaries': {}})
+
+    def update_profile(self, user_id: str, updates: dict):
+        profile = self._profile(user_id)
+        for field, value in updates.items():
+            profile['increments'].pop(field, None)  # a later assignment overrides earlier increments
+            profile['updates'][field] = value
+
+    def increment_profile_field(self, user_id: str, field: str, amount):
+        profile = self._profile(user_id)
+        if field in profile['updates']:
+            profile['updates'][field] = (profile['updates'][field] or 0) + amount
+        else:
+            profile['increments'][field] = profile['increments'].get(field, 0) + amount
+
+    def set_character_summary(self, user_id: str, char_id: str, summary: dict | None):
+        """Sets (or, with None, removes) one entry of the profile's 'character_summaries' map."""
+        self._profile(user_id)['summaries'][char_id] = summary
+
+    def append_conversation(self, char_id: str, start: int, messages: list, segment_size: int):
+        """Records messages for indices start, start + 1, ...; later appends in the same unit follow on."""
+        append = self.conversations.setdefault(char_id, {'start': start, 'messages': [], 'segment_size': segment_size})
+        append['messages'].extend(messages)
@@ -26,9 +26,10 @@ def get_external_services_status():
         status['firebase'] = {'status': 'Error', 'reason': 'Firebase app object not found or failed to initialize.'}
 
     # Check Google AI status
-    if model_instance:
-        # The model object itself doesn't have a public name property, so we hardcode it.
-        status['google_ai'] = {'status': 'Connected', 'model': 'gemini-1.5-flash-latest'}
+    if current_app.config.get('AI_PROVIDER') == 'local':
+        status['google_ai'] = {'status': 'Bypassed', 'model': 'Local stand-in (AI_PROVIDER=local)'}
+    elif model_instance:
+        status['google_ai'] = {'status': 'Connected', 'model': current_app.config.get('AI_MODEL_NAME')}
     elif bypassed:
         status['google_ai'] = {'status': 'Bypassed'}
     else:
@@ -36,6 +37,22 @@ def get_external_services_status():
 
     return status
 
+def get_cache_stats():
+    """Hit/miss counters of the per-worker caches registered in app.extensions."""
+    stats = []
+    for name, cache in sorted(current_app.extensions.items()):
+        if not (hasattr(cache, 'hits') and hasattr(cache, 'misses')):
+            continue
+        hits = cache.hits + getattr(cache, 'revalidations', 0)
+        lookups = hits + cache.misses
+        stats.append({
+            'name': name,
+            'hits': hits,
+            'misses': cache.misses,
+            'hit_rate': f"{hits / lookups:.0%}" if lookups else 'N/A'
+        })
+    return stats
+
 def get_vision_alignment():
     """Compares the current implementation with the long-term project vision."""
     return [
@@ -82,6 +99,7 @@ def diagnostics_view():
     diagnostics_data = {
         'app_mode': 'Debug' if current_app.debug else 'Production',
         'services': get_external_services_status(),
+        'caches': get_cache_stats(),
         'vision_alignment': get_vision_alignment()
     }
 
@@ -0,0 +1,134 @@
+# term_matcher.py - Precompiled multi-term matcher for vocabulary and lore highlighting
+
+import itertools
+import re
+from collections.abc import Mapping
+
+_WORD_BOUNDARY_RE = re.compile(r'\b')
+
+# Key used inside trie nodes to mark the end of a term. Every other key is a
+# single character, so None can never collide with one.
+_TERMINAL = None
+
+# Every matcher gets a unique generation number so caches of rendered output
+# can tell when the vocabulary they were built against has been replaced.
+_generation_counter = itertools.count(1)
+
+
+def _fold(text: str) -> str:
+    """
+    Lowercases text while keeping a 1:1 mapping between character positions.
+
+    A handful of characters (e.g. 'İ') expand to several characters when
+    lowercased; those are left untouched so match offsets stay valid for the
+    original string.
+    """
+    folded = text.lower()
+    if len(folded) != len(text):
+        folded = ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+    return folded
+
+
+class TermMatcher:
+    """
+    Finds every term of a dictionary in a piece of text in a single pass.
+
+    The terms are compiled once into a character trie. Matching walks the trie
+    from each word boundary of the text, so the cost of a call grows with the
+    length of the text rather than with the number of terms. The results are
+    the same as scanning the text once per term:
+    - matching is case-insensitive,
+    - a term must start and end on a word boundary (regex ``\\b``),
+    - when matches overlap, the longest term wins.
+
+    Build one matcher when a vocabulary or lore dictionary is loaded and reuse
+    it for every call.
+    """
+
+    def __init__(self, terms_dict: Mapping, key_transform=lambda k: k.lower()):
+        transformed_map = {}
+        if isinstance(terms_dict, Mapping):
+            for k, v in terms_dict.items():
+                key = key_transform(k)
+                if key:
+                    transformed_map[key] = (k, v)
+
+        # Rank terms the same way the per-term scan ordered them: longest first,
+        # ties broken by dictionary order.
+        sorted_keys = sorted(transformed_map.keys(), key=len, reverse=True)
+        self._root = {}
+        for rank, key in enumerate(sorted_keys):
+            original, data = transformed_map[key]
+            node = self._root
+            for ch in _fold(key):
+                node = node.setdefault(ch, {})
+            # Two keys can fold to the same string; the first (higher ranked) wins.
+            node.setdefault(_TERMINAL, (rank, original, data))
+        self._term_count = len(sorted_keys)
+        self.generation = next(_generation_counter)
+
+    def __len__(self):
+        return self._term_count
+
+    def find(self, text: str) -> list:
+        """
+        Finds all non-overlapping terms in the text.
+
+        Args:
+            text: The text to search.
+
+        Returns:
+            A list of (start, end, original_key, data) tuples sorted by start.
+        """
+        if not text or not self._term_count:
+            return []
+
+        folded = _fold(text)
+        length = len(folded)
+        boundaries = {m.start() for m in _WORD_BOUNDARY_RE.finditer(text)}
+        root = self._root
+
+        # 1. Collect every candidate occurrence of every term.
+        candidates = []
+        for start in boundaries:
+            node = root
+            pos = start
+            while pos < length:
+                node = node.get(folded[pos])
+                if node is None:
+                    break
+                pos += 1
+                term = node.get(_TERMINAL)
+                if term is not None and pos in boundaries:
+                    candidates.append((term[0], start, pos, term))
+
+        # 2. Resolve overlaps: higher ranked (longer) terms claim their spans first.
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        taken = bytearray(length)
+        found = []
+        current_rank, scan_pos = -1, 0
+        for rank, start, end, term in candidates:
+            if rank != current_rank:
+                current_rank, scan_pos = rank, 0
+            # Occurrences of the same term never overlap each other.
+            if start < scan_pos:
+                continue
+            scan_pos = end
+            if taken.find(1, start, end) == -1:
+                taken[start:end] = b'\x01' * (end - start)
+                found.append((start, end, term[1], term[2]))
+
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def find_many(self, texts) -> list:
+        """
+        Matches several texts in one call.
+
+        Args:
+            texts: An iterable of strings.
+
+        Returns:
+            A list with one result list (as returned by ``find``) per text.
+        """
+        return [self.find(text) for text in texts]
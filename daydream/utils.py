@@ -1,18 +1,29 @@
 import logging
+import html
 import json
 import re
 from functools import wraps
 import uuid
+import copy
+from collections.abc import Mapping
 
-from flask import session, flash, redirect, url_for, request, current_app
-from google.cloud.firestore_v1.base_query import FieldFilter
+from flask import session, flash, redirect, url_for, request, current_app, g, has_request_context, jsonify
 from .quests import get_quest, get_quest_step, HERO_JOURNEY_STAGES
-from .vocabulary import calculate_xp, AWL_WORDS, AWL_DEFINITIONS
+from .vocabulary import calculate_xp, AWL_WORDS, AWL_DEFINITIONS, get_vocabulary_snapshot
+from .vocabulary.user_vocab import UserVocabulary, merge_user_vocabulary
 from .lore import thetopia_lore
+from .term_matcher import TermMatcher
+from .storage import get_repository, UnitOfWork, OwnershipError, ConflictError
+from .storage.profile_cache import PROFILE_FIELDS, covers
+from .ai.providers import get_ai_provider
+from .ai.cache import cache_key
 
 # --- Constants ---
 MAX_INPUT_LENGTH = 500
 MAX_CONVO_LINES = 100
+CHARACTER_SUMMARY_FIELDS = ('name', 'race_name', 'class_name')  # listed on the profile page
+CONVERSATION_SEGMENT_SIZE = 50  # messages per stored segment of the conversation log
+CONVERSATION_TAIL_LINES = 20  # newest messages kept on the character document
 STARTING_LOCATION = "Thetopia - Town Square"
 BASE_FATE_POINTS = 1
 EOC_CHECK_START_TURN = 10
@@ -43,76 +54,148 @@ SESSION_CHAPTER_INPUTS = 'chapter_player_inputs'
 SESSION_EOC_STATE = 'eoc_state'
 SESSION_EOC_QUESTIONS = 'eoc_comp_questions'
 SESSION_EOC_SUMMARY = 'eoc_report_summary'
+SESSION_EOC_JOB = 'eoc_job_id'
 SESSION_EOC_PROMPTED = 'eoc_prompted_this_turn'
 SESSION_NEW_CHAR_DETAILS = 'new_char_details'
 SESSION_AI_RECOMMENDATIONS = 'ai_recommendations'
 SESSION_SIDE_QUEST_ACTIVE = 'side_quest_active'
 SESSION_SIDE_QUEST_DESC = 'side_quest_description'
 SESSION_SIDE_QUEST_TURNS = 'side_quest_turns'
-FS_CONVERSATION = 'conversation_log'
+FS_CONVERSATION = 'conversation_log'  # the tail of the log; the full log is stored in segments
+FS_CONVERSATION_COUNT = 'conversation_count'
 FS_CHAPTER_INPUTS = 'current_chapter_inputs'
+FS_EOC_JOB = 'pending_eoc_job'  # the end-of-chapter job allowed to commit this chapter's report
 FS_QUEST_FLAGS = 'quest_flags'
 FS_INVENTORY = 'inventory'
 FS_PLAYER_HAS_SEEN_INTRO = 'has_seen_intro'
 
-def find_terms_in_text(text: str, terms_dict: dict, key_transform=lambda k: k.lower()) -> list:
-    found = []
-    if not isinstance(terms_dict, dict) or not text: return found
-    transformed_map = {key_transform(k): {"original": k, "data": v} for k, v in terms_dict.items() if key_transform(k)}
-    sorted_keys = sorted(transformed_map.keys(), key=len, reverse=True)
-    processed_indices = set()
-    for term_key in sorted_keys:
-        term_info = transformed_map[term_key]
-        try:
-            for match in re.finditer(r'\b' + re.escape(term_key) + r'\b', text, re.IGNORECASE):
-                if not any(i in processed_indices for i in range(match.start(), match.end())):
-                    found.append((match.start(), match.end(), term_info["original"], term_info["data"]))
-                    processed_indices.update(range(match.start(), match.end()))
-        except re.error as e: logging.error(f"Regex error: {e}")
-    return sorted(found, key=lambda item: item[0])
+def find_terms_in_text(text: str, terms_dict, key_transform=lambda k: k.lower()) -> list:
+    """
+    Finds vocabulary/lore terms in text. `terms_dict` may be a plain dict or a
+    prebuilt TermMatcher; passing the matcher avoids recompiling the terms.
+    """
+    if not text: return []
+    if isinstance(terms_dict, TermMatcher): return terms_dict.find(text)
+    if not isinstance(terms_dict, Mapping): return []
+    return TermMatcher(terms_dict, key_transform).find(text)
+
+def find_terms_in_texts(texts: list, terms_dict, key_transform=lambda k: k.lower()) -> list:
+    """Matches many texts at once, compiling the terms a single time."""
+    matcher = terms_dict if isinstance(terms_dict, TermMatcher) else TermMatcher(terms_dict, key_transform)
+    return matcher.find_many(texts)
 
 def process_text_for_highlighting(text: str, terms: list, span_class: str, **kwargs) -> str:
-    if not terms or not text: return text
+    """
+    Wraps each found term in a <span>. The text and every attribute value are
+    HTML-escaped, so the result is safe to render with |safe. Optional kwargs:
+    - title_formatter(data): text for the title attribute.
+    - class_formatter(data): overrides `span_class` per term.
+    - data_attrs_formatter(data): dict of extra data-* attributes.
+    """
+    if not text: return text
+    if not terms: return html.escape(text)
     result_parts, last_end = [], 0
     for start, end, original, data in terms:
-        result_parts.append(text[last_end:start])
-        attrs = f'class="{span_class}"'
+        result_parts.append(html.escape(text[last_end:start]))
+        span_classes = kwargs.get('class_formatter', lambda d: span_class)(data)
+        attrs = f'class="{html.escape(str(span_classes))}"'
         if (title := kwargs.get('title_formatter', lambda d: '')(data)):
-            attrs += f' title="{str(title).replace("\"", "&quot;")}"'
-        result_parts.append(f'<span {attrs.strip()}>{text[start:end]}</span>')
+            attrs += f' title="{html.escape(str(title))}"'
+        for attr_name, attr_value in kwargs.get('data_attrs_formatter', lambda d: {})(data).items():
+            attrs += f' data-{attr_name}="{html.escape(str(attr_value))}"'
+        result_parts.append(f'<span {attrs}>{html.escape(text[start:end])}</span>')
         last_end = end
-    result_parts.append(text[last_end:])
+    result_parts.append(html.escape(text[last_end:]))
     return "".join(result_parts)
 
 def get_ai_response(prompt_type: str, context: dict) -> str | dict:
-    # ... (full implementation from original app.py)
-    return "This is a mock AI response."
+    """
+    The single gateway to the model, through the provider selected by
+    AI_PROVIDER (see ai/providers.py). Responses to prompt types with a cache TTL
+    are served from the AI response cache when the same context was answered
+    before by the same model version (see ai/cache.py); errors are not cached.
+    Identical calls made at the same time share one model call (see ai/singleflight.py).
+    """
+    cache = current_app.extensions.get('ai_response_cache')
+    if cache is not None:
+        cached = cache.get(prompt_type, context)
+        if cached is not None:
+            return cached
+
+    def call():
+        response = get_ai_provider().generate(prompt_type, context)
+        if cache is not None and not (isinstance(response, dict) and 'error' in response):
+            cache.put(prompt_type, context, response)
+        return response
+
+    flight = current_app.extensions.get('ai_singleflight')
+    if flight is None:
+        return call()
+    return flight.do(cache_key(prompt_type, context, current_app.config['AI_MODEL_VERSION']), call)
+
+def _character_summary(character_data: dict) -> dict:
+    """The fields shown in character listings, as kept in the profile's 'character_summaries' map."""
+    return {field: character_data[field] for field in CHARACTER_SUMMARY_FIELDS if field in character_data}
 
 def get_user_characters(user_id:str) -> list[dict]:
-    """Fetches a list of characters for a given user ID from Firestore."""
-    chars = []
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    """
+    Fetches a list of characters for a given user ID.
+
+    The listing comes from the 'character_summaries' map on the player
+    profile (one small read, usually shared with the rest of the request). For
+    profiles created before that index existed, the characters are listed with
+    a projected query instead and the index is backfilled.
+    """
+    repository = get_repository()
+    if repository is None:
         logging.info(f"Bypassing character fetch for user {user_id}.")
         return [{"id": "dummy_char_123", "name": "Bypass Charlie", "race": "Human", "class": "Developer"}]
 
+    chars = []
     try:
-        docs_query = db.collection('characters').where(filter=FieldFilter('user_id', '==', user_id))
-        docs_stream = docs_query.stream()
-        for doc in docs_stream:
-            d = doc.to_dict()
+        profile = get_player_profile(user_id, ['character_summaries']) or {}
+        summaries = profile.get('character_summaries')
+        if summaries is None:
+            summaries = {d['id']: _character_summary(d) for d in repository.list_characters(user_id, list(CHARACTER_SUMMARY_FIELDS))}
+            for char_id, summary in summaries.items():
+                _set_character_summary(user_id, char_id, summary)
+        for char_id, d in sorted(summaries.items()):
             chars.append({
-                "id": doc.id, "name": d.get("name", "Unnamed Character"),
+                "id": char_id, "name": d.get("name", "Unnamed Character"),
                 "race": d.get("race_name", "Unknown Race"), "class": d.get("class_name", "Unknown Class")
             })
     except Exception as e:
         logging.error(f"Failed to fetch characters for user {user_id}: {e}", exc_info=True)
     return chars
 
-def load_character_data(user_id: str, char_id: str) -> dict | None:
-    """Loads a specific character's data from Firestore."""
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+def _set_character_summary(user_id: str, char_id: str, summary: dict | None):
+    """Updates (or, with None, removes) a character's entry in the profile's listing index."""
+    unit = get_unit_of_work()
+    if unit is not None:
+        unit.set_character_summary(user_id, char_id, summary)
+    else:
+        unit = UnitOfWork()
+        unit.set_character_summary(user_id, char_id, summary)
+        _commit(get_repository(), unit)
+    invalidate_player_profile(user_id)
+
+def remove_character_summary(user_id: str, char_id: str):
+    """Drops a deleted character from the user's listing index."""
+    _set_character_summary(user_id, char_id, None)
+
+def load_character_data(user_id: str, char_id: str, loaded: tuple | None = None) -> dict | None:
+    """
+    Loads a specific character's data, served from the per-worker character
+    cache when it is still current (see storage/character_cache.py).
+
+    The loaded version is remembered for the request so that a later save can
+    be guarded against concurrent modification (see save_character_data).
+
+    loaded: a (data, update_time) pair already read from the character cache,
+        e.g. by fetch_concurrently; it is checked and recorded as if loaded here.
+    """
+    repository = get_repository()
+    if repository is None:
         logging.info(f"Bypassing character load for char_id {char_id}.")
         # Return a dummy character structure for bypass mode
         return {
@@ -122,11 +205,11 @@ def load_character_data(user_id: str, char_id: str) -> dict | None:
             "location": STARTING_LOCATION
         }
     try:
-        doc_ref = db.collection('characters').document(char_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            char_data = doc.to_dict()
+        char_data, update_time = loaded or current_app.extensions['character_cache'].get(repository, char_id)
+        if char_data is not None:
             if char_data.get('user_id') == user_id:
+                if has_request_context():
+                    g.setdefault('loaded_character_versions', {})[char_id] = update_time
                 return char_data
             else:
                 logging.warning(f"User {user_id} attempted to load character {char_id} they do not own.")
@@ -134,46 +217,287 @@ def load_character_data(user_id: str, char_id: str) -> dict | None:
         logging.error(f"Failed to load character {char_id} for user {user_id}: {e}", exc_info=True)
     return None
 
+def get_unit_of_work() -> UnitOfWork | None:
+    """Returns the current request's UnitOfWork (created on first use), or None outside a request."""
+    if not has_request_context():
+        return None
+    if 'unit_of_work' not in g:
+        g.unit_of_work = UnitOfWork()
+    return g.unit_of_work
+
 def save_character_data(user_id: str, character_data: dict) -> str | None:
-    """Saves character data to Firestore."""
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    """
+    Saves character data.
+
+    The cached copy is updated immediately. During a request the write is
+    recorded in the request's unit of work: every save of the same character
+    is merged, and all of the request's mutations are committed together when
+    it ends (see commit_unit_of_work).
+
+    Each character write is guarded by the version this request loaded (or
+    the cached version), so a concurrent change made by another request
+    raises ConflictError instead of being overwritten. Outside a request the
+    write happens immediately and ConflictError propagates to the caller;
+    ownership violations are logged and return None.
+    """
+    repository = get_repository()
+    if repository is None:
         logging.info(f"Bypassing character save for user {user_id}.")
         return character_data.get("id", "dummy_char_123") # Return dummy ID
 
-    char_id = character_data.get('id')
-    if not char_id:
-        # Create new character if no ID
-        char_ref = db.collection('characters').document()
-        character_data['id'] = char_ref.id
-        character_data['user_id'] = user_id
+    cache = current_app.extensions['character_cache']
+    try:
+        char_id = character_data.get('id')
+        create = not char_id
+        expected = None
+        cached = None
+        if create:
+            character_data['id'] = char_id = repository.new_character_id()
+            character_data['user_id'] = user_id
+        else:
+            # Ownership is checked in memory against the loaded/cached copy;
+            # the guarded write re-checks it when neither is available.
+            cached, cached_version = cache.peek(char_id)
+            if cached is not None and cached.get('user_id') != user_id:
+                raise OwnershipError(char_id, user_id)
+            loaded = g.get('loaded_character_versions', {}) if has_request_context() else {}
+            expected = loaded.get(char_id, cached_version)
+
+        # Keep the listing index on the profile in step when a listed field changes.
+        summary = _character_summary({**(cached or {}), **character_data})
+        summary_changed = cached is None or summary != _character_summary(cached)
+
+        unit = get_unit_of_work()
+        if unit is not None:
+            unit.save_character(char_id, copy.deepcopy(character_data), user_id, expected, create)
+            if summary_changed:
+                unit.set_character_summary(user_id, char_id, summary)
+            cache.update(char_id, character_data)
+        else:
+            unit = UnitOfWork()
+            unit.save_character(char_id, character_data, user_id, expected, create)
+            if summary_changed:
+                unit.set_character_summary(user_id, char_id, summary)
+            _commit(repository, unit)
+        if summary_changed:
+            invalidate_player_profile(user_id)
+        return char_id
+    except OwnershipError as e:
+        logging.error(f"Refused to save character: {e}")
+    except ConflictError:
+        raise
+    except Exception as e:
+        logging.error(f"Failed to save character {character_data.get('id')} for user {user_id}: {e}", exc_info=True)
+    return None
+
+def update_player_profile(user_id: str, updates: dict):
+    """Sets profile fields; deferred to the end of the request like character saves."""
+    unit = get_unit_of_work()
+    if unit is not None:
+        unit.update_profile(user_id, updates)
     else:
-        # Update existing character
-        char_ref = db.collection('characters').document(char_id)
-        # Verify ownership before saving
-        if char_ref.get().to_dict().get('user_id') != user_id:
-            logging.error(f"User {user_id} attempted to save character {char_id} they do not own.")
-            return None
+        get_repository().update_profile(user_id, updates)
+    invalidate_player_profile(user_id)
 
+def increment_player_profile(user_id: str, field: str, amount):
+    """Atomically adds `amount` to a numeric profile field; deferred to the end of the request."""
+    unit = get_unit_of_work()
+    if unit is not None:
+        unit.increment_profile_field(user_id, field, amount)
+    else:
+        get_repository().increment_profile_field(user_id, field, amount)
+    invalidate_player_profile(user_id)
+
+def _commit(repository, unit: UnitOfWork):
+    """Commits a unit of work and records the new character versions in the cache."""
+    cache = current_app.extensions['character_cache']
     try:
-        char_ref.set(character_data, merge=True)
-        return character_data['id']
+        update_times = repository.commit(unit)
+    except Exception:
+        for char_id in unit.characters:
+            cache.invalidate(char_id)
+        raise
+    for user_id in unit.profiles:
+        current_app.extensions['profile_cache'].invalidate(user_id)
+    for char_id, write in unit.characters.items():
+        if update_times.get(char_id) is None:
+            cache.invalidate(char_id)  # new version unknown; the next load re-reads it
+        else:
+            cache.update(char_id, write['data'], update_times[char_id])
+
+def commit_unit_of_work_now(unit: UnitOfWork):
+    """
+    Commits a UnitOfWork built outside a request (e.g. by a background job)
+    and updates the caches. Raises ConflictError/OwnershipError like Repository.commit.
+    """
+    _commit(get_repository(), unit)
+
+def _commit_pending_unit_of_work() -> ConflictError | None:
+    """Commits the mutations recorded during this request. Returns the conflict, if any."""
+    unit = g.pop('unit_of_work', None)
+    if not unit:
+        return None
+    try:
+        _commit(get_repository(), unit)
+    except ConflictError as e:
+        logging.warning(f"Discarded this request's changes: {e}")
+        return e
     except Exception as e:
-        logging.error(f"Failed to save character {character_data.get('id')} for user {user_id}: {e}", exc_info=True)
+        logging.error(f"Failed to commit changes to characters {list(unit.characters)} and profiles {list(unit.profiles)}: {e}", exc_info=True)
     return None
 
+def commit_unit_of_work(response):
+    """
+    Commits the mutations recorded during this request. Registered as an
+    after_request handler so that a conflicting concurrent modification can
+    replace the response: API requests get a 409, pages are reloaded with a
+    flash message so the player sees the current state.
+    """
+    conflict = _commit_pending_unit_of_work()
+    if conflict is None:
+        return response
+    message = "Your character was changed elsewhere; your last action was not saved. Please try again."
+    if request.is_json or request.path.startswith('/api/'):
+        response = jsonify({"error": message, "character_id": conflict.doc_id})
+        response.status_code = 409
+        return response
+    flash(message, "warning")
+    return redirect(request.path)
+
+def commit_unit_of_work_on_teardown(exc=None):
+    """
+    Fallback teardown_request handler for mutations recorded after the
+    after_request handlers ran (e.g. while a streamed response was generated).
+    The response has already gone out, so a failed commit cannot be reported
+    to the player: it is logged as an error and re-raised, so the server
+    records the request as failed rather than as a success. If the request had
+    already failed with `exc`, the commit failure is only logged.
+    """
+    unit = g.pop('unit_of_work', None)
+    if not unit:
+        return
+    try:
+        _commit(get_repository(), unit)
+    except Exception as e:
+        logging.error(f"Changes to characters {list(unit.characters)} and profiles {list(unit.profiles)} were not saved after the response was sent: {e}", exc_info=True)
+        if exc is None:
+            raise
+
+def append_conversation(p_data: dict, messages: list):
+    """
+    Appends messages to a character's conversation log.
+
+    Only the new messages are written to the log's segments; the character
+    keeps a short tail (FS_CONVERSATION) and the total count, which the caller
+    persists with save_character_data as usual. During a request the segment
+    write is recorded in the unit of work and committed with that save, so a
+    concurrent turn that appended at the same indices is rejected by the
+    character's version check instead of overwriting them.
+
+    Characters saved before the log was segmented keep their whole history in
+    FS_CONVERSATION and no count; that history becomes the start of the log on
+    their first append.
+    """
+    tail = p_data.get(FS_CONVERSATION, [])
+    count = p_data.get(FS_CONVERSATION_COUNT)
+    if count is None:
+        start, new_messages = 0, tail + messages
+    else:
+        start, new_messages = count, messages
+    repository = get_repository()
+    if repository is not None:
+        unit = get_unit_of_work()
+        if unit is not None:
+            unit.append_conversation(p_data['id'], start, new_messages, CONVERSATION_SEGMENT_SIZE)
+        else:
+            repository.append_conversation(p_data['id'], start, new_messages, CONVERSATION_SEGMENT_SIZE)
+    p_data[FS_CONVERSATION] = (tail + messages)[-CONVERSATION_TAIL_LINES:]
+    p_data[FS_CONVERSATION_COUNT] = start + len(new_messages)
+
+def load_conversation_page(p_data: dict, before: int | None = None, limit: int = CONVERSATION_TAIL_LINES) -> tuple[list, int | None]:
+    """
+    Returns (messages, cursor) for a page of a character's conversation,
+    paging from newest to oldest: `before` is the cursor returned with the
+    previous page (None for the newest page). The returned cursor is None once
+    the start of the log is reached. The newest page is served from the tail
+    cached on the character when it covers it.
+    """
+    tail = p_data.get(FS_CONVERSATION, [])
+    count = p_data.get(FS_CONVERSATION_COUNT)
+    if count is None:
+        count = len(tail)  # not segmented yet: the whole log is the tail
+        stored = tail
+    else:
+        stored = None
+    end = count if before is None else max(0, min(before, count))
+    start = max(0, end - limit)
+    if stored is not None:
+        messages = stored[start:end]
+    elif start >= count - len(tail):
+        messages = tail[len(tail) - (count - start):len(tail) - (count - end)]
+    else:
+        repository = get_repository()
+        messages = repository.get_conversation(p_data['id'], start, end, CONVERSATION_SEGMENT_SIZE) if repository else []
+    return messages, (start if start > 0 else None)
+
+
+def get_player_profile(user_id: str, fields: list | None = None) -> dict | None:
+    """
+    Returns a user's player profile (only `fields`, if given), or None if it
+    does not exist or storage is unavailable.
+
+    The document is read at most once per request: the first read fetches
+    every field in PROFILE_FIELDS (plus any requested ones), and decorators and
+    helpers later in the request are served from `g`. Across requests the
+    optional per-worker ProfileCache (PROFILE_CACHE_TTL) can serve it too.
+    Changes queued with update_player_profile are not visible until committed.
+    """
+    repository = get_repository()
+    if repository is None:
+        return None
+    wanted = frozenset(fields) if fields is not None else None
+    loaded = g.setdefault('player_profiles', {}) if has_request_context() else {}
+    fetched, profile = loaded.get(user_id, (frozenset(), None))
+    if user_id not in loaded or not covers(fetched, wanted):
+        fetch = None if wanted is None else fetched | wanted | PROFILE_FIELDS
+        fetched, profile = current_app.extensions['profile_cache'].get(
+            user_id, fetch, lambda: repository.get_profile(user_id, sorted(fetch) if fetch is not None else None))
+        loaded[user_id] = (fetched, profile)
+    if profile is None:
+        return None
+    if wanted is None:
+        return copy.deepcopy(profile)
+    return {field: copy.deepcopy(profile[field]) for field in wanted if field in profile}
+
+def player_profile_reader(user_id: str):
+    """
+    Returns a callable that reads the profile projection get_player_profile
+    would fetch first, without touching the request (for fetch_concurrently).
+    Hand its result to use_player_profile in the request thread.
+    """
+    repository = get_repository()
+    cache = current_app.extensions['profile_cache']
+    return lambda: cache.get(user_id, PROFILE_FIELDS, lambda: repository.get_profile(user_id, sorted(PROFILE_FIELDS)))
+
+def use_player_profile(user_id: str, read: tuple):
+    """Makes a profile read by player_profile_reader the request's copy (see get_player_profile)."""
+    g.setdefault('player_profiles', {})[user_id] = read
+
+def invalidate_player_profile(user_id: str):
+    """Forgets the loaded and cached copies of a user's profile after it changes."""
+    current_app.extensions['profile_cache'].invalidate(user_id)
+    if has_request_context():
+        g.get('player_profiles', {}).pop(user_id, None)
 
 def check_premium_access(user_id: str) -> bool:
-    """Checks if a user has premium access from their Firestore profile."""
-    db = current_app.config.get('DB')
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
+    """Checks if a user has premium access from their profile."""
+    if get_repository() is None:
         logging.warning("Bypassing premium check; defaulting to False.")
         return False
     try:
-        profile_ref = db.collection('player_profiles').document(user_id)
-        profile = profile_ref.get()
-        if profile.exists:
-            return profile.to_dict().get('has_premium', False)
+        profile = get_player_profile(user_id, ['has_premium'])
+        if profile is not None:
+            return profile.get('has_premium', False)
     except Exception as e:
         logging.error(f"Error checking premium status for user {user_id}: {e}", exc_info=True)
     return False
@@ -203,14 +527,14 @@ def instructor_required(f):
             logging.warning(f"Bypassing instructor check for user {user_id}.")
             return f(*args, **kwargs)
 
-        db = current_app.config.get('DB')
-        if not db:
+        repository = get_repository()
+        if repository is None:
             flash("Database service not available.", "danger")
             return redirect(url_for('profile.profile'))
 
         try:
-            user_profile = db.collection('player_profiles').document(user_id).get()
-            if user_profile.exists and user_profile.to_dict().get('role') == 'instructor':
+            user_profile = get_player_profile(user_id, ['role'])
+            if user_profile is not None and user_profile.get('role') == 'instructor':
                 return f(*args, **kwargs)
             else:
                 flash("You do not have permission to access this page.", "danger")
@@ -245,27 +569,42 @@ def apply_reward(p_data: dict, reward_data: dict | None, user_id: str) -> str |
     save_character_data(user_id, p_data)
     return feedback_message.strip()
 
-def get_active_vocab_data(user_id: str) -> dict:
+def _load_user_vocabulary(repository, user_id: str, awl_snapshot, custom_lists: list | None = None) -> UserVocabulary:
+    """Reads a user's vocab settings and active custom lists and merges them with the AWL."""
+    profile = get_player_profile(user_id, ['vocab_settings']) or {}
+    if custom_lists is None:
+        custom_lists = repository.list_custom_vocab_lists(user_id)
+    return merge_user_vocabulary(profile.get('vocab_settings', {}), awl_snapshot, custom_lists)
+
+def get_active_vocab_data(user_id: str, custom_lists: list | None = None) -> UserVocabulary:
     """
-    Gets the active vocabulary data for a user, combining default and custom lists
-    based on user settings in their Firestore profile.
+    Gets the active vocabulary for a user: the default AWL (unless disabled in
+    their vocab_settings) merged with their active custom lists.
+
+    The merged view and its matcher are cached per user (see vocabulary/user_vocab.py);
+    call invalidate_active_vocab_data after changing a user's lists or settings.
+    Pass `custom_lists` (the user's active lists) when they have already been
+    read, so a cache miss does not read them again.
+
+    Returns:
+        An immutable UserVocabulary with `settings`, `vocab` and `matcher`.
     """
-    db = current_app.config.get('DB')
+    awl_snapshot = get_vocabulary_snapshot()
+    repository = get_repository()
     # Default to using AWL if in bypass mode or if DB fails
-    if not db or current_app.config.get('BYPASS_EXTERNAL_SERVICES'):
-        return {"settings": {"use_default_awl": True}, "vocab": AWL_WORDS}
+    if repository is None:
+        build = lambda: merge_user_vocabulary({"use_default_awl": True}, awl_snapshot, [])
+    else:
+        build = lambda: _load_user_vocabulary(repository, user_id, awl_snapshot, custom_lists)
 
     try:
-        profile_ref = db.collection('player_profiles').document(user_id)
-        profile = profile_ref.get()
-
-        if profile.exists and profile.to_dict().get('vocab_settings', {}).get('use_default_awl', True):
-             # In a real app, you would also fetch and merge custom vocab lists here
-            return {"settings": profile.to_dict().get('vocab_settings'), "vocab": AWL_WORDS}
-        else:
-            # User has disabled the default list and we haven't implemented custom lists yet
-            return {"settings": profile.to_dict().get('vocab_settings', {}), "vocab": {}}
+        return current_app.extensions['user_vocab_cache'].get(user_id, awl_snapshot.generation, build)
     except Exception as e:
         logging.error(f"Failed to get vocab data for user {user_id}: {e}", exc_info=True)
-        # Fallback to default AWL list on error
-        return {"settings": {"use_default_awl": True}, "vocab": AWL_WORDS}
\ No newline at end of file
+        # Fallback to default AWL list on error (not cached, so the next call retries)
+        return merge_user_vocabulary({"use_default_awl": True}, awl_snapshot, [])
+
+def invalidate_active_vocab_data(user_id: str):
+    """Drops the cached merged vocabulary (and profile) for a user after their lists or settings change."""
+    current_app.extensions['user_vocab_cache'].invalidate(user_id)
+    invalidate_player_profile(user_id)
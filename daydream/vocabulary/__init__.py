@@ -1,6 +1,10 @@
 from flask import Blueprint
-from .core import calculate_xp, AWL_WORDS, AWL_DEFINITIONS
+from .core import (
+    calculate_xp, calculate_xp_detailed, calculate_xp_batch, iter_calculate_xp,
+    AWL_WORDS, AWL_DEFINITIONS, AWL_MATCHER, VOCABULARY_STORE,
+    ACTIVE_VOCAB_FILE, vocabulary_registry, get_vocabulary_snapshot
+)
 
 bp = Blueprint('vocabulary', __name__, template_folder='templates')
 
-from . import routes
\ No newline at end of file
+from . import routes
@@ -6,27 +6,39 @@ import json
 import logging
 import os
 
+from ..term_matcher import TermMatcher
+from .store import open_vocabulary_store, DEFAULT_SOURCES
+from .journal import VocabularyJournal, get_vocabulary_journal
+from .registry import VocabularyRegistry, VocabularySnapshot
+from .families import load_word_families
+
 # --- Vocabulary Loading ---
+VOCAB_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def vocabulary_journal(filename="academic_word_list.json") -> VocabularyJournal:
+    """Returns the edit journal for a vocabulary file in the data directory."""
+    return get_vocabulary_journal(os.path.join(VOCAB_DATA_DIR, filename))
+
 def load_vocabulary_from_file(filename="academic_word_list.json"):
     """
-    Loads a vocabulary set from a specified JSON file in the data directory.
+    Loads a vocabulary set from a specified JSON file in the data directory,
+    with any journaled edits (see journal.py) applied on top.
     Args:
         filename (str): The name of the vocabulary file to load.
     Returns:
         dict: A dictionary of words mapped to their sublist/difficulty level.
               Returns an empty dictionary if loading fails.
     """
-    # Correctly construct the path to the data directory relative to this file
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(base_dir, 'data', filename)
+    journal = vocabulary_journal(filename)
+    file_path = journal.base_path
 
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            logging.info(f"Successfully loaded vocabulary from {file_path}")
-            return json.load(f)
-    except FileNotFoundError:
+    if not os.path.exists(file_path) and not os.path.exists(journal.journal_path):
         logging.error(f"Vocabulary file not found at {file_path}. The app may not function correctly.")
         return {}
+    try:
+        vocab_data = journal.load()
+        logging.info(f"Successfully loaded vocabulary from {file_path}")
+        return vocab_data
     except json.JSONDecodeError:
         logging.error(f"Error decoding JSON from {file_path}. Please check the file for syntax errors.")
         return {}
@@ -34,9 +46,14 @@ def load_vocabulary_from_file(filename="academic_word_list.json"):
         logging.error(f"An unexpected error occurred while loading {file_path}: {e}")
         return {}
 
+# Prefer the compiled, memory-mapped store (see store.py) so gunicorn workers
+# share one copy of the vocabulary. Falls back to the JSON files if the store
+# has not been built or is older than its sources.
+VOCABULARY_STORE = open_vocabulary_store()
+
 # Load the default vocabulary set on module import.
 # This can be dynamically replaced later if needed.
-AWL_WORDS = load_vocabulary_from_file()
+AWL_WORDS = VOCABULARY_STORE.words if VOCABULARY_STORE else load_vocabulary_from_file()
 
 # --- XP and Category Configuration ---
 XP_TIERS = {
@@ -54,69 +71,147 @@ SUBLIST_TO_CATEGORY = {
 }
 
 # Pre-calculate category for each word for faster lookup
-AWL_CATEGORIZED = {word: SUBLIST_TO_CATEGORY.get(details.get('sublist'), 'medium') for word, details in AWL_WORDS.items()}
+if VOCABULARY_STORE:
+    AWL_CATEGORIZED = VOCABULARY_STORE.categorized(SUBLIST_TO_CATEGORY)
+else:
+    AWL_CATEGORIZED = {word: SUBLIST_TO_CATEGORY.get(details.get('sublist'), 'medium') for word, details in AWL_WORDS.items()}
+
+# Compile the word list once for highlighting (see utils.find_terms_in_text).
+# Built from the words alone, so the store's entries are not all decoded: each
+# match's data is the word itself (look its details up in AWL_WORDS).
+AWL_MATCHER = TermMatcher({word: word for word in AWL_WORDS})
 
 import json
 import logging
 
 # --- Load AWL Definitions ---
 AWL_DEFINITIONS = {}
-try:
-    with open('awl_definitions.json', 'r', encoding='utf-8') as f:
-        AWL_DEFINITIONS = json.load(f)
-except (FileNotFoundError, json.JSONDecodeError) as e:
-    logging.warning(f"Could not load awl_definitions.json: {e}")
+if VOCABULARY_STORE:
+    AWL_DEFINITIONS = VOCABULARY_STORE.definitions
+else:
+    try:
+        with open(DEFAULT_SOURCES['definitions'], 'r', encoding='utf-8') as f:
+            AWL_DEFINITIONS = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not load awl_definitions.json: {e}")
+
+
+# --- Live Vocabulary Registry ---
+# AWL_WORDS / AWL_CATEGORIZED / AWL_MATCHER above reflect the files at import
+# time. Code that should pick up vocabulary edits without a restart reads the
+# current snapshot instead: vocabulary_registry.snapshot(ACTIVE_VOCAB_FILE).
+ACTIVE_VOCAB_FILE = "academic_word_list.json" # Make this configurable later
+
+vocabulary_registry = VocabularyRegistry(
+    vocabulary_journal, SUBLIST_TO_CATEGORY,
+    definitions=AWL_DEFINITIONS,
+    families=load_word_families(),
+    store=VOCABULARY_STORE,
+)
+
+def get_vocabulary_snapshot(filename=ACTIVE_VOCAB_FILE) -> VocabularySnapshot:
+    """Returns the current immutable snapshot of a vocabulary file."""
+    return vocabulary_registry.snapshot(filename)
 
 
 # --- Main XP Calculation Function ---
 
+# Compiled once; strips punctuation that might interfere with word matching
+# while keeping hyphens within words.
+_PUNCTUATION_RE = re.compile(r'[^\w\s-]')
+
+def _tokenize(player_input_text: str) -> set:
+    """Lowercases, strips punctuation and returns the unique words of an input."""
+    return set(_PUNCTUATION_RE.sub('', player_input_text.lower()).split())
+
+def _score_words(unique_words: set, learned_vocab_set: set, snapshot: VocabularySnapshot) -> tuple[int, dict]:
+    """
+    Awards tiered XP for each AWL word family in `unique_words` not yet learned.
+
+    Inflected forms ("analysed", "analyses") are credited to their headword
+    through the snapshot's precomputed form index, so a family earns XP once.
+
+    Returns:
+        (total_xp_gain, {credited headword: surface form seen in the input})
+    """
+    forms, categorized = snapshot.forms, snapshot.categorized
+    total_xp_gain = 0
+    credited = {}
+    for word in sorted(unique_words):
+        headword = forms.get(word)
+        # Only AWL words the player has not *already learned* earn XP
+        if headword is None or headword in credited or headword in learned_vocab_set:
+            continue
+        category = categorized.get(headword)
+        xp_award = XP_TIERS.get(category, 0) # Get XP for the category, default 0 if somehow missing
+        if xp_award > 0:
+            total_xp_gain += xp_award
+            credited[headword] = word
+    return total_xp_gain, credited
+
+def calculate_xp_detailed(player_input_text: str, learned_vocab_set: set) -> tuple[int, dict]:
+    """
+    Like calculate_xp, but reports which surface form earned each headword.
+
+    Returns:
+        A tuple of total_xp_gain and a dict mapping each newly credited
+        headword to the form the player actually used (e.g. {'analyze': 'analysed'}).
+    """
+    if not player_input_text:
+        return 0, {}
+    return _score_words(_tokenize(player_input_text), learned_vocab_set, get_vocabulary_snapshot())
+
 def calculate_xp(player_input_text: str, learned_vocab_set: set) -> tuple[int, set]:
     """
     Calculates XP based on finding NEW AWL words in player input, using tiered XP.
 
     Args:
         player_input_text: The raw text input from the player.
-        learned_vocab_set: A set of words the player has already learned (and received XP for).
+        learned_vocab_set: A set of headwords the player has already learned (and received XP for).
 
     Returns:
         A tuple containing:
         - total_xp_gain (int): The amount of XP earned from this input.
-        - found_new_awl_words (set): A set of the new AWL words found in this input.
+        - found_new_awl_words (set): The headwords of the new AWL words found in this input.
     """
-    if not player_input_text:
-        return 0, set()
+    xp_gain, credited = calculate_xp_detailed(player_input_text, learned_vocab_set)
+    return xp_gain, set(credited)
 
-    total_xp_gain = 0
-    found_new_awl_words = set()
-
-    # 1. Clean and tokenize the input text
-    # Convert to lowercase, remove basic punctuation, split into words
-    text_lower = player_input_text.lower()
-    # Remove punctuation that might interfere with word matching
-    text_cleaned = re.sub(r'[^\w\s-]', '', text_lower) # Keep hyphens within words
-    words = text_cleaned.split()
-
-    # Use a set for efficient checking of unique words within this input
-    unique_words_in_input = set(words)
-
-    # 2. Check each unique word against the categorized AWL
-    for word in unique_words_in_input:
-        # Check if the word is in our categorized AWL list
-        if word in AWL_CATEGORIZED:
-            # Check if the player has *already learned* this word
-            if word not in learned_vocab_set:
-                # It's a new AWL word for this player! Award XP based on category.
-                category = AWL_CATEGORIZED[word]
-                xp_award = XP_TIERS.get(category, 0) # Get XP for the category, default 0 if somehow missing
-
-                if xp_award > 0:
-                    total_xp_gain += xp_award
-                    found_new_awl_words.add(word)
-                    # Optional: Print debug message
-                    # print(f"[DEBUG Vocab] Found new AWL word: '{word}' (Category: {category}, XP: +{xp_award})")
-
-    # 3. Return total XP gain and the set of new words found
-    return total_xp_gain, found_new_awl_words
+def iter_calculate_xp(player_input_texts, learned_vocab_set: set):
+    """
+    Scores a sequence of inputs in order, e.g. a whole chapter's FS_CHAPTER_INPUTS.
+
+    Words credited by one input count as learned for the inputs after it, so the
+    first use of a word is credited exactly once. The caller's set is not modified.
+
+    Args:
+        player_input_texts: An iterable of raw player inputs.
+        learned_vocab_set: The words the player had already learned before the first input.
+
+    Yields:
+        For each input, the same (total_xp_gain, found_new_awl_words) tuple that
+        calculate_xp would return given the words learned so far.
+    """
+    learned = set(learned_vocab_set)
+    # One snapshot for the whole sequence, so a reload mid-batch can't mix vocabularies
+    snapshot = get_vocabulary_snapshot()
+    for player_input_text in player_input_texts:
+        if not player_input_text:
+            yield 0, set()
+            continue
+        xp_gain, credited = _score_words(_tokenize(player_input_text), learned, snapshot)
+        new_words = set(credited)
+        learned |= new_words
+        yield xp_gain, new_words
+
+def calculate_xp_batch(player_input_texts, learned_vocab_set: set) -> list[tuple[int, set]]:
+    """
+    Batch form of iter_calculate_xp.
+
+    Returns:
+        A list of (total_xp_gain, found_new_awl_words) tuples, one per input.
+    """
+    return list(iter_calculate_xp(player_input_texts, learned_vocab_set))
 
 # --- Example Usage (for testing) ---
 if __name__ == '__main__':
@@ -0,0 +1,171 @@
+# families.py - Surface form -> headword index for AWL word families
+#
+# The AWL is organized by word families ("analyse" covers "analysed",
+# "analysis", "analyses", ...). Rather than stemming every token at request
+# time, each vocabulary snapshot precomputes a dict from every known surface
+# form to its headword, so the XP and highlighting paths do one O(1) lookup.
+
+import json
+import logging
+import os
+
+FAMILIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'awl_families.json')
+
+_VOWELS = set('aeiou')
+
+# British/American spelling pairs applied to headwords before inflecting.
+_SPELLING_VARIANTS = (
+    ('isation', 'ization'), ('ization', 'isation'),
+    ('yse', 'yze'), ('yze', 'yse'),
+    ('ise', 'ize'), ('ize', 'ise'),
+)
+
+# Words ending in -ise/-ize where that is not the verb suffix, so they have no
+# other spelling (precise, advise, surprise, promise, size, ...). Matched on the
+# end of the word; the last set only as whole words.
+_NOT_ISE_SUFFIX = ('aise', 'oise', 'uise', 'vise', 'prise', 'wise', 'chise', 'spise',
+                   'precise', 'concise', 'exercise', 'excise', 'incise', 'promise', 'premise',
+                   'demise', 'expertise', 'advertise', 'chastise', 'treatise', 'merchandise', 'paradise')
+_NOT_IZE_SUFFIX = ('eize', 'aize', 'prize')
+_NOT_SUFFIX_WORDS = {'rise', 'arise', 'anise', 'size', 'capsize', 'oversize', 'downsize', 'assize'}
+
+# Verbs of more than one syllable stressed on the last, which double a final
+# consonant (commit -> committed). Stress cannot be read from the spelling.
+_FINAL_STRESS = {
+    'abet', 'acquit', 'admit', 'allot', 'annul', 'befit', 'begin', 'commit', 'compel', 'concur',
+    'confer', 'control', 'defer', 'deter', 'dispel', 'embed', 'emit', 'equip', 'expel', 'extol',
+    'forbid', 'forget', 'impel', 'incur', 'infer', 'input', 'occur', 'omit', 'output', 'overlap',
+    'patrol', 'permit', 'prefer', 'propel', 'rebel', 'recur', 'refer', 'regret', 'remit', 'repel',
+    'submit', 'transfer', 'transmit', 'upset',
+}
+
+
+def _syllables(word: str) -> int:
+    """Counts vowel groups, treating the 'u' of 'qu' as a consonant."""
+    count, previous = 0, ''
+    for i, letter in enumerate(word):
+        vowel = letter in _VOWELS and not (letter == 'u' and i and word[i - 1] == 'q')
+        if vowel and not previous:
+            count += 1
+        previous = 'v' if vowel else ''
+    return count
+
+
+def _doubles_final_consonant(word: str) -> bool:
+    """
+    True for one-syllable and final-stressed words ending consonant-vowel-
+    consonant (plan -> planned, occur -> occurred), and for words ending in a
+    single vowel and 'l', which double it in British spelling (label -> labelled).
+    """
+    if len(word) < 3 or word[-1] in _VOWELS or word[-1] in 'wxy' or word[-2] not in _VOWELS:
+        return False
+    if word[-3] in _VOWELS and word[-4:-2] != 'qu':
+        return False
+    return _syllables(word) == 1 or word in _FINAL_STRESS or word.endswith('l')
+
+
+def _has_spelling_variant(word: str, suffix: str) -> bool:
+    if not word.endswith(suffix) or word in _NOT_SUFFIX_WORDS:
+        return False
+    if suffix == 'ise':
+        return not word.endswith(_NOT_ISE_SUFFIX)
+    if suffix == 'ize':
+        return not word.endswith(_NOT_IZE_SUFFIX)
+    return True
+
+
+def _inflect(word: str) -> set:
+    """Regular plural/3rd-person, past and -ing forms of a single word."""
+    forms = set()
+    consonant_y = word.endswith('y') and len(word) > 1 and word[-2] not in _VOWELS
+
+    # Plural / third person singular
+    if word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        forms.add(word + 'es')
+    elif consonant_y:
+        forms.add(word[:-1] + 'ies')
+    else:
+        forms.add(word + 's')
+
+    # Past tense / participle
+    if word.endswith('e'):
+        forms.add(word + 'd')
+    elif consonant_y:
+        forms.add(word[:-1] + 'ied')
+    else:
+        forms.add(word + 'ed')
+
+    # Present participle
+    if word.endswith('ie'):
+        forms.add(word[:-2] + 'ying')
+    elif word.endswith('e') and not word.endswith(('ee', 'ye', 'oe')):
+        forms.add(word[:-1] + 'ing')
+    else:
+        forms.add(word + 'ing')
+
+    if _doubles_final_consonant(word):
+        doubled = word + word[-1]
+        if word.endswith('l') and word not in _FINAL_STRESS and _syllables(word) > 1:
+            # British spelling, alongside the American one
+            forms |= {doubled + 'ed', doubled + 'ing'}
+        else:
+            forms = (forms - {word + 'ed', word + 'ing'}) | {doubled + 'ed', doubled + 'ing'}
+    return forms
+
+
+def generate_inflections(headword: str) -> set:
+    """
+    Generates the regular inflections of a headword, including -ise/-ize and
+    -yse/-yze spelling variants and -ysis/-yses nouns (e.g. analyse -> analysis).
+    Multi-word or non-alphabetic headwords are returned unchanged.
+    """
+    word = headword.lower()
+    if not word.isalpha():
+        return {word}
+    stems = {word}
+    for suffix, replacement in _SPELLING_VARIANTS:
+        if _has_spelling_variant(word, suffix):
+            stems.add(word[:-len(suffix)] + replacement)
+    forms = set(stems)
+    for stem in stems:
+        forms |= _inflect(stem)
+        if stem.endswith(('yse', 'yze')):
+            forms |= {stem[:-3] + 'ysis', stem[:-3] + 'yses'}
+    return forms
+
+
+def load_word_families(path: str = FAMILIES_FILE) -> dict:
+    """
+    Loads the optional explicit family list: {headword: [surface forms]}.
+    Returns an empty dict if the file does not exist.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        logging.error(f"Error decoding word families from {path}: {e}")
+        return {}
+
+
+def build_form_index(headwords, families: dict | None = None) -> dict:
+    """
+    Maps every surface form (lowercase) to the headword it belongs to.
+
+    Precedence when forms collide: a headword always maps to itself, then
+    explicit family entries, then generated inflections (first headword in
+    sorted order wins).
+    """
+    headwords = sorted(headwords)
+    index = {word.lower(): word for word in headwords}
+    known = set(headwords)
+    for headword, forms in (families or {}).items():
+        if headword not in known:
+            continue
+        for form in forms:
+            index.setdefault(form.lower(), headword)
+    for headword in headwords:
+        for form in generate_inflections(headword):
+            index.setdefault(form, headword)
+    return index
@@ -0,0 +1,249 @@
+# journal.py - Append-only edit journal for vocabulary files
+#
+# Vocabulary edits are appended as one JSON record per line to
+# "<vocab file>.journal" instead of rewriting the whole vocabulary file:
+#
+#   {"op": "put", "word": "analyse", "entry": {...}, "replaces": "analyze"}
+#   {"op": "delete", "word": "analyse"}
+#
+# Readers see the base file with the journal applied on top. Once the journal
+# grows past JOURNAL_COMPACT_THRESHOLD records it is folded into a new base
+# file in the background (write to a temp file, fsync, atomic rename) and
+# truncated. Appends, reads and compaction coordinate through flock() on the
+# journal file, so concurrent editors in different workers never lose writes.
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_COMPACT_THRESHOLD = 200
+
+
+class VocabularyJournal:
+    """An append-only journal layered over one vocabulary JSON file."""
+
+    def __init__(self, base_path: str, compact_threshold: int = JOURNAL_COMPACT_THRESHOLD):
+        self.base_path = base_path
+        self.journal_path = base_path + JOURNAL_SUFFIX
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._compacting = False
+        # In-memory view: the base file plus every journal record read so far.
+        self._view = None
+        self._base_stamp = None
+        self._journal_offset = 0
+        self._journal_records = 0
+
+    # --- Locking helpers ---
+
+    def _open_journal(self):
+        fd = os.open(self.journal_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        return os.fdopen(fd, 'r+b')
+
+    @staticmethod
+    def _stamp(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    # --- Reads ---
+
+    def _read_base(self) -> dict:
+        try:
+            with open(self.base_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def _apply(view: dict, record: dict):
+        op = record.get('op')
+        word = record.get('word')
+        if op == 'put':
+            replaces = record.get('replaces')
+            if replaces and replaces != word:
+                view.pop(replaces, None)
+            view[word] = record.get('entry', {})
+        elif op == 'delete':
+            view.pop(word, None)
+
+    def _refresh(self, journal_file):
+        """Brings the in-memory view up to date. Caller holds the journal flock."""
+        base_stamp = self._stamp(self.base_path)
+        journal_size = os.fstat(journal_file.fileno()).st_size if journal_file else 0
+        if self._view is None or base_stamp != self._base_stamp or journal_size < self._journal_offset:
+            # First load, or the base was replaced by a compaction: start over.
+            self._view = self._read_base()
+            self._base_stamp = base_stamp
+            self._journal_offset = 0
+            self._journal_records = 0
+        if journal_size > self._journal_offset:
+            journal_file.seek(self._journal_offset)
+            chunk = journal_file.read(journal_size - self._journal_offset)
+            # Only consume complete lines; a torn tail from a crash is ignored.
+            complete = chunk[:chunk.rfind(b'\n') + 1]
+            for line in complete.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    self._apply(self._view, json.loads(line))
+                except json.JSONDecodeError:
+                    logging.error(f"Skipping corrupt record in {self.journal_path}")
+                self._journal_records += 1
+            self._journal_offset += len(complete)
+
+    def load(self) -> dict:
+        """
+        Returns a copy of the vocabulary with all journaled edits applied.
+
+        Only journal records written since the previous call are read from disk.
+        """
+        with self._lock:
+            if not os.path.exists(self.journal_path):
+                # Nothing has been journaled yet; don't create files on a read.
+                self._refresh(None)
+                return dict(self._view)
+            with self._open_journal() as journal_file:
+                fcntl.flock(journal_file, fcntl.LOCK_SH)
+                try:
+                    self._refresh(journal_file)
+                finally:
+                    fcntl.flock(journal_file, fcntl.LOCK_UN)
+            return dict(self._view)
+
+    # --- Writes ---
+
+    def _discard_torn_tail(self, journal_file):
+        """
+        Truncates an incomplete last record left by an append that crashed, so
+        the next record starts on a line of its own. Caller holds the journal
+        flock exclusively.
+        """
+        size = os.fstat(journal_file.fileno()).st_size
+        if size == 0:
+            return
+        journal_file.seek(size - 1)
+        if journal_file.read(1) == b'\n':
+            return
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            journal_file.seek(start)
+            newline = journal_file.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        logging.warning(f"Discarding {size - end} bytes of an incomplete record at the end of {self.journal_path}")
+        journal_file.truncate(end)
+
+    def _append(self, record: dict):
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock, self._open_journal() as journal_file:
+            fcntl.flock(journal_file, fcntl.LOCK_EX)
+            try:
+                self._discard_torn_tail(journal_file)
+                journal_file.write(line)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+                self._refresh(journal_file)
+                needs_compaction = self._journal_records >= self.compact_threshold
+            finally:
+                fcntl.flock(journal_file, fcntl.LOCK_UN)
+        if needs_compaction:
+            self.compact_in_background()
+
+    def put(self, word: str, entry: dict, replaces: str | None = None):
+        """Creates or updates `word`. If `replaces` is given, that word is removed in the same record."""
+        record = {'op': 'put', 'word': word, 'entry': entry}
+        if replaces and replaces != word:
+            record['replaces'] = replaces
+        self._append(record)
+
+    def delete(self, word: str):
+        """Removes `word` from the vocabulary."""
+        self._append({'op': 'delete', 'word': word})
+
+    # --- Compaction ---
+
+    def _write_base(self, vocab_data: dict):
+        base_dir = os.path.dirname(os.path.abspath(self.base_path))
+        fd, tmp_path = tempfile.mkstemp(dir=base_dir, prefix='.vocab-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(vocab_data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.base_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def replace_base(self, vocab_data: dict):
+        """Atomically replaces the whole vocabulary and discards the journal."""
+        with self._lock, self._open_journal() as journal_file:
+            fcntl.flock(journal_file, fcntl.LOCK_EX)
+            try:
+                self._write_base(vocab_data)
+                journal_file.truncate(0)
+                os.fsync(journal_file.fileno())
+                self._view = None
+                self._refresh(journal_file)
+            finally:
+                fcntl.flock(journal_file, fcntl.LOCK_UN)
+
+    def compact(self):
+        """Folds the journal into a new base file and truncates the journal."""
+        with self._lock, self._open_journal() as journal_file:
+            fcntl.flock(journal_file, fcntl.LOCK_EX)
+            try:
+                self._refresh(journal_file)
+                if self._journal_records == 0:
+                    return
+                self._write_base(self._view)
+                journal_file.truncate(0)
+                os.fsync(journal_file.fileno())
+                self._base_stamp = self._stamp(self.base_path)
+                self._journal_offset = 0
+                self._journal_records = 0
+                logging.info(f"Compacted vocabulary journal into {self.base_path}")
+            finally:
+                fcntl.flock(journal_file, fcntl.LOCK_UN)
+
+    def compact_in_background(self):
+        """Starts a compaction thread unless one is already running."""
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def _run():
+            try:
+                self.compact()
+            except Exception as e:
+                logging.error(f"Vocabulary journal compaction failed for {self.base_path}: {e}", exc_info=True)
+            finally:
+                with self._lock:
+                    self._compacting = False
+
+        threading.Thread(target=_run, name='vocab-journal-compaction', daemon=True).start()
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+def get_vocabulary_journal(base_path: str) -> VocabularyJournal:
+    """Returns the process-wide journal for a vocabulary file."""
+    key = os.path.abspath(base_path)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = _journals[key] = VocabularyJournal(key)
+        return journal
@@ -0,0 +1,140 @@
+# registry.py - Process-wide, hot-reloading registry of vocabulary snapshots
+
+import logging
+import os
+import threading
+import time
+from collections import ChainMap
+from types import MappingProxyType
+
+from ..term_matcher import TermMatcher
+from .families import build_form_index
+
+# How often (seconds) a snapshot re-checks its files for changes.
+REGISTRY_CHECK_INTERVAL = 1.0
+
+
+class VocabularySnapshot:
+    """
+    An immutable view of one vocabulary file plus the indexes derived from it.
+
+    Attributes:
+        filename: The vocabulary file this snapshot was built from.
+        generation: Identifies the on-disk state (base file and journal) it reflects.
+        words: word -> details.
+        categorized: word -> XP category ('common', 'medium', 'challenging').
+        definitions: word -> definition, preferring the entry's own definition
+                     over the shared AWL definitions.
+        forms: surface form (lowercase) -> headword, covering each word's
+               inflections and explicit family members (see families.py).
+        matcher: A TermMatcher over `forms` for highlighting; each match's data
+                 is the headword it belongs to.
+    """
+
+    __slots__ = ('filename', 'generation', 'words', 'categorized', 'definitions', 'forms', 'matcher')
+
+    def __init__(self, filename, generation, words, categorized, definitions, forms, matcher):
+        for name, value in (('filename', filename), ('generation', generation), ('words', words),
+                            ('categorized', categorized), ('definitions', definitions),
+                            ('forms', forms), ('matcher', matcher)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("VocabularySnapshot is immutable.")
+
+
+class VocabularyRegistry:
+    """
+    Hands out the current VocabularySnapshot for each vocabulary file.
+
+    A snapshot is rebuilt only when its base file or edit journal changes on
+    disk (checked at most every `check_interval` seconds, or immediately after
+    `invalidate`). Readers keep whatever snapshot they were given, so a reload
+    never changes data underneath a request.
+    """
+
+    def __init__(self, journal_for, sublist_to_category: dict, default_category: str = 'medium',
+                 definitions=None, families=None, store=None, check_interval: float = REGISTRY_CHECK_INTERVAL):
+        self._journal_for = journal_for
+        self._sublist_to_category = sublist_to_category
+        self._default_category = default_category
+        self._definitions = definitions if definitions is not None else {}
+        self._families = families if families is not None else {}
+        self._store = store
+        # The compiled store only covers the word list it was built from.
+        self._store_source = os.path.abspath(store.sources['awl']['path']) if store is not None else None
+        self.check_interval = check_interval
+        self._entries = {}  # base path -> [snapshot, last checked (monotonic)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _generation(self, journal):
+        return (self._stamp(journal.base_path), self._stamp(journal.journal_path))
+
+    def _build(self, filename: str, journal, generation) -> VocabularySnapshot:
+        store = self._store
+        if store is not None and journal.base_path == self._store_source and not store.is_stale():
+            # The compiled store is current: reuse its shared, memory-mapped views,
+            # without decoding the word entries. The categories are copied into a
+            # dict (from the sublist column alone), as scoring looks them up per word.
+            words = store.words
+            categorized = MappingProxyType(dict(
+                store.categorized(self._sublist_to_category, self._default_category).items()))
+            own_definitions = store.word_definitions
+        else:
+            try:
+                words = MappingProxyType(journal.load())
+            except Exception as e:
+                logging.error(f"Could not load vocabulary {journal.base_path}: {e}")
+                words = MappingProxyType({})
+            categorized = MappingProxyType({
+                word: self._sublist_to_category.get(details.get('sublist'), self._default_category)
+                for word, details in words.items() if isinstance(details, dict)
+            })
+            own_definitions = {word: details['definition'] for word, details in words.items()
+                               if isinstance(details, dict) and details.get('definition')}
+        definitions = MappingProxyType(ChainMap(own_definitions, self._definitions))
+        forms = MappingProxyType(build_form_index(words, self._families))
+        logging.info(f"Built vocabulary snapshot for {journal.base_path} "
+                     f"({len(words)} words, {len(forms)} surface forms)")
+        return VocabularySnapshot(filename, generation, words, categorized, definitions, forms, TermMatcher(forms))
+
+    def snapshot(self, filename: str) -> VocabularySnapshot:
+        """Returns the current snapshot of `filename`, rebuilding it if the file changed."""
+        journal = self._journal_for(filename)
+        key = journal.base_path
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[1] < self.check_interval:
+            return entry[0]
+
+        generation = self._generation(journal)
+        if entry is not None and entry[0].generation == generation:
+            entry[1] = now
+            return entry[0]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0].generation != generation:
+                entry = self._entries[key] = [self._build(filename, journal, generation), now]
+            else:
+                entry[1] = now
+            return entry[0]
+
+    def invalidate(self, filename: str | None = None):
+        """Forces the next `snapshot` call to re-check the file (all files if None)."""
+        with self._lock:
+            if filename is None:
+                for entry in self._entries.values():
+                    entry[1] = float('-inf')
+            else:
+                entry = self._entries.get(self._journal_for(filename).base_path)
+                if entry is not None:
+                    entry[1] = float('-inf')
@@ -4,11 +4,10 @@ import logging
 from flask import render_template, request, redirect, url_for, session, flash, current_app
 from werkzeug.utils import secure_filename
 from . import bp
-from .core import load_vocabulary_from_file
+from .core import vocabulary_journal, vocabulary_registry, VOCAB_DATA_DIR, ACTIVE_VOCAB_FILE
 
 # Define the path to the vocabulary data directory
-VOCAB_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-ACTIVE_VOCAB_FILE = "academic_word_list.json" # Make this configurable later
+VOCAB_DATA_PATH = VOCAB_DATA_DIR
 
 @bp.route('/')
 def vocabulary_manager():
@@ -17,7 +16,7 @@ def vocabulary_manager():
     def _vocabulary_manager():
         """Renders the main vocabulary management page."""
         try:
-            vocab_data = load_vocabulary_from_file(ACTIVE_VOCAB_FILE)
+            vocab_data = vocabulary_registry.snapshot(ACTIVE_VOCAB_FILE).words
         except Exception as e:
             logging.error(f"Error loading vocabulary file {ACTIVE_VOCAB_FILE}: {e}")
             flash("Could not load the active vocabulary file.", "error")
@@ -35,7 +34,7 @@ def create_vocab_entry():
     def _create_vocab_entry():
         """Creates a new vocabulary entry in the active vocabulary file."""
         try:
-            vocab_data = load_vocabulary_from_file(ACTIVE_VOCAB_FILE)
+            vocab_data = vocabulary_registry.snapshot(ACTIVE_VOCAB_FILE).words
 
             new_word = request.form.get('word', '').strip()
             if not new_word:
@@ -54,12 +53,9 @@ def create_vocab_entry():
                 "sublist": int(request.form.get('sublist', 5))
             }
 
-            vocab_data[new_word] = entry_details
-
-            # Save the updated data back to the file
-            save_path = os.path.join(VOCAB_DATA_PATH, ACTIVE_VOCAB_FILE)
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(vocab_data, f, indent=4)
+            # Append the new entry to the edit journal instead of rewriting the file
+            vocabulary_journal(ACTIVE_VOCAB_FILE).put(new_word, entry_details)
+            vocabulary_registry.invalidate(ACTIVE_VOCAB_FILE)
 
             flash(f'Successfully created new word: "{new_word}".', 'success')
 
@@ -77,7 +73,7 @@ def edit_vocab_entry(word):
     def _edit_vocab_entry(word):
         """Updates an existing vocabulary entry."""
         try:
-            vocab_data = load_vocabulary_from_file(ACTIVE_VOCAB_FILE)
+            vocab_data = vocabulary_registry.snapshot(ACTIVE_VOCAB_FILE).words
 
             original_word = request.form.get('original_word', word)
             new_word = request.form.get('word', '').strip()
@@ -91,10 +87,6 @@ def edit_vocab_entry(word):
                 flash(f'Word "{new_word}" already exists.', 'error')
                 return redirect(url_for('vocabulary.vocabulary_manager'))
 
-            # Remove the old entry if the word was renamed
-            if new_word != original_word and original_word in vocab_data:
-                vocab_data.pop(original_word)
-
             entry_details = {
                 "definition": request.form.get('definition', ''),
                 "example_sentence": request.form.get('example_sentence', ''),
@@ -103,12 +95,10 @@ def edit_vocab_entry(word):
                 "sublist": int(request.form.get('sublist', 5))
             }
 
-            vocab_data[new_word] = entry_details
-
-            # Save the updated data back to the file
-            save_path = os.path.join(VOCAB_DATA_PATH, ACTIVE_VOCAB_FILE)
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(vocab_data, f, indent=4)
+            # Journal the edit; a rename removes the old entry in the same record
+            replaces = original_word if new_word != original_word and original_word in vocab_data else None
+            vocabulary_journal(ACTIVE_VOCAB_FILE).put(new_word, entry_details, replaces=replaces)
+            vocabulary_registry.invalidate(ACTIVE_VOCAB_FILE)
 
             flash(f'Successfully updated word: "{new_word}".', 'success')
 
@@ -176,17 +166,15 @@ def save_brainstormed_vocab():
         if not filename.endswith('.json'):
             filename += '.json'
 
-        save_path = os.path.join(VOCAB_DATA_PATH, filename)
-
         try:
             # Validate that the data is valid JSON
             vocab_data = json.loads(vocab_data_str)
             if not isinstance(vocab_data, dict):
                 raise ValueError("Data is not a valid dictionary.")
 
-            # Save the file
-            with open(save_path, 'w', encoding='utf-8') as f:
-                json.dump(vocab_data, f, indent=4)
+            # Save the file (atomically, discarding any stale journal for it)
+            vocabulary_journal(filename).replace_base(vocab_data)
+            vocabulary_registry.invalidate(filename)
 
             flash(f'Successfully saved new vocabulary set as "{filename}".', 'success')
 
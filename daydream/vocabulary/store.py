@@ -0,0 +1,323 @@
+# store.py - Compact binary vocabulary store shared between workers via mmap
+#
+# The JSON vocabulary files are compiled into a single indexed file:
+#
+#   header   : magic b'DDVS' | u16 version | u16 table count | u32 sources offset | u32 sources length
+#   directory: one (4-byte tag, u32 offset, u32 length) entry per table
+#   sources  : JSON recording the path, size and mtime of every source file
+#   tables   : u32 count
+#              u32 key_offsets[count + 1]    (into the key blob, UTF-8, sorted by bytes)
+#              u32 value_offsets[count + 1]  (into the value blob)
+#              u8  column[count]             (sublist for AWL words, 0 otherwise)
+#              key blob | value blob
+#
+# Every gunicorn worker maps the same file read-only, so the pages are shared
+# instead of each worker holding its own parsed copy of the JSON.
+
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import ItemsView, Mapping, ValuesView
+
+from .journal import VocabularyJournal
+
+STORE_MAGIC = b'DDVS'
+STORE_VERSION = 2
+STORE_FILENAME = 'vocabulary.ddvs'
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# The shared definitions and lore files sit in the project root, next to the package.
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_STORE_PATH = os.path.join(_DATA_DIR, STORE_FILENAME)
+DEFAULT_SOURCES = {
+    'awl': os.path.join(_DATA_DIR, 'academic_word_list.json'),
+    'definitions': os.path.join(_PROJECT_DIR, 'awl_definitions.json'),
+    'lore': os.path.join(_PROJECT_DIR, 'lore_vocabulary.json'),
+}
+
+_HEADER = struct.Struct('<4sHHII')
+_DIR_ENTRY = struct.Struct('<4sII')
+_U32 = struct.Struct('<I')
+
+_TABLE_TAGS = {'awl': b'WORD', 'definitions': b'DEFS', 'lore': b'LORE', 'word_definitions': b'WDEF'}
+
+
+# --- Build Step ---
+
+def _pack_table(entries: dict, encode_value, column=None) -> bytes:
+    """Serializes a mapping into a sorted, indexed table."""
+    items = sorted(((k.encode('utf-8'), v) for k, v in entries.items()), key=lambda kv: kv[0])
+    count = len(items)
+    key_blob, value_blob = bytearray(), bytearray()
+    key_offsets, value_offsets, column_bytes = [0], [0], bytearray()
+    for key_bytes, value in items:
+        key_blob += key_bytes
+        key_offsets.append(len(key_blob))
+        value_blob += encode_value(value)
+        value_offsets.append(len(value_blob))
+        column_bytes.append(column(value) if column else 0)
+
+    header_size = 4 + 8 * (count + 1) + count
+    padding = (-header_size) % 4
+    key_base = header_size + padding
+    value_base = key_base + len(key_blob)
+
+    out = bytearray(_U32.pack(count))
+    out += struct.pack(f'<{count + 1}I', *(key_base + o for o in key_offsets))
+    out += struct.pack(f'<{count + 1}I', *(value_base + o for o in value_offsets))
+    out += column_bytes + b'\x00' * padding
+    out += key_blob + value_blob
+    return bytes(out)
+
+def _sublist_byte(details) -> int:
+    sublist = details.get('sublist') if isinstance(details, dict) else None
+    return sublist if isinstance(sublist, int) and 0 < sublist < 256 else 0
+
+def _source_info(path: str) -> dict:
+    st = os.stat(path)
+    return {'path': path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def build_vocabulary_store(output_path: str = DEFAULT_STORE_PATH, sources: dict | None = None) -> str:
+    """
+    Compiles the AWL word list, AWL definitions and lore vocabulary into a
+    binary store. Missing source files are stored as empty tables.
+
+    Args:
+        output_path: Where to write the store.
+        sources: Optional overrides for the 'awl', 'definitions' and 'lore' source paths.
+
+    Returns:
+        The path of the written store.
+    """
+    sources = {**DEFAULT_SOURCES, **(sources or {})}
+    data, source_meta = {}, {}
+    for name, path in sources.items():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data[name] = json.load(f)
+            source_meta[name] = _source_info(path)
+        except FileNotFoundError:
+            logging.warning(f"Vocabulary store source '{path}' not found; storing an empty table.")
+            data[name] = {}
+            source_meta[name] = {'path': path, 'size': None, 'mtime_ns': None}
+
+    # The word list is edited through an append-only journal; compile the
+    # edited view and track the journal so new edits mark the store stale.
+    journal = VocabularyJournal(sources['awl'])
+    if os.path.exists(journal.journal_path):
+        data['awl'] = journal.load()
+    source_meta['awl_journal'] = _source_info(journal.journal_path) if os.path.exists(journal.journal_path) \
+        else {'path': journal.journal_path, 'size': None, 'mtime_ns': None}
+
+    encode_json = lambda v: json.dumps(v, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    tables = [
+        (_TABLE_TAGS['awl'], _pack_table(data['awl'], encode_json, column=_sublist_byte)),
+        (_TABLE_TAGS['definitions'], _pack_table(data['definitions'], lambda v: str(v).encode('utf-8'))),
+        (_TABLE_TAGS['lore'], _pack_table(data['lore'], encode_json)),
+        # The words' own definitions, so readers need not decode every word entry to find them.
+        (_TABLE_TAGS['word_definitions'], _pack_table(
+            {word: details['definition'] for word, details in data['awl'].items()
+             if isinstance(details, dict) and details.get('definition')},
+            lambda v: str(v).encode('utf-8'))),
+    ]
+    sources_blob = json.dumps(source_meta, sort_keys=True).encode('utf-8')
+
+    offset = _HEADER.size + _DIR_ENTRY.size * len(tables)
+    sources_offset = offset
+    offset += len(sources_blob)
+    offset += (-offset) % 4
+    directory, body = bytearray(), bytearray()
+    for tag, table in tables:
+        directory += _DIR_ENTRY.pack(tag, offset, len(table))
+        body += table + b'\x00' * ((-len(table)) % 4)
+        offset += len(table) + ((-len(table)) % 4)
+
+    header = _HEADER.pack(STORE_MAGIC, STORE_VERSION, len(tables), sources_offset, len(sources_blob))
+    prefix = header + directory + sources_blob
+    prefix += b'\x00' * ((-len(prefix)) % 4)
+
+    # Write atomically so running workers never map a half-written file.
+    out_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix='.vocab-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(prefix + body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    logging.info(f"Built vocabulary store at {output_path}")
+    return output_path
+
+
+# --- Reader ---
+
+class _MappedTable(Mapping):
+    """Read-only, dict-like view over one table of the store."""
+
+    def __init__(self, buf, offset: int, decode_value):
+        self._buf = buf
+        self._base = offset
+        self._decode = decode_value
+        self._count = _U32.unpack_from(buf, offset)[0]
+        self._key_offsets = offset + 4
+        self._value_offsets = self._key_offsets + 4 * (self._count + 1)
+        self._column = self._value_offsets + 4 * (self._count + 1)
+
+    def _offset(self, table_pos: int, i: int) -> int:
+        return self._base + _U32.unpack_from(self._buf, table_pos + 4 * i)[0]
+
+    def _key_bytes(self, i: int) -> bytes:
+        return self._buf[self._offset(self._key_offsets, i):self._offset(self._key_offsets, i + 1)]
+
+    def _index(self, key) -> int:
+        if not isinstance(key, str):
+            return -1
+        target = key.encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key_bytes(lo) == target:
+            return lo
+        return -1
+
+    def _value(self, i: int):
+        raw = self._buf[self._offset(self._value_offsets, i):self._offset(self._value_offsets, i + 1)]
+        return self._decode(raw, self._buf[self._column + i])
+
+    def __getitem__(self, key):
+        i = self._index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self._value(i)
+
+    def __contains__(self, key):
+        return self._index(key) >= 0
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._key_bytes(i).decode('utf-8')
+
+    def items(self):
+        return _TableItems(self)
+
+    def values(self):
+        return _TableValues(self)
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return f"<{type(self).__name__} of {self._count} entries>"
+
+
+# Views whose iteration walks the table sequentially, without a binary search per key.
+
+class _TableItems(ItemsView):
+    def __iter__(self):
+        table = self._mapping
+        for i in range(table._count):
+            yield table._key_bytes(i).decode('utf-8'), table._value(i)
+
+
+class _TableValues(ValuesView):
+    def __iter__(self):
+        table = self._mapping
+        for i in range(table._count):
+            yield table._value(i)
+
+
+class VocabularyStore:
+    """
+    Memory-mapped reader for a store written by build_vocabulary_store.
+
+    Attributes:
+        words: word -> details dict (the AWL_WORDS view).
+        sublists: word -> AWL sublist number (0 when unknown).
+        definitions: word -> definition text (the AWL_DEFINITIONS view).
+        word_definitions: word -> the 'definition' of its own entry in `words`.
+        lore: term -> lore entry dict (the lore_vocabulary view).
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, table_count, sources_offset, sources_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {STORE_VERSION} vocabulary store.")
+        self.sources = json.loads(self._mm[sources_offset:sources_offset + sources_len])
+
+        tables = {}
+        for i in range(table_count):
+            tag, offset, _ = _DIR_ENTRY.unpack_from(self._mm, _HEADER.size + i * _DIR_ENTRY.size)
+            tables[tag] = offset
+
+        decode_json = lambda raw, _: json.loads(raw)
+        self.words = _MappedTable(self._mm, tables[_TABLE_TAGS['awl']], decode_json)
+        self.sublists = _MappedTable(self._mm, tables[_TABLE_TAGS['awl']], lambda raw, column: column)
+        self.definitions = _MappedTable(self._mm, tables[_TABLE_TAGS['definitions']], lambda raw, _: raw.decode('utf-8'))
+        self.lore = _MappedTable(self._mm, tables[_TABLE_TAGS['lore']], decode_json)
+        self.word_definitions = _MappedTable(self._mm, tables[_TABLE_TAGS['word_definitions']],
+                                             lambda raw, _: raw.decode('utf-8'))
+
+    def categorized(self, sublist_to_category: dict, default: str = 'medium') -> Mapping:
+        """Returns a word -> category view (the AWL_CATEGORIZED view)."""
+        return _MappedTable(self._mm, self.words._base,
+                            lambda raw, column: sublist_to_category.get(column, default))
+
+    def is_stale(self) -> bool:
+        """True if any source file changed since the store was built."""
+        for meta in self.sources.values():
+            try:
+                current = _source_info(meta['path'])
+            except FileNotFoundError:
+                current = {'size': None, 'mtime_ns': None}
+            if (current['size'], current['mtime_ns']) != (meta['size'], meta['mtime_ns']):
+                return True
+        return False
+
+    def close(self):
+        self._mm.close()
+
+
+def open_vocabulary_store(path: str = DEFAULT_STORE_PATH) -> VocabularyStore | None:
+    """
+    Opens the binary store if it exists and is up to date with its sources.
+
+    Returns:
+        A VocabularyStore, or None if the caller should fall back to the JSON files.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        store = VocabularyStore(path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        logging.warning(f"Could not open vocabulary store {path}: {e}")
+        return None
+    if store.is_stale():
+        logging.warning(f"Vocabulary store {path} is older than its sources; falling back to JSON. "
+                        f"Rebuild it with 'python -m daydream.vocabulary.store'.")
+        store.close()
+        return None
+    logging.info(f"Memory-mapped vocabulary store from {path}")
+    return store
+
+
+if __name__ == '__main__':
+    # Build step: run from the project root, e.g. `python -m daydream.vocabulary.store`
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    store_path = build_vocabulary_store()
+    store = VocabularyStore(store_path)
+    print(f"AWL words: {len(store.words)}, definitions: {len(store.definitions)}, lore terms: {len(store.lore)}")
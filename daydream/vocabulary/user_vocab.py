@@ -0,0 +1,121 @@
+# user_vocab.py - Per-user merged vocabulary (AWL + active custom lists)
+#
+# A player's active vocabulary is the AWL (unless disabled in their
+# vocab_settings) plus every active list in player_profiles/<uid>/custom_vocab_lists.
+# Merging those and compiling a TermMatcher is done once per change and cached
+# per user, instead of on every vocab report and XP calculation.
+
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+from ..term_matcher import TermMatcher
+
+USER_VOCAB_CACHE_TTL = 300  # seconds
+USER_VOCAB_CACHE_MAX_USERS = 1024
+AWL_SOURCE = "AWL"
+
+
+class UserVocabulary:
+    """
+    An immutable, merged view of one user's active vocabulary.
+
+    Attributes:
+        settings: The user's vocab_settings.
+        vocab: word -> details, each with a 'source' ("AWL" or the custom list's name).
+        matcher: A TermMatcher over `vocab` for highlighting.
+        awl_generation: Generation of the AWL snapshot this view was merged from.
+    """
+
+    __slots__ = ('settings', 'vocab', 'matcher', 'awl_generation')
+
+    def __init__(self, settings, vocab, matcher, awl_generation):
+        for name, value in (('settings', settings), ('vocab', vocab),
+                            ('matcher', matcher), ('awl_generation', awl_generation)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserVocabulary is immutable.")
+
+
+def merge_user_vocabulary(settings: dict, awl_snapshot, custom_lists) -> UserVocabulary:
+    """
+    Builds a UserVocabulary from the AWL snapshot and the user's active custom lists.
+
+    Args:
+        settings: The user's vocab_settings ('use_default_awl' defaults to True).
+        awl_snapshot: The current VocabularySnapshot of the AWL.
+        custom_lists: Iterable of custom list dicts ('name', 'words'). Each word
+                      is either a string or a dict with a 'word' key.
+    """
+    settings = dict(settings or {})
+    merged = {}
+    if settings.get('use_default_awl', True):
+        for word, details in awl_snapshot.words.items():
+            entry = dict(details) if isinstance(details, dict) else {}
+            if not entry.get('definition') and word in awl_snapshot.definitions:
+                entry['definition'] = awl_snapshot.definitions[word]
+            entry['source'] = AWL_SOURCE
+            merged[word] = entry
+    for list_data in custom_lists:
+        source = list_data.get('name', 'Unnamed AI List')
+        for item in list_data.get('words', []):
+            entry = dict(item) if isinstance(item, dict) else {'word': item}
+            word = entry.pop('word', None)
+            if not word or word in merged:
+                continue
+            entry['source'] = source
+            merged[word] = entry
+    return UserVocabulary(MappingProxyType(settings), MappingProxyType(merged),
+                          TermMatcher(merged), awl_snapshot.generation)
+
+
+class UserVocabularyCache:
+    """
+    Per-worker LRU cache of UserVocabulary objects with a TTL.
+
+    Entries are dropped when they expire, when the AWL snapshot they were
+    merged from is replaced, or when `invalidate` is called for the user
+    (e.g. after a custom list is generated, toggled or deleted).
+    """
+
+    def __init__(self, ttl: float = USER_VOCAB_CACHE_TTL, max_users: int = USER_VOCAB_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries = OrderedDict()  # user_id -> (expires_at, UserVocabulary)
+        self._epoch = 0  # bumped by invalidate so in-flight builds aren't stored
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, awl_generation, build) -> UserVocabulary:
+        """Returns the cached vocabulary for `user_id`, calling `build()` on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[1].awl_generation == awl_generation:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            epoch = self._epoch
+
+        user_vocab = build()
+        with self._lock:
+            if epoch != self._epoch:
+                return user_vocab
+            self._entries[user_id] = (now + self.ttl, user_vocab)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return user_vocab
+
+    def invalidate(self, user_id: str | None = None):
+        """Drops the cached vocabulary for `user_id` (everyone if None)."""
+        with self._lock:
+            self._epoch += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
@@ -2,6 +2,14 @@ import os
 import firebase_admin
 from firebase_admin import credentials, firestore
 
+def bump_content_version(db):
+    """
+    Sets persona_meta/content.version to the write time. Run after any edit to
+    archetypes, dilemmas or choices: app workers re-read the quiz content only
+    when this version changes (see PersonaContentCache).
+    """
+    db.collection('persona_meta').document('content').set({'version': firestore.SERVER_TIMESTAMP})
+
 def seed_database():
     """
     Seeds the Firestore database with the Persona Quiz content.
@@ -73,6 +81,8 @@ def seed_database():
                 'archetype_id': archetype_id,
             })
 
+    bump_content_version(db)
+
     print("Database seeded successfully!")
 
 if __name__ == '__main__':
@@ -76,6 +76,15 @@ else
     print_message "green" ".env file created successfully."
 fi
 
+# --- Step 5: Compile the vocabulary store ---
+print_message "blue" "Step 5: Compiling the binary vocabulary store..."
+python3 -m daydream.vocabulary.store
+if [ $? -ne 0 ]; then
+    print_message "red" "Warning: Could not build the vocabulary store. The app will load the JSON files instead."
+else
+    print_message "green" "Vocabulary store compiled successfully."
+fi
+
 print_message "green" "\nSetup complete!"
 print_message "blue" "To activate the virtual environment in your shell, run:"
 print_message "blue" "source $VENV_DIR/bin/activate"
@@ -27,6 +27,13 @@ def app(mocker):
 
     yield app
 
+@pytest.fixture
+def sqlite_app(app, tmp_path):
+    """The app on the SQLite storage backend, with a fresh database per test."""
+    app.config['STORAGE_BACKEND'] = 'sqlite'
+    app.config['SQLITE_PATH'] = str(tmp_path / 'daydream.sqlite3')
+    return app
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
@@ -0,0 +1,45 @@
+from daydream.ai import AIResponseCache
+from daydream.ai.cache import cache_key
+from daydream.utils import get_ai_response
+
+def test_cache_key_is_canonical():
+    assert (cache_key('REVIEW_CHARACTER_SHEET', {'a': 1, 'tags': {'y', 'x'}}, 'm/1')
+            == cache_key('REVIEW_CHARACTER_SHEET', {'tags': {'x', 'y'}, 'a': 1}, 'm/1'))
+    assert cache_key('REVIEW_CHARACTER_SHEET', {'a': 1}, 'm/1') != cache_key('REVIEW_CHARACTER_SHEET', {'a': 1}, 'm/2')
+    assert cache_key('REVIEW_CHARACTER_SHEET', {'a': 1}, 'm/1') != cache_key('GENERATE_FINAL_REVIEW', {'a': 1}, 'm/1')
+
+def test_disk_tier_survives_restart_and_expires(tmp_path, mocker):
+    path = str(tmp_path / 'ai_cache.sqlite3')
+    cache = AIResponseCache('m/1', ttls={'BRAINSTORM_VOCABULARY': 60}, path=path)
+    cache.put('BRAINSTORM_VOCABULARY', {'subject': 'space'}, {'words': ['orbit']})
+    cache.put('GENERAL_CHAT', {'player_input': 'hi'}, 'hello')
+    assert cache.get('BRAINSTORM_VOCABULARY', {'subject': 'space'}) == {'words': ['orbit']}
+    assert cache.get('GENERAL_CHAT', {'player_input': 'hi'}) is None
+
+    restarted = AIResponseCache('m/1', ttls={'BRAINSTORM_VOCABULARY': 60}, path=path)
+    assert restarted.get('BRAINSTORM_VOCABULARY', {'subject': 'space'}) == {'words': ['orbit']}
+    assert restarted.get('BRAINSTORM_VOCABULARY', {'subject': 'space'}) == {'words': ['orbit']}
+    assert (restarted.hits, restarted.disk_hits, restarted.misses) == (2, 1, 0)
+    assert AIResponseCache('m/2', path=path).get('BRAINSTORM_VOCABULARY', {'subject': 'space'}) is None
+
+    mocker.patch('daydream.ai.cache.time.time', return_value=10 ** 12)
+    assert restarted.get('BRAINSTORM_VOCABULARY', {'subject': 'space'}) is None
+    assert restarted.misses == 1
+
+def test_get_ai_response_skips_repeated_model_calls(app, mocker):
+    generate = mocker.patch.object(app.extensions['ai_provider'], 'generate',
+                                   side_effect=[{'recommendations': ['a']}, {'error': True}, 'hi', 'hi again'])
+    with app.app_context():
+        sheet = {'character_sheet_data': {'name': 'Ada'}}
+        assert get_ai_response('REVIEW_CHARACTER_SHEET', sheet) == {'recommendations': ['a']}
+        cached = get_ai_response('REVIEW_CHARACTER_SHEET', dict(sheet))
+        assert cached == {'recommendations': ['a']}
+        cached['recommendations'].append('mutated')
+        assert get_ai_response('REVIEW_CHARACTER_SHEET', sheet) == {'recommendations': ['a']}
+        assert generate.call_count == 1
+
+        # Errors and uncached prompt types always reach the model
+        assert get_ai_response('GENERATE_FINAL_REVIEW', {'chapter': 1}) == {'error': True}
+        assert get_ai_response('GENERAL_CHAT', {'player_input': 'hi'}) == 'hi'
+        assert get_ai_response('GENERAL_CHAT', {'player_input': 'hi'}) == 'hi again'
+        assert generate.call_count == 4
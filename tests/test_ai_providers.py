@@ -0,0 +1,74 @@
+import pytest
+from daydream import create_app
+from daydream.ai import LocalStandInProvider, AIProviderError
+from daydream.ai.providers import PROMPTS, STREAM_FIELDS, build_prompt
+from unittest.mock import MagicMock
+from daydream.utils import get_ai_response
+
+CONTEXT = {'subject': 'astronomy', 'questions': ['Why?'], 'answers': ['Because.']}
+
+def test_standin_responses_match_each_prompt_schema():
+    provider = LocalStandInProvider(latency_median=0, tokens_per_second=0)
+    for prompt_type, (_, fields) in PROMPTS.items():
+        response = provider.generate(prompt_type, CONTEXT)
+        assert set(response) == set(fields), prompt_type
+        assert response == provider.generate(prompt_type, CONTEXT)
+        assert 'Respond with a single JSON object' in build_prompt(prompt_type, CONTEXT)
+    assert provider.generate('ANALYZE_PLAYER_WRITING', CONTEXT)['style_rating'] in 'LMH'
+    assert 0 <= provider.generate('EVALUATE_CHAPTER_COMPREHENSION', CONTEXT)['overall_comprehension_score'] <= 10
+
+def test_standin_simulates_latency_tokens_and_errors():
+    slept = []
+    provider = LocalStandInProvider(latency_median=0.5, latency_p95=2.0, tokens_per_second=10, seed=1, sleep=slept.append)
+    latencies = []
+    for _ in range(400):
+        slept.clear()
+        provider.generate('GENERAL_CHAT', CONTEXT)
+        latencies.append(slept[0])
+    latencies.sort()
+    assert 0.4 < latencies[200] < 0.6
+    assert 1.5 < latencies[380] < 2.6
+    # One interval per output token after the first token
+    tokens = len(str(provider.generate('GENERAL_CHAT', CONTEXT)).split())
+    assert slept[-1] == pytest.approx(tokens / 10, rel=0.1)
+
+    failing = LocalStandInProvider(latency_median=0, error_rate=1.0, sleep=slept.append)
+    assert failing.generate('GENERAL_CHAT', CONTEXT)['error'] is True
+    with pytest.raises(AIProviderError):
+        list(failing.stream('GENERAL_CHAT', CONTEXT))
+
+def test_standin_stream_yields_the_response_text():
+    provider = LocalStandInProvider(latency_median=0, tokens_per_second=0)
+    for prompt_type, field in STREAM_FIELDS.items():
+        chunks = list(provider.stream(prompt_type, CONTEXT))
+        assert len(chunks) > 1
+        assert ''.join(chunks) == provider.generate(prompt_type, CONTEXT)[field]
+    with pytest.raises(AIProviderError):
+        list(provider.stream('GENERATE_NEXT_QUEST', CONTEXT))
+
+def test_ai_provider_config_selects_the_standin():
+    app = create_app({'TESTING': True, 'AI_PROVIDER': 'local', 'AI_STANDIN_LATENCY_MEDIAN': 0,
+                      'AI_STANDIN_TOKENS_PER_SECOND': 0})
+    with app.app_context():
+        assert set(get_ai_response('GENERATE_NEXT_QUEST', {'next_hero_journey_stage': 'The Call'})) == set(
+            PROMPTS['GENERATE_NEXT_QUEST'][1])
+    with pytest.raises(ValueError):
+        create_app({'TESTING': True, 'AI_PROVIDER': 'mystery'})
+
+def test_standin_responses_are_not_served_to_another_provider(tmp_path):
+    cache_path = str(tmp_path / 'ai_cache.sqlite3')
+    context = {'subject': 'biology'}
+    local = create_app({'TESTING': True, 'AI_PROVIDER': 'local', 'AI_CACHE_PATH': cache_path,
+                        'AI_STANDIN_LATENCY_MEDIAN': 0, 'AI_STANDIN_TOKENS_PER_SECOND': 0})
+    with local.app_context():
+        standin = get_ai_response('BRAINSTORM_VOCABULARY', context)
+
+    gemini = create_app({'TESTING': True, 'AI_PROVIDER': 'gemini', 'AI_CACHE_PATH': cache_path})
+    model = MagicMock()
+    model.generate_content.return_value.text = '{"vocabulary": [{"word": "cell", "definition": "a unit of life"}]}'
+    gemini.extensions['ai_provider'].model = model
+    with gemini.app_context():
+        response = get_ai_response('BRAINSTORM_VOCABULARY', context)
+    model.generate_content.assert_called_once()
+    assert response != standin
+    assert response['vocabulary'][0]['word'] == 'cell'
@@ -0,0 +1,70 @@
+import threading
+import time
+from daydream.ai import SingleFlight
+from daydream.utils import get_ai_response
+
+def _run_concurrently(count, target):
+    results = [None] * count
+    def run(i):
+        results[i] = target()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def test_concurrent_duplicates_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return {'words': ['orbit']}
+
+    threads, results = _run_concurrently(5, lambda: flight.do('k', call))
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{'words': ['orbit']}] * 5
+    assert len({id(result) for result in results}) == 5  # each caller gets its own copy
+    assert (flight.misses, flight.hits) == (1, 4)
+
+    # Once the call has finished, the next one is made afresh
+    assert flight.do('k', lambda: 'again') == 'again'
+
+def test_duplicates_in_another_worker_wait_for_the_result_file(tmp_path):
+    worker_a, worker_b = SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+    def slow_call():
+        started.set()
+        release.wait(5)
+        return {'overall_comprehension_score': 7}
+    threads, results = _run_concurrently(1, lambda: worker_a.do('k', slow_call))
+    started.wait(5)
+
+    b_calls = []
+    b_threads, b_results = _run_concurrently(1, lambda: worker_b.do('k', lambda: b_calls.append(1)))
+    time.sleep(0.2)
+    release.set()
+    for thread in threads + b_threads:
+        thread.join()
+    assert results == b_results == [{'overall_comprehension_score': 7}]
+    assert b_calls == []
+    assert (worker_b.hits, worker_b.shared_hits, worker_b.misses) == (1, 1, 0)
+
+def test_get_ai_response_coalesces_identical_prompts(app, mocker):
+    def generate(prompt_type, context):
+        time.sleep(0.2)
+        return {'response_text': 'Welcome to Thetopia.'}
+    generate = mocker.patch.object(app.extensions['ai_provider'], 'generate', side_effect=generate)
+
+    def ask():
+        with app.app_context():
+            return get_ai_response('GENERAL_CHAT', {'user_input': 'Where am I?'})
+    threads, results = _run_concurrently(4, ask)
+    for thread in threads:
+        thread.join()
+    assert results == [{'response_text': 'Welcome to Thetopia.'}] * 4
+    assert generate.call_count == 1
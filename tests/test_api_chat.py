@@ -0,0 +1,42 @@
+import json
+import pytest
+from daydream.ai import LocalStandInProvider, AIProviderError
+
+def _events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+@pytest.fixture
+def chat_client(app, client):
+    app.extensions['ai_provider'] = LocalStandInProvider(latency_median=0, tokens_per_second=0)
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+    return client
+
+def test_chat_stream_sends_tokens_then_the_reply(app, chat_client):
+    response = chat_client.post('/api/chat/stream', json={'message': 'Where should I go?'})
+    assert response.mimetype == 'text/event-stream'
+    events = _events(response)
+    assert [e for e, _ in events[:-1]] == ['token'] * (len(events) - 1) and len(events) > 2
+    assert events[-1][0] == 'done'
+    reply = app.extensions['ai_provider'].generate('GENERAL_CHAT', {'user_input': 'Where should I go?'})['response_text']
+    assert ''.join(data['text'] for _, data in events[:-1]) == events[-1][1]['reply'] == reply
+
+def test_chat_stream_stops_before_blocked_text(app, chat_client, mocker):
+    mocker.patch.object(app.extensions['ai_provider'], 'stream', return_value=iter(["I really h", "ate ", "that."]))
+    events = _events(chat_client.post('/api/chat/stream', json={'message': 'Hi'}))
+    assert events[-1][0] == 'blocked'
+    released = ''.join(data['text'] for _, data in events[:-1])
+    assert 'I really'.startswith(released.strip()) and not released.rstrip().endswith('h')
+
+    assert _events(chat_client.post('/api/chat/stream', json={'message': 'I hate this'}))[0][0] == 'blocked'
+
+def test_chat_stream_reports_provider_failure(app, chat_client, mocker):
+    def failing(prompt_type, context):
+        yield "Once upon"
+        raise AIProviderError("dropped")
+    mocker.patch.object(app.extensions['ai_provider'], 'stream', side_effect=failing)
+    assert [event for event, _ in _events(chat_client.post('/api/chat/stream', json={'message': 'Hi'}))][-1] == 'error'
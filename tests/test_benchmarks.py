@@ -0,0 +1,146 @@
+"""
+Benchmarks for the text-processing hot paths.
+
+Skipped unless DAYDREAM_BENCHMARKS=1. Configuration (environment variables):
+    DAYDREAM_BENCHMARK_OUTPUT     where to write results (default .benchmarks/latest.json)
+    DAYDREAM_BENCHMARK_BASELINE   results file to compare against (default .benchmarks/baseline.json)
+    DAYDREAM_BENCHMARK_TOLERANCE  allowed ops/sec regression in percent (default 20)
+    DAYDREAM_BENCHMARK_MIN_TIME   seconds to run each benchmark (default 1.0)
+
+To record a baseline, run once and copy the output file to the baseline path.
+"""
+import json
+import os
+import platform
+import random
+import time
+
+import pytest
+
+from daydream.term_matcher import TermMatcher
+from daydream.utils import find_terms_in_text, process_text_for_highlighting
+from daydream.ethics.gateway import analyze_content
+
+pytestmark = pytest.mark.skipif(os.environ.get('DAYDREAM_BENCHMARKS') != '1',
+                                reason="Set DAYDREAM_BENCHMARKS=1 to run benchmarks")
+
+OUTPUT_PATH = os.environ.get('DAYDREAM_BENCHMARK_OUTPUT', os.path.join('.benchmarks', 'latest.json'))
+BASELINE_PATH = os.environ.get('DAYDREAM_BENCHMARK_BASELINE', os.path.join('.benchmarks', 'baseline.json'))
+TOLERANCE = float(os.environ.get('DAYDREAM_BENCHMARK_TOLERANCE', '20'))
+MIN_TIME = float(os.environ.get('DAYDREAM_BENCHMARK_MIN_TIME', '1.0'))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FILLER = ("the a we I you they it to of and in on with for at by from look go take give ask around "
+          "quickly door tree light old strange small road market friend town sky water stone").split()
+
+
+def synthetic_inputs(awl_vocabulary, lore_vocabulary, count=200, seed=42) -> list:
+    """Player inputs of short, medium and near-maximum (500 char) length."""
+    rng = random.Random(seed)
+    awl_words, lore_terms = list(awl_vocabulary), list(lore_vocabulary)
+    inputs = []
+    for _ in range(count):
+        target = rng.choice([40, 120, 250, 480])
+        words = []
+        while sum(len(w) + 1 for w in words) < target:
+            roll = rng.random()
+            if roll < 0.10:
+                words.append(rng.choice(awl_words))
+            elif roll < 0.13:
+                words.append(rng.choice(lore_terms).title())
+            else:
+                words.append(rng.choice(FILLER))
+        inputs.append(" ".join(words).capitalize() + ".")
+    return inputs
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    """The AWL (as a vocabulary with sublists), the lore vocabulary and synthetic inputs over both."""
+    with open(os.path.join(REPO_ROOT, 'awl_definitions.json'), 'r', encoding='utf-8') as f:
+        awl_definitions = json.load(f)
+    with open(os.path.join(REPO_ROOT, 'lore_vocabulary.json'), 'r', encoding='utf-8') as f:
+        lore_vocabulary = json.load(f)
+    awl_vocabulary = {word: {"definition": definition, "sublist": i % 10 + 1}
+                      for i, (word, definition) in enumerate(awl_definitions.items())}
+    return {'awl': awl_vocabulary, 'lore': lore_vocabulary,
+            'inputs': synthetic_inputs(awl_vocabulary, lore_vocabulary)}
+
+
+def measure(fn, inputs) -> dict:
+    """Calls fn(text) over `inputs` repeatedly for at least MIN_TIME seconds."""
+    for text in inputs[:20]:
+        fn(text)  # warm up
+    timings = []
+    deadline = time.perf_counter() + MIN_TIME
+    while time.perf_counter() < deadline:
+        for text in inputs:
+            start = time.perf_counter_ns()
+            fn(text)
+            timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+    total_s = sum(timings) / 1e9
+    return {
+        'iterations': len(timings),
+        'ops_per_sec': round(len(timings) / total_s, 1),
+        'p50_us': round(timings[len(timings) // 2] / 1000, 2),
+        'p99_us': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000, 2),
+    }
+
+
+@pytest.fixture(scope='module')
+def results():
+    """Collects results from every benchmark and writes them out at the end."""
+    collected = {}
+    yield collected
+    os.makedirs(os.path.dirname(OUTPUT_PATH) or '.', exist_ok=True)
+    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': collected,
+        }, f, indent=4)
+    print(f"\nBenchmark results written to {OUTPUT_PATH}")
+
+
+def record(results, name, stats):
+    """Stores a result and fails if it regressed past the baseline tolerance."""
+    results[name] = stats
+    print(f"\n{name}: {stats['ops_per_sec']:.0f} ops/s, p50 {stats['p50_us']}us, p99 {stats['p99_us']}us")
+    if not os.path.exists(BASELINE_PATH):
+        return
+    with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+        baseline = json.load(f).get('results', {}).get(name)
+    if baseline:
+        floor = baseline['ops_per_sec'] * (1 - TOLERANCE / 100)
+        assert stats['ops_per_sec'] >= floor, (
+            f"{name} regressed: {stats['ops_per_sec']:.0f} ops/s vs baseline "
+            f"{baseline['ops_per_sec']:.0f} ops/s (tolerance {TOLERANCE}%)")
+
+
+def test_bench_find_terms_in_text(results, corpus):
+    matcher = TermMatcher(corpus['awl'])
+    record(results, 'find_terms_in_text', measure(lambda text: find_terms_in_text(text, matcher), corpus['inputs']))
+
+
+def test_bench_process_text_for_highlighting(results, corpus):
+    awl, lore = TermMatcher(corpus['awl']), TermMatcher(corpus['lore'])
+    def highlight(text):
+        terms = sorted(find_terms_in_text(text, lore) + find_terms_in_text(text, awl), key=lambda t: t[0])
+        return process_text_for_highlighting(text, terms, 'vocab-awl')
+    record(results, 'process_text_for_highlighting', measure(highlight, corpus['inputs']))
+
+
+def test_bench_calculate_xp(results, corpus, tmp_path, monkeypatch):
+    # Point the live vocabulary at the full AWL so scoring sees realistic hit rates
+    monkeypatch.setattr('daydream.vocabulary.core.VOCAB_DATA_DIR', str(tmp_path))
+    with open(tmp_path / 'academic_word_list.json', 'w', encoding='utf-8') as f:
+        json.dump(corpus['awl'], f)
+    from daydream.vocabulary.core import calculate_xp
+    learned = set(list(corpus['awl'])[:100])
+    record(results, 'calculate_xp', measure(lambda text: calculate_xp(text, learned), corpus['inputs']))
+
+
+def test_bench_analyze_content(results, corpus):
+    record(results, 'analyze_content', measure(analyze_content, corpus['inputs']))
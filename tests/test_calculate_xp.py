@@ -0,0 +1,63 @@
+from daydream.vocabulary.core import calculate_xp, calculate_xp_batch, iter_calculate_xp
+
+CHAPTER_INPUTS = [
+    "I need to analyze the data and evaluate the subsequent impact.",
+    "Let's ANALYZE it again, with a new approach.",
+    "",
+    "Look around.",
+    "approach, analyze... approach!",
+]
+
+def test_batch_matches_sequential_calculate_xp():
+    """Each batch result equals calculate_xp given the words learned so far."""
+    learned = {"data"}
+    expected = []
+    for text in CHAPTER_INPUTS:
+        xp, new_words = calculate_xp(text, learned)
+        expected.append((xp, new_words))
+        learned = learned | new_words
+
+    assert calculate_xp_batch(CHAPTER_INPUTS, {"data"}) == expected
+
+def test_first_use_credited_once_and_caller_set_untouched():
+    learned = set()
+    results = list(iter_calculate_xp(["analyze", "analyze", "Analyze!"], learned))
+    credited = [words for _, words in results if words]
+    assert credited == [{"analyze"}]
+    assert results[1] == (0, set())
+    assert learned == set()
+
+def test_inflections_credit_their_headword():
+    """Inflected and British forms credit the headword once, via the form index."""
+    from daydream.vocabulary.core import calculate_xp_detailed, get_vocabulary_snapshot
+    forms = get_vocabulary_snapshot().forms
+    assert forms['analysed'] == forms['analyses'] == forms['analysis'] == 'analyze'
+    assert forms['approaching'] == 'approach'
+
+    xp, credited = calculate_xp_detailed("We analysed the analyses, approaching it slowly.", set())
+    assert credited == {'analyze': 'analysed', 'approach': 'approaching'}
+    assert calculate_xp("Analysing again.", {'analyze'}) == (0, set())
+    assert calculate_xp("Analysing again.", set())[1] == {'analyze'}
+
+def test_generate_inflections():
+    from daydream.vocabulary.families import build_form_index, generate_inflections
+    assert {'varies', 'varied', 'varying'} <= generate_inflections('vary')
+    assert {'emphasise', 'emphasized', 'emphasising'} <= generate_inflections('emphasize')
+    assert {'committed', 'committing'} <= generate_inflections('commit')
+    assert {'labeled', 'labelled'} <= generate_inflections('label')
+    assert 'targetted' not in generate_inflections('target')
+    # Only the -ise/-ize verb suffix has another spelling
+    assert 'summarize' in generate_inflections('summarise')
+    assert 'precize' not in generate_inflections('precise') and 'advize' not in generate_inflections('advise')
+    assert 'sise' not in generate_inflections('size')
+    # A headword always maps to itself, even if it is another word's inflection
+    index = build_form_index(['process', 'processes'])
+    assert index['processes'] == 'processes' and index['processing'] == 'process'
+
+def test_doubled_consonant_forms_credit_their_headword():
+    from daydream.vocabulary.families import build_form_index
+    index = build_form_index(['commit', 'occur', 'transfer'])
+    assert index['committed'] == index['committing'] == 'commit'
+    assert index['occurred'] == index['occurring'] == 'occur'
+    assert index['transferred'] == 'transfer'
+    assert 'commited' not in index and 'occured' not in index
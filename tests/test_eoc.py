@@ -0,0 +1,114 @@
+import threading
+import time
+import pytest
+from daydream.storage import get_repository
+from daydream.utils import save_character_data, FS_CHAPTER_INPUTS
+from daydream.eoc.jobs import (build_chapter_report, persist_chapter_report, JobCancelledError,
+                               EOC_JOB_TIMEOUT)
+
+def _start_chapter_report(app, client):
+    with app.app_context():
+        repository = get_repository()
+        char_id = save_character_data('u1', {'name': 'Ada', FS_CHAPTER_INPUTS: ['I analyze the map.']})
+    repository.update_profile('u1', {'total_player_xp': 95, 'player_level': 1})
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+        sess['character_id'] = char_id
+    assert client.get('/eoc/').status_code == 200  # comprehension questions
+    return repository, char_id
+
+def _wait_for_job(client, job_id):
+    for _ in range(100):
+        status = client.get(f'/eoc/job/{job_id}').get_json()['status']
+        if status != 'pending':
+            return status
+        time.sleep(0.05)
+    return 'pending'
+
+def test_chapter_is_graded_in_a_background_job(sqlite_app, client, mocker):
+    repository, char_id = _start_chapter_report(sqlite_app, client)
+
+    # Both calls wait until the other has started: run one after the other, they would time out
+    barrier = threading.Barrier(2, timeout=5)
+    responses = {'EVALUATE_CHAPTER_COMPREHENSION': {'overall_comprehension_score': 8},
+                 'ANALYZE_PLAYER_WRITING': {'awl_words_used': ['analyze'], 'style_rating': 'H'}}
+    def generate(prompt_type, context):
+        barrier.wait()
+        return responses[prompt_type]
+    mocker.patch.object(sqlite_app.extensions['ai_provider'], 'generate', side_effect=generate)
+
+    response = client.post('/eoc/', data={f'comp_answer_{i}': 'An answer.' for i in (1, 2, 3)})
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        job_id = sess['eoc_job_id']
+        assert sess['eoc_state'] == 'AWAIT_ANALYSIS'
+    assert _wait_for_job(client, job_id) == 'done'
+
+    # The results were persisted by the job; the report page picks them up
+    char_data, _ = repository.get_character(char_id)
+    assert [s['player_xp_gained'] for s in char_data['report_summaries']] == [15]
+    assert char_data[FS_CHAPTER_INPUTS] == []
+    assert repository.get_profile('u1', ['total_player_xp', 'player_level']) == {'total_player_xp': 110, 'player_level': 2}
+    assert client.get('/eoc/').status_code == 302
+    with client.session_transaction() as sess:
+        assert sess['eoc_state'] == 'AWAIT_REPORT_ACK'
+        assert 'Player XP Gained:** +15' in sess['eoc_report_summary']
+    assert b'Chapter Report Summary' in client.get('/eoc/').data
+
+def test_failed_job_asks_for_the_answers_again(sqlite_app, client, mocker):
+    repository, char_id = _start_chapter_report(sqlite_app, client)
+    mocker.patch('daydream.eoc.jobs.persist_chapter_report', side_effect=RuntimeError('storage down'))
+    client.post('/eoc/', data={f'comp_answer_{i}': 'An answer.' for i in (1, 2, 3)})
+    with client.session_transaction() as sess:
+        job_id = sess['eoc_job_id']
+    assert _wait_for_job(client, job_id) == 'failed'
+    assert b'comp_answer_1' in client.get('/eoc/').data
+    assert repository.get_character(char_id)[0][FS_CHAPTER_INPUTS] == ['I analyze the map.']
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'someone-else'
+    assert client.get(f'/eoc/job/{job_id}').status_code == 404
+
+def test_job_past_the_timeout_is_cancelled(sqlite_app, client, mocker):
+    repository, char_id = _start_chapter_report(sqlite_app, client)
+    release = threading.Event()
+    def generate(prompt_type, context):
+        release.wait(5)
+        return {'overall_comprehension_score': 8}
+    mocker.patch.object(sqlite_app.extensions['ai_provider'], 'generate', side_effect=generate)
+    client.post('/eoc/', data={f'comp_answer_{i}': 'An answer.' for i in (1, 2, 3)})
+    with client.session_transaction() as sess:
+        job_id = sess['eoc_job_id']
+
+    # The job outlives EOC_JOB_TIMEOUT: the player is asked for the answers again
+    repository.update_job(job_id, {'submitted_at': time.time() - EOC_JOB_TIMEOUT - 1})
+    assert b'comp_answer_1' in client.get('/eoc/').data
+
+    # When it does finish, it must not award the chapter as well
+    release.set()
+    for _ in range(100):
+        if repository.get_job(job_id)['status'] != 'pending':
+            break
+        time.sleep(0.05)
+    assert repository.get_job(job_id)['status'] == 'failed'
+    char_data, _ = repository.get_character(char_id)
+    assert 'report_summaries' not in char_data
+    assert repository.get_profile('u1', ['total_player_xp']) == {'total_player_xp': 95}
+
+def test_committed_report_is_shown_when_the_job_cannot_be_marked_done(sqlite_app, client, mocker):
+    repository, char_id = _start_chapter_report(sqlite_app, client)
+    mocker.patch.object(sqlite_app.extensions['ai_provider'], 'generate', return_value={'overall_comprehension_score': 8})
+    mocker.patch.object(repository, 'update_job', side_effect=RuntimeError('storage down'))
+    client.post('/eoc/', data={f'comp_answer_{i}': 'An answer.' for i in (1, 2, 3)})
+    with client.session_transaction() as sess:
+        job_id = sess['eoc_job_id']
+    assert _wait_for_job(client, job_id) == 'done'
+
+    assert client.get('/eoc/').status_code == 302
+    with client.session_transaction() as sess:
+        assert sess['eoc_state'] == 'AWAIT_REPORT_ACK'
+    # Committed once; grading the same job again is refused
+    with pytest.raises(JobCancelledError), sqlite_app.app_context():
+        persist_chapter_report('u1', char_id, build_chapter_report({}, {}), job_id)
+    assert len(repository.get_character(char_id)[0]['report_summaries']) == 1
+    assert repository.get_profile('u1', ['total_player_xp']) == {'total_player_xp': 103}
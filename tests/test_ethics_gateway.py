@@ -0,0 +1,51 @@
+import random
+from daydream.ethics.gateway import ModerationEngine, analyze_content
+
+ENGINE = ModerationEngine([
+    {"category": "hate", "severity": "high", "terms": ["hate", "hate speech"]},
+    {"category": "mild", "severity": "low", "terms": ["darn"]},
+])
+
+def test_analyze_content_uses_word_boundaries():
+    result = analyze_content("I HATE this.")
+    assert result['safe'] is False
+    assert result['reason'] == 'Content contains forbidden keyword: hate'
+    assert result['category'] == 'hate'
+    assert analyze_content("The chateau was lovely, whatever.") == {'safe': True}
+
+def test_low_severity_terms_are_flagged_not_blocked():
+    assert ENGINE.check("Oh darn.") == {'safe': True, 'flags': [{'term': 'darn', 'category': 'mild', 'severity': 'low'}]}
+
+def test_stream_catches_terms_split_across_chunks():
+    stream = ENGINE.stream()
+    released = stream.feed("We don't h")['text'] + stream.feed("at")['text']
+    verdict = stream.feed("e anyone.")
+    assert verdict['safe'] is False
+    assert 'hat' not in released
+    assert stream.close() is verdict
+
+def test_stream_defers_words_that_may_continue():
+    stream = ENGINE.stream()
+    assert stream.feed("What a hate")['safe']  # may still become "hateful"...
+    assert stream.feed("ful")['safe']           # ...which is not a rule term
+    result = stream.close()
+    assert result['safe'] and result['text'].endswith("hateful")
+
+def test_stream_matches_whole_text_check():
+    rng = random.Random(7)
+    words = ["hate", "hat", "speech", "darn", "chateau", "ok", "hate-speech", "x"]
+    for _ in range(300):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+        stream = ENGINE.stream()
+        pos, pieces, verdict = 0, [], None
+        while pos < len(text):
+            step = rng.randint(1, 5)
+            verdict = stream.feed(text[pos:pos + step])
+            if not verdict['safe']:
+                break
+            pieces.append(verdict['text'])
+            pos += step
+        final = stream.close()
+        assert final['safe'] == ENGINE.check(text)['safe'], text
+        if final['safe']:
+            assert "".join(pieces) + final['text'] == text
@@ -0,0 +1,44 @@
+from daydream.term_matcher import TermMatcher
+from daydream.game.highlighting import HighlightCache, render_highlighted_text
+
+AWL = TermMatcher({"analyze": {"definition": "To examine in detail.", "sublist": 1}})
+LORE = TermMatcher({"thetopia": {"display_term": "Thetopia", "lore_path": ["locations", "Thetopia"]}})
+
+def test_render_highlighted_text():
+    html = render_highlighted_text("Analyze Thetopia.", AWL, LORE)
+    assert html == ('<span class="vocab-awl" title="To examine in detail.">Analyze</span> '
+                    '<span class="lore-term" data-lore-path="[&quot;locations&quot;, &quot;Thetopia&quot;]">Thetopia</span>.')
+
+def test_render_escapes_message_text_and_attributes():
+    definitions = TermMatcher({"analyze": {"definition": 'Say "hi" <b>', "sublist": 1}})
+    html = render_highlighted_text('<script>alert(1)</script> Analyze & "go"', definitions, LORE)
+    assert html == ('&lt;script&gt;alert(1)&lt;/script&gt; '
+                    '<span class="vocab-awl" title="Say &quot;hi&quot; &lt;b&gt;">Analyze</span> &amp; &quot;go&quot;')
+    assert render_highlighted_text('<img src=x onerror=alert(1)>', AWL, LORE) == '&lt;img src=x onerror=alert(1)&gt;'
+
+def test_cache_reuses_renders_and_invalidates_on_vocab_change():
+    cache = HighlightCache(max_entries=2)
+    calls = []
+    render = lambda text: calls.append(text) or text.upper()
+
+    assert cache.get_or_render("hello", 1, render) == "HELLO"
+    assert cache.get_or_render("hello", 1, render) == "HELLO"
+    assert calls == ["hello"]
+
+    # A new vocabulary generation drops previously rendered HTML
+    cache.get_or_render("hello", 2, render)
+    assert calls == ["hello", "hello"]
+
+def test_cache_is_bounded():
+    cache = HighlightCache(max_entries=2, max_bytes=8)
+    render = lambda text: text
+    for text in ["aaaa", "bbbb", "cccc"]:
+        cache.get_or_render(text, 1, render)
+    assert len(cache._entries) == 2
+    cache.get_or_render("x" * 20, 1, render)  # larger than max_bytes, never stored
+    assert cache._size <= 8
+
+def test_inflected_forms_tagged_with_headword():
+    forms = TermMatcher({"analyze": "analyze", "analysed": "analyze"})
+    html = render_highlighted_text("Analysed.", forms, LORE, {"analyze": "To examine in detail."})
+    assert html == '<span class="vocab-awl" title="To examine in detail." data-headword="analyze">Analysed</span>.'
@@ -1,4 +1,5 @@
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import MagicMock
 
 def test_connect_request(client, app):
@@ -62,11 +63,31 @@ def test_mentor_inbox(client, app):
     mock_db = app.config['DB']
 
     mock_doc = MagicMock()
-    mock_doc.to_dict.return_value = {'reflection_id': 'reflection1', 'learner_id': 'learner1'}
+    mock_doc.id = 'shared1'
+    mock_doc.to_dict.return_value = {'reflection_id': 'reflection1', 'learner_id': 'learner1',
+                                     'shared_at': datetime(2024, 5, 1, tzinfo=timezone.utc)}
 
-    mock_db.collection.return_value.where.return_value.order_by.return_value.stream.return_value = [mock_doc]
+    query = mock_db.collection.return_value.where.return_value.order_by.return_value.order_by.return_value
+    query.limit.return_value.stream.return_value = [mock_doc]
+    mock_db.collection.return_value.where.return_value.where.return_value.count.return_value.get.return_value = [[MagicMock(value=1)]]
 
-    response = client.get('/api/mentor/inbox')
+    response = client.get('/api/mentor/inbox?limit=10')
     assert response.status_code == 200
-    assert len(response.json) == 1
-    assert response.json[0]['reflection_id'] == 'reflection1'
+    assert len(response.json['reflections']) == 1
+    assert response.json['reflections'][0]['reflection_id'] == 'reflection1'
+    assert response.json['reflections'][0]['shared_at'] == '2024-05-01T00:00:00+00:00'
+    assert response.json['next_cursor'] is None
+    assert response.json['unread_count'] == 1
+    query.limit.assert_called_with(11)
+
+    # A cursor resumes after (shared_at, id), so reflections shared at the same instant are not skipped
+    cursor = client.get('/api/mentor/inbox?limit=10').json['sync_token']
+    client.get(f'/api/mentor/inbox?cursor={cursor}')
+    query.start_after.assert_called_with({'shared_at': datetime(2024, 5, 1, tzinfo=timezone.utc), '__name__': 'shared1'})
+
+def test_mentor_inbox_rejects_bad_cursor(client, app):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'mentor1'
+    app.config['BYPASS_EXTERNAL_SERVICES'] = False
+
+    assert client.get('/api/mentor/inbox?cursor=not-a-token').status_code == 400
@@ -63,6 +63,7 @@ def test_persona_service(app, mocker):
         # Mock the Firestore client and set it in the app config
         mock_db = MagicMock()
         app.config['DB'] = mock_db
+        app.config['BYPASS_EXTERNAL_SERVICES'] = False
 
         # Mock the collections and documents
         mock_archetypes_collection = MagicMock()
@@ -92,16 +93,17 @@ def test_persona_service(app, mocker):
         mock_dilemma_doc.to_dict.return_value = {'text': 'Dilemma 1'}
         mock_dilemmas_collection.stream.return_value = [mock_dilemma_doc]
 
-        # Mock the choice documents
-        mock_choices_collection = MagicMock()
-        mock_dilemma_doc.reference.collection.return_value = mock_choices_collection
+        # Mock the choice documents, fetched with one collection group query
         mock_choice_doc1 = MagicMock()
         mock_choice_doc1.id = 'choice1'
         mock_choice_doc1.to_dict.return_value = {'text': 'Choice 1', 'archetype_id': 'archetype1'}
         mock_choice_doc2 = MagicMock()
         mock_choice_doc2.id = 'choice2'
         mock_choice_doc2.to_dict.return_value = {'text': 'Choice 2', 'archetype_id': 'archetype2'}
-        mock_choices_collection.stream.return_value = [mock_choice_doc1, mock_choice_doc2]
+        for choice_doc in (mock_choice_doc1, mock_choice_doc2):
+            choice_doc.reference.parent.parent.id = 'dilemma1'
+            choice_doc.reference.parent.parent.parent.id = 'dilemmas'
+        mock_db.collection_group.return_value.stream.return_value = [mock_choice_doc1, mock_choice_doc2]
 
         # Test the PersonaService - it will now use the mock_db from app.config
         persona_service = PersonaService()
@@ -114,3 +116,65 @@ def test_persona_service(app, mocker):
         assert dilemmas[0]['text'] == 'Dilemma 1'
         assert len(dilemmas[0]['choices']) == 2
         assert dilemmas[0]['choices'][0]['text'] == 'Choice 1'
+        mock_db.collection_group.assert_called_once_with('choices')
+        mock_dilemma_doc.reference.collection.assert_not_called()
+
+def test_persona_content_is_cached(app, mocker):
+    """The quiz content is read once, then only its version is checked after the TTL."""
+    with app.app_context():
+        app.config['BYPASS_EXTERNAL_SERVICES'] = False
+        repository = MagicMock()
+        repository.list_archetypes.return_value = [{'id': 'archetype1', 'name': 'Hero'}]
+        repository.list_dilemmas.return_value = [{'id': 'dilemma1', 'choices': []}]
+        repository.get_persona_content_version.return_value = 1
+        mocker.patch('daydream.persona.models.get_repository', return_value=repository)
+        cache = app.extensions['persona_cache']
+
+        PersonaService().get_all_dilemmas()
+        PersonaService().get_all_archetypes()[0]['name'] = 'Changed by a caller'
+        assert PersonaService().get_all_archetypes()[0]['name'] == 'Hero'
+        assert repository.list_dilemmas.call_count == 1
+        assert repository.get_persona_content_version.call_count == 1
+
+        cache.ttl = 0
+        PersonaService().get_all_dilemmas()
+        assert repository.list_dilemmas.call_count == 1  # same version: not re-read
+        repository.get_persona_content_version.return_value = 2
+        PersonaService().get_all_dilemmas()
+        assert repository.list_dilemmas.call_count == 2
+
+        cache.invalidate()
+        cache.ttl = 600
+        PersonaService().get_all_dilemmas()
+        assert repository.list_dilemmas.call_count == 3
+
+def test_seeding_bumps_the_content_version(app, mocker, tmp_path):
+    """A seeded version lets workers revalidate the content after the TTL without re-reading it."""
+    import seed_persona_quiz
+    from firebase_admin import firestore
+    from daydream.storage import SQLiteRepository
+    key = tmp_path / 'key.json'
+    key.write_text('{}')
+    mocker.patch.dict('os.environ', {'FIREBASE_SERVICE_ACCOUNT_KEY': str(key)})
+    mocker.patch('seed_persona_quiz.credentials.Certificate')
+    mocker.patch('seed_persona_quiz.firebase_admin.initialize_app')
+    db = mocker.patch('seed_persona_quiz.firestore.client').return_value
+    seed_persona_quiz.seed_database()
+    db.collection.assert_any_call('persona_meta')
+    db.collection.return_value.document.assert_any_call('content')
+    db.collection.return_value.document.return_value.set.assert_called_with({'version': firestore.SERVER_TIMESTAMP})
+
+    repository = SQLiteRepository(str(tmp_path / 'db.sqlite3'))
+    repository._merge('persona_meta', 'content', {'version': '2024-05-01T00:00:00Z'})
+    list_archetypes = mocker.spy(repository, 'list_archetypes')
+    list_dilemmas = mocker.spy(repository, 'list_dilemmas')
+    cache = app.extensions['persona_cache']
+    cache.ttl = 0
+    cache.get(repository)
+    cache.get(repository)
+    assert list_archetypes.call_count == list_dilemmas.call_count == 1
+    assert cache.revalidations == 1
+
+    repository._merge('persona_meta', 'content', {'version': '2024-05-02T00:00:00Z'})
+    cache.get(repository)
+    assert list_archetypes.call_count == list_dilemmas.call_count == 2
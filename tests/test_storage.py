@@ -0,0 +1,473 @@
+import threading
+import pytest
+from flask import Response, stream_with_context
+from unittest.mock import MagicMock
+from google.api_core.exceptions import FailedPrecondition
+from daydream.storage import SQLiteRepository, UnitOfWork, ConflictError, OwnershipError, get_repository
+from daydream.utils import (load_character_data, save_character_data, get_user_characters,
+                            append_conversation, load_conversation_page,
+                            update_player_profile, increment_player_profile,
+                            get_player_profile, check_premium_access, remove_character_summary,
+                            FS_CONVERSATION, FS_CONVERSATION_COUNT, CONVERSATION_TAIL_LINES,
+                            CONVERSATION_SEGMENT_SIZE)
+
+def test_sqlite_repository_round_trip(tmp_path):
+    repo = SQLiteRepository(str(tmp_path / 'db.sqlite3'))
+    assert repo._query("PRAGMA journal_mode")[0][0] == 'wal'
+
+    char_id = repo.new_character_id()
+    repo.set_character(char_id, {'user_id': 'u1', 'name': 'Ada', 'learned_vocab': {'b', 'a'}})
+    repo.set_character(char_id, {'xp': 5})
+    data, update_time = repo.get_character(char_id)
+    assert data == {'user_id': 'u1', 'name': 'Ada', 'learned_vocab': ['a', 'b'], 'xp': 5}
+    assert update_time == repo.get_character_version(char_id)
+    assert [c['id'] for c in repo.list_characters('u1')] == [char_id]
+    assert repo.list_characters('u2') == []
+
+    repo.update_profile('u1', {'email': 'a@example.com', 'total_player_xp': 10})
+    repo.increment_profile_field('u1', 'total_player_xp', 7)
+    assert repo.get_profile('u1', ['total_player_xp']) == {'total_player_xp': 17}
+    assert repo.find_profile_by_email('a@example.com')['id'] == 'u1'
+
+    # The filter columns are indexed
+    plan = repo._query("EXPLAIN QUERY PLAN SELECT id FROM mentor_connections WHERE mentor_id = ? AND status = ?", ('m', 'p'))
+    assert 'idx_mentor_connections' in ' '.join(row['detail'] for row in plan)
+    plan = repo._query("EXPLAIN QUERY PLAN SELECT count(*) FROM shared_reflections WHERE mentor_id = ? AND NOT viewed", ('m',))
+    assert 'idx_shared_reflections_viewed' in ' '.join(row['detail'] for row in plan)
+
+def test_character_helpers_use_sqlite_backend(sqlite_app):
+    with sqlite_app.app_context():
+        assert isinstance(get_repository(), SQLiteRepository)
+        char_id = save_character_data('u1', {'name': 'Ada', 'race_name': 'Human'})
+        assert load_character_data('u1', char_id)['name'] == 'Ada'
+        assert load_character_data('u2', char_id) is None
+        assert save_character_data('u2', {'id': char_id, 'name': 'Stolen'}) is None
+        assert get_user_characters('u1') == [{'id': char_id, 'name': 'Ada', 'race': 'Human', 'class': 'Unknown Class'}]
+
+def test_mentor_flow_on_sqlite(sqlite_app, client):
+    with sqlite_app.app_context():
+        get_repository().update_profile('mentor1', {'email': 'mentor@example.com'})
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'learner1'
+    assert client.post('/api/mentor/connect', json={'mentor_username': 'mentor@example.com'}).status_code == 201
+    assert client.post('/api/mentor/connect', json={'mentor_username': 'mentor@example.com'}).status_code == 409
+    assert client.post('/api/reflection/share/r1', json={'mentor_id': 'mentor1'}).status_code == 403
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'mentor1'
+    assert client.put('/api/mentor/accept/learner1').status_code == 200
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'learner1'
+    assert client.post('/api/reflection/share/r1', json={'mentor_id': 'mentor1'}).status_code == 200
+    assert client.post('/api/reflection/share/r2', json={'mentor_id': 'mentor1'}).status_code == 200
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'mentor1'
+    inbox = client.get('/api/mentor/inbox').json
+    assert [r['reflection_id'] for r in inbox['reflections']] == ['r2', 'r1']
+    assert inbox['unread_count'] == 2
+
+    # Paging back with the cursor, then syncing only what is new
+    page = client.get('/api/mentor/inbox?limit=1').json
+    assert [r['reflection_id'] for r in page['reflections']] == ['r2']
+    page = client.get(f"/api/mentor/inbox?limit=1&cursor={page['next_cursor']}").json
+    assert [r['reflection_id'] for r in page['reflections']] == ['r1']
+    assert page['next_cursor'] is None
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'learner1'
+    client.post('/api/reflection/share/r3', json={'mentor_id': 'mentor1'})
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'mentor1'
+    synced = client.get(f"/api/mentor/inbox?since={inbox['sync_token']}").json
+    assert [r['reflection_id'] for r in synced['reflections']] == ['r3']
+    assert synced['unread_count'] == 3
+
+    viewed = client.post('/api/mentor/inbox/viewed', json={'ids': [r['id'] for r in inbox['reflections']]}).json
+    assert viewed == {'updated': 2, 'unread_count': 1}
+
+def test_inbox_pages_through_reflections_shared_at_the_same_instant(sqlite_app, client, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+    mocker.patch('daydream.storage.sqlite_backend._now', return_value='2024-05-01T00:00:00+00:00')
+    shared = {repository.add_shared_reflection({'mentor_id': 'mentor1', 'reflection_id': f'r{i}'}) for i in range(3)}
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'mentor1'
+    page = client.get('/api/mentor/inbox?limit=1').json
+    sync_token, seen = page['sync_token'], [r['id'] for r in page['reflections']]
+    while page['next_cursor']:
+        page = client.get(f"/api/mentor/inbox?limit=1&cursor={page['next_cursor']}").json
+        seen += [r['id'] for r in page['reflections']]
+    assert sorted(seen) == sorted(shared) and len(seen) == 3
+
+    # A sync returns nothing it has already delivered
+    assert client.get(f"/api/mentor/inbox?since={sync_token}").json['reflections'] == []
+
+def test_character_cache_serves_turns_without_reads(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+        with sqlite_app.test_request_context():
+            char_id = save_character_data('u1', {'name': 'Ada', 'xp': 0})
+        get_character = mocker.spy(repository, 'get_character')
+        commit = mocker.spy(repository, 'commit')
+
+        # A turn: load, save twice; one coalesced write when the request ends, no reads
+        with sqlite_app.test_request_context():
+            p_data = load_character_data('u1', char_id)
+            p_data['xp'] = 5
+            save_character_data('u1', p_data)
+            p_data['location'] = 'Market'
+            save_character_data('u1', p_data)
+            assert save_character_data('u2', {'id': char_id, 'name': 'Stolen'}) is None
+            assert commit.call_count == 0
+        assert commit.call_count == 1
+        assert get_character.call_count == 0
+        assert repository.get_character(char_id)[0] == {'name': 'Ada', 'xp': 5, 'location': 'Market', 'id': char_id, 'user_id': 'u1'}
+
+def test_character_cache_revalidates_every_load(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+        char_id = save_character_data('u1', {'name': 'Ada'})
+        get_character = mocker.spy(repository, 'get_character')
+        get_version = mocker.spy(repository, 'get_character_version')
+        assert load_character_data('u1', char_id)['name'] == 'Ada'
+        assert get_character.call_count == 0  # unchanged version: no document read
+        assert get_version.call_count == 1
+
+        # Another worker's write is seen by the very next load
+        repository.set_character(char_id, {'name': 'Changed elsewhere'})
+        assert load_character_data('u1', char_id)['name'] == 'Changed elsewhere'
+        assert get_character.call_count == 1
+
+def test_character_cache_ttl_skips_the_version_check(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+        sqlite_app.extensions['character_cache'].ttl = 60
+        char_id = save_character_data('u1', {'name': 'Ada'})
+        get_version = mocker.spy(repository, 'get_character_version')
+        assert load_character_data('u1', char_id)['name'] == 'Ada'
+        assert get_version.call_count == 0
+
+def test_guarded_character_writes(tmp_path):
+    repo = SQLiteRepository(str(tmp_path / 'db.sqlite3'))
+    version = repo.create_character('c1', {'user_id': 'u1', 'xp': 0})
+    with pytest.raises(ConflictError):
+        repo.create_character('c1', {'user_id': 'u2'})
+    with pytest.raises(OwnershipError):
+        repo.set_character('c1', {'xp': 99}, owner_id='u2')
+
+    newer = repo.set_character('c1', {'xp': 5}, owner_id='u1', expected_update_time=version)
+    with pytest.raises(ConflictError):
+        repo.set_character('c1', {'xp': 7}, owner_id='u1', expected_update_time=version)
+    assert repo.get_character('c1') == ({'user_id': 'u1', 'xp': 5}, newer)
+
+def test_firestore_save_is_one_precondition_guarded_write():
+    from daydream.storage import FirestoreRepository
+    db = MagicMock()
+    ref = db.collection.return_value.document.return_value
+    FirestoreRepository(db).set_character('c1', {'xp': 5}, owner_id='u1', expected_update_time='t1')
+    db.write_option.assert_called_once_with(last_update_time='t1')
+    ref.update.assert_called_once_with({'xp': 5}, option=db.write_option.return_value)
+    ref.get.assert_not_called()
+
+    ref.update.side_effect = FailedPrecondition('stale')
+    with pytest.raises(ConflictError):
+        FirestoreRepository(db).set_character('c1', {'xp': 6}, owner_id='u1', expected_update_time='t1')
+
+def test_profile_updates_create_a_missing_profile(tmp_path):
+    from daydream.storage import FirestoreRepository, Repository
+    from google.cloud import firestore
+    with pytest.raises(TypeError):
+        Repository()
+
+    repo = SQLiteRepository(str(tmp_path / 'db.sqlite3'))
+    repo.update_profile('u1', {'email': 'a@example.com'})
+    repo.increment_profile_field('u2', 'total_player_xp', 5)
+    assert repo.get_profile('u1') == {'email': 'a@example.com'}
+    assert repo.get_profile('u2') == {'total_player_xp': 5}
+
+    db = MagicMock()
+    ref = db.collection.return_value.document.return_value
+    FirestoreRepository(db).update_profile('u1', {'email': 'a@example.com'})
+    FirestoreRepository(db).increment_profile_field('u2', 'total_player_xp', 5)
+    assert ref.set.call_args_list[0].args == ({'email': 'a@example.com'},)
+    assert ref.set.call_args_list[1].args == ({'total_player_xp': firestore.Increment(5)},)
+    assert all(call.kwargs == {'merge': True} for call in ref.set.call_args_list)
+    ref.update.assert_not_called()
+
+def test_concurrent_modification_is_not_overwritten(sqlite_app, mocker):
+    @sqlite_app.route('/api/test-turn', methods=['POST'])
+    def turn():
+        p_data = load_character_data('u1', char_id)
+        p_data['xp'] += 1
+        # Another worker saves the character while this turn is running
+        repository.set_character(char_id, {'xp': 50})
+        save_character_data('u1', p_data)
+        return {'ok': True}
+
+    with sqlite_app.app_context():
+        repository = get_repository()
+        char_id = save_character_data('u1', {'name': 'Ada', 'xp': 0})
+        commit = mocker.spy(repository, 'commit')
+
+    response = sqlite_app.test_client().post('/api/test-turn')
+    assert response.status_code == 409
+    assert response.json['character_id'] == char_id
+    assert commit.call_count == 1  # one guarded attempt
+    with sqlite_app.app_context():
+        assert repository.get_character(char_id)[0]['xp'] == 50
+        assert load_character_data('u1', char_id)['xp'] == 50
+
+def test_commit_failure_after_a_streamed_response_is_raised(sqlite_app):
+    @sqlite_app.route('/api/test-stream-turn', methods=['POST'])
+    def stream_turn():
+        def generate():
+            p_data = load_character_data('u1', char_id)
+            p_data['xp'] += 1
+            repository.set_character(char_id, {'xp': 50})
+            save_character_data('u1', p_data)
+            yield 'ok'
+        return Response(stream_with_context(generate()))
+
+    with sqlite_app.app_context():
+        repository = get_repository()
+        char_id = save_character_data('u1', {'name': 'Ada', 'xp': 0})
+
+    response = sqlite_app.test_client().post('/api/test-stream-turn')
+    assert response.status_code == 200
+    with pytest.raises(ConflictError):
+        response.get_data()
+        response.close()
+    with sqlite_app.app_context():
+        assert repository.get_character(char_id)[0]['xp'] == 50
+
+def test_character_creation_saves_under_the_preassigned_id(sqlite_app, client):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+        sess['new_char_details'] = {'name': 'Ada', 'race_name': 'Human', 'class_name': 'Bard',
+                                    'philosophy_name': 'Stoic', 'boon': 'Luck', 'backstory': '...',
+                                    'starting_quest': 'Find the gate'}
+    response = client.post('/character/create', data={'creation_stage': 'finalize'})
+    assert response.status_code == 302 and '/profile' in response.location
+    with sqlite_app.app_context():
+        characters = get_repository().list_characters('u1')
+    assert [c['name'] for c in characters] == ['Ada']
+    assert characters[0]['id'].startswith('u1_custom_') and characters[0]['user_id'] == 'u1'
+
+def test_conversation_log_is_segmented_and_paged(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+        p_data = {'name': 'Ada', FS_CONVERSATION: [{'speaker': 'Old', 'text': 'legacy'}]}
+        char_id = save_character_data('u1', p_data)
+        append = mocker.spy(repository, 'append_conversation')
+
+        # The first append moves the unsegmented history into the log
+        append_conversation(p_data, [{'speaker': 'Player', 'text': 'turn 1'}])
+        assert append.call_args.args[1:3] == (0, [{'speaker': 'Old', 'text': 'legacy'}, {'speaker': 'Player', 'text': 'turn 1'}])
+        for turn in range(2, 120):
+            append_conversation(p_data, [{'speaker': 'Player', 'text': f'turn {turn}'}])
+        # Each turn writes only its new message
+        assert append.call_args.args[1:3] == (119, [{'speaker': 'Player', 'text': 'turn 119'}])
+        save_character_data('u1', p_data)
+
+        p_data = load_character_data('u1', char_id)
+        assert p_data[FS_CONVERSATION_COUNT] == 120
+        assert len(p_data[FS_CONVERSATION]) == CONVERSATION_TAIL_LINES
+
+        get_conversation = mocker.spy(repository, 'get_conversation')
+        messages, cursor = load_conversation_page(p_data)
+        assert [m['text'] for m in messages] == [f'turn {t}' for t in range(100, 120)]
+        assert get_conversation.call_count == 0  # served from the tail
+
+        texts = []
+        while cursor is not None:
+            messages, cursor = load_conversation_page(p_data, before=cursor, limit=30)
+            texts = [m['text'] for m in messages] + texts
+        assert texts == ['legacy'] + [f'turn {t}' for t in range(1, 100)]
+
+def test_conversation_page_endpoint(sqlite_app, client):
+    with sqlite_app.app_context():
+        p_data = {'name': 'Ada'}
+        char_id = save_character_data('u1', p_data)
+        append_conversation(p_data, [{'speaker': 'Player', 'text': f'line {i}'} for i in range(30)])
+        save_character_data('u1', p_data)
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+        sess['character_id'] = char_id
+    page = client.get('/game/conversation?before=10').json
+    assert [m['text'] for m in page['messages']] == [f'line {i}' for i in range(10)]
+    assert page['before'] is None
+
+def test_concurrent_turns_do_not_overwrite_the_log(sqlite_app):
+    @sqlite_app.route('/api/test-append', methods=['POST'])
+    def append_turn():
+        p_data = load_character_data('u1', char_id)
+        # Another worker's turn appends at the same index while this one is running
+        other = UnitOfWork()
+        other.save_character(char_id, {FS_CONVERSATION_COUNT: 2}, 'u1')
+        other.append_conversation(char_id, 1, [{'speaker': 'Player', 'text': 'other turn'}], CONVERSATION_SEGMENT_SIZE)
+        repository.commit(other)
+        append_conversation(p_data, [{'speaker': 'Player', 'text': 'this turn'}])
+        save_character_data('u1', p_data)
+        return {'ok': True}
+
+    with sqlite_app.app_context():
+        repository = get_repository()
+        p_data = {'name': 'Ada'}
+        char_id = save_character_data('u1', p_data)
+        append_conversation(p_data, [{'speaker': 'Player', 'text': 'first'}])
+        save_character_data('u1', p_data)
+
+    assert sqlite_app.test_client().post('/api/test-append').status_code == 409
+    texts = [m['text'] for m in repository.get_conversation(char_id, 0, 3, CONVERSATION_SEGMENT_SIZE)]
+    assert texts == ['first', 'other turn']
+
+def test_request_mutations_commit_together(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+        repository.update_profile('u1', {'total_player_xp': 95, 'player_level': 1})
+        char_id = save_character_data('u1', {'name': 'Ada', 'xp': 0})
+        commit = mocker.spy(repository, 'commit')
+
+        with sqlite_app.test_request_context():
+            p_data = load_character_data('u1', char_id)
+            increment_player_profile('u1', 'total_player_xp', 10)
+            update_player_profile('u1', {'player_level': 2})
+            p_data['xp'] = 10
+            save_character_data('u1', p_data)
+        assert commit.call_count == 1
+        assert repository.get_profile('u1', ['total_player_xp', 'player_level']) == {'total_player_xp': 105, 'player_level': 2}
+        assert repository.get_character(char_id)[0]['xp'] == 10
+
+        # A conflicting character write discards the profile changes too
+        with pytest.raises(ConflictError), sqlite_app.test_request_context():
+            p_data = load_character_data('u1', char_id)
+            repository.set_character(char_id, {'xp': 50})
+            increment_player_profile('u1', 'total_player_xp', 10)
+            save_character_data('u1', p_data)
+        assert repository.get_profile('u1')['total_player_xp'] == 105
+        assert repository.get_character(char_id)[0]['xp'] == 50
+
+def test_firestore_commit_is_one_batch():
+    from daydream.storage import FirestoreRepository
+    from google.cloud import firestore
+    db = MagicMock()
+    unit = UnitOfWork()
+    unit.save_character('c1', {'xp': 5}, 'u1', expected_update_time='t1')
+    unit.increment_profile_field('u1', 'total_player_xp', 10)
+    FirestoreRepository(db).commit(unit)
+
+    batch = db.batch.return_value
+    batch.update.assert_called_once_with(db.collection.return_value.document.return_value, {'xp': 5},
+                                         option=db.write_option.return_value)
+    assert batch.set.call_args.args[1] == {'total_player_xp': firestore.Increment(10)}
+    batch.commit.assert_called_once()
+    db.transaction.assert_not_called()
+
+def test_profile_is_read_once_per_request(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+    repository.update_profile('u1', {'role': 'instructor', 'has_premium': True, 'vocab_settings': {'use_default_awl': True}})
+    get_profile = mocker.spy(repository, 'get_profile')
+
+    with sqlite_app.test_request_context():
+        assert get_player_profile('u1', ['role']) == {'role': 'instructor'}
+        assert check_premium_access('u1') is True
+        assert get_player_profile('u1', ['vocab_settings']) == {'vocab_settings': {'use_default_awl': True}}
+    assert get_profile.call_count == 1
+
+    # A field outside the common projection is merged into one more read
+    with sqlite_app.test_request_context():
+        get_player_profile('u1', ['role'])
+        get_player_profile('u1', ['nickname'])
+        get_player_profile('u1', ['has_premium', 'nickname'])
+    assert get_profile.call_count == 3
+
+def test_profile_cache_shares_reads_across_requests(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+    repository.update_profile('u1', {'has_premium': False})
+    cache = sqlite_app.extensions['profile_cache']
+    cache.ttl = 30
+    get_profile = mocker.spy(repository, 'get_profile')
+
+    for _ in range(3):
+        with sqlite_app.test_request_context():
+            assert check_premium_access('u1') is False
+    assert get_profile.call_count == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    with sqlite_app.test_request_context():
+        update_player_profile('u1', {'has_premium': True})
+    with sqlite_app.test_request_context():
+        assert check_premium_access('u1') is True
+    assert get_profile.call_count == 2
+
+def test_character_listing_reads_only_the_profile(sqlite_app, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+    with sqlite_app.test_request_context():
+        ada = save_character_data('u1', {'name': 'Ada', 'race_name': 'Human', FS_CONVERSATION: ['...'] * 50})
+        # A preassigned id is created by the save, as character creation does
+        bo = save_character_data('u1', {'id': 'u1_custom_1', 'user_id': 'u1', 'name': 'Bo', 'class_name': 'Bard'})
+    with sqlite_app.test_request_context():
+        p_data = load_character_data('u1', ada)
+        p_data['name'] = 'Ada Prime'
+        save_character_data('u1', p_data)
+
+    list_characters = mocker.spy(repository, 'list_characters')
+    get_profile = mocker.spy(repository, 'get_profile')
+    with sqlite_app.test_request_context():
+        assert sorted(get_user_characters('u1'), key=lambda c: c['name']) == [
+            {'id': ada, 'name': 'Ada Prime', 'race': 'Human', 'class': 'Unknown Class'},
+            {'id': bo, 'name': 'Bo', 'race': 'Unknown Race', 'class': 'Bard'}]
+    assert list_characters.call_count == 0
+    assert get_profile.call_count == 1
+
+    with sqlite_app.test_request_context():
+        remove_character_summary('u1', bo)
+    with sqlite_app.test_request_context():
+        assert [c['id'] for c in get_user_characters('u1')] == [ada]
+
+def test_character_listing_backfills_index_with_projection(sqlite_app):
+    with sqlite_app.app_context():
+        repository = get_repository()
+    repository.set_character('c1', {'user_id': 'u1', 'name': 'Ada', 'report_summaries': [{'chapter': 1}]})
+    assert repository.list_characters('u1', ['name', 'race_name']) == [{'id': 'c1', 'name': 'Ada'}]
+    with sqlite_app.test_request_context():
+        assert get_user_characters('u1') == [{'id': 'c1', 'name': 'Ada', 'race': 'Unknown Race', 'class': 'Unknown Class'}]
+    assert repository.get_profile('u1', ['character_summaries']) == {'character_summaries': {'c1': {'name': 'Ada'}}}
+
+def test_vocab_report_reads_run_concurrently(sqlite_app, client, mocker):
+    with sqlite_app.app_context():
+        repository = get_repository()
+        char_id = save_character_data('u1', {'name': 'Ada', 'report_summaries': []})
+    repository.update_profile('u1', {'vocab_settings': {'use_default_awl': False}})
+    repository._execute("INSERT INTO custom_vocab_lists (id, user_id, data) VALUES (?, ?, ?)",
+                        ('l1', 'u1', '{"name": "Gems", "is_active": true, "is_ai_generated": true, "words": [{"word": "lustrous", "definition": "shining"}]}'))
+    repository._execute("INSERT INTO custom_vocab_lists (id, user_id, data) VALUES (?, ?, ?)",
+                        ('l2', 'u1', '{"name": "Old", "is_active": false, "is_ai_generated": true, "words": []}'))
+    sqlite_app.extensions['character_cache'].invalidate()
+
+    # Each read waits until all three have started: sequential reads would time out
+    barrier = threading.Barrier(3, timeout=5)
+    def meet(method):
+        def read(*args, **kwargs):
+            barrier.wait()
+            return method(*args, **kwargs)
+        return read
+    for name in ('get_character', 'get_profile', 'list_custom_vocab_lists'):
+        mocker.patch.object(repository, name, side_effect=meet(getattr(repository, name)))
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'u1'
+        sess['character_id'] = char_id
+    response = client.get('/journal/vocab')
+    assert response.status_code == 200
+    assert b'lustrous' in response.data and b'Old' in response.data
+    assert repository.get_profile.call_count == 1
+    assert repository.list_custom_vocab_lists.call_count == 1
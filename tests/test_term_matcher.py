@@ -0,0 +1,45 @@
+import re
+from daydream.term_matcher import TermMatcher
+from daydream.utils import find_terms_in_text, find_terms_in_texts
+
+def legacy_find_terms(text, terms_dict, key_transform=lambda k: k.lower()):
+    """The original per-term regex scan, kept here as the reference behavior."""
+    found = []
+    transformed_map = {key_transform(k): {"original": k, "data": v} for k, v in terms_dict.items() if key_transform(k)}
+    processed_indices = set()
+    for term_key in sorted(transformed_map.keys(), key=len, reverse=True):
+        term_info = transformed_map[term_key]
+        for match in re.finditer(r'\b' + re.escape(term_key) + r'\b', text, re.IGNORECASE):
+            if not any(i in processed_indices for i in range(match.start(), match.end())):
+                found.append((match.start(), match.end(), term_info["original"], term_info["data"]))
+                processed_indices.update(range(match.start(), match.end()))
+    return sorted(found, key=lambda item: item[0])
+
+TERMS = {
+    "the great recycler": 1, "recycler": 2, "Thetopia": 3, "a b": 4, "b c d": 5,
+    "a": 6, "data": 7, "self-harm": 8, "analyse": 9,
+}
+
+def test_matches_legacy_behavior():
+    """Longest-match-wins, word boundaries and case-insensitivity are preserved."""
+    texts = [
+        "The Great Recycler hums while the recycler sleeps in THETOPIA.",
+        "a b c d",
+        "a data-driven analysis of metadata; we analyse DATA.",
+        "recyclers and self-harm and self harm",
+        "",
+        "no terms here",
+    ]
+    matcher = TermMatcher(TERMS)
+    for text in texts:
+        assert matcher.find(text) == legacy_find_terms(text, TERMS)
+
+def test_find_terms_accepts_matcher_or_dict():
+    matcher = TermMatcher(TERMS)
+    text = "Welcome to Thetopia."
+    assert find_terms_in_text(text, matcher) == find_terms_in_text(text, TERMS) == [(11, 19, "Thetopia", 3)]
+    assert find_terms_in_text(text, None) == []
+
+def test_find_many():
+    results = find_terms_in_texts(["a recycler", "nothing"], TERMS)
+    assert results == [[(0, 1, "a", 6), (2, 10, "recycler", 2)], []]
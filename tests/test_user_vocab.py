@@ -0,0 +1,42 @@
+from daydream.utils import get_active_vocab_data
+
+def _mock_profile(app, custom_lists):
+    app.config['BYPASS_EXTERNAL_SERVICES'] = False
+    profile_ref = app.config['DB'].collection.return_value.document.return_value
+    profile_ref.get.return_value.exists = True
+    profile_ref.get.return_value.to_dict.return_value = {'vocab_settings': {'use_default_awl': True}}
+    list_docs = []
+    for i, list_data in enumerate(custom_lists):
+        doc = type('Doc', (), {'id': f'list{i}'})()
+        doc.to_dict = lambda data=list_data: data
+        list_docs.append(doc)
+    profile_ref.collection.return_value.where.return_value.stream.return_value = list_docs
+    return profile_ref
+
+def test_active_vocab_merges_custom_lists_and_is_cached(app):
+    with app.app_context():
+        profile_ref = _mock_profile(app, [
+            {'name': 'Space Words', 'words': [{'word': 'nebula', 'definition': 'A cloud of gas.'}, 'orbit']},
+        ])
+        user_vocab = get_active_vocab_data('user1')
+        assert user_vocab.vocab['analyze']['source'] == 'AWL'
+        assert user_vocab.vocab['nebula'] == {'definition': 'A cloud of gas.', 'source': 'Space Words'}
+        assert 'orbit' in user_vocab.vocab
+        assert [t[2] for t in user_vocab.matcher.find("An orbit near the nebula.")] == ['orbit', 'nebula']
+
+        # Served from the cache: no further Firestore reads, same immutable object
+        assert get_active_vocab_data('user1') is user_vocab
+        assert profile_ref.get.call_count == 1
+
+def test_toggling_a_list_invalidates_the_cache(app, client):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'user1'
+    with app.app_context():
+        profile_ref = _mock_profile(app, [])
+        before = get_active_vocab_data('user1')
+
+    client.post('/profile/toggle_vocab/list1')
+
+    with app.app_context():
+        assert get_active_vocab_data('user1') is not before
+        assert profile_ref.get.call_count == 2
@@ -1,59 +1,99 @@
+import json
 import pytest
-from unittest.mock import patch, mock_open
+from daydream.vocabulary.core import load_vocabulary_from_file
+from daydream.vocabulary.journal import VocabularyJournal
 
-def test_create_vocab_entry(client):
+@pytest.fixture
+def vocab_dir(tmp_path, monkeypatch):
+    """Points the vocabulary module at a temporary data directory."""
+    monkeypatch.setattr('daydream.vocabulary.core.VOCAB_DATA_DIR', str(tmp_path))
+    with open(tmp_path / 'academic_word_list.json', 'w', encoding='utf-8') as f:
+        json.dump({"analyze": {"definition": "To examine in detail...", "sublist": 1}}, f)
+    return tmp_path
+
+def test_create_vocab_entry(client, vocab_dir):
     """Test creating a new vocabulary entry."""
     with client.session_transaction() as sess:
         sess['user_id'] = 'creator1'
 
-    mock_data = {
-        "analyze": {
-            "definition": "To examine in detail...",
-            "sublist": 1
-        }
-    }
-
-    m = mock_open(read_data=str(mock_data))
-    with patch('builtins.open', m):
-        with patch('json.dump') as mock_dump:
-            response = client.post('/vocabulary/create', data={
-                'word': 'approach',
-                'definition': 'To come near...',
-                'example_sentence': 'The cat will approach...',
-                'genai_image_prompt': 'A cat stalking...',
-                'genai_audio_prompt': 'A soft voice...',
-                'sublist': '1'
-            }, follow_redirects=True)
-
-            assert response.status_code == 200
-            mock_dump.assert_called_once()
-            # More detailed assertions can be added here to check the content of the dump
-
-def test_edit_vocab_entry(client):
+    response = client.post('/vocabulary/create', data={
+        'word': 'approach',
+        'definition': 'To come near...',
+        'example_sentence': 'The cat will approach...',
+        'genai_image_prompt': 'A cat stalking...',
+        'genai_audio_prompt': 'A soft voice...',
+        'sublist': '1'
+    }, follow_redirects=True)
+
+    assert response.status_code == 200
+    # The edit is appended to the journal; the base file is untouched
+    with open(vocab_dir / 'academic_word_list.json.journal', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['word'] for r in records] == ['approach']
+    vocab = load_vocabulary_from_file()
+    assert set(vocab) == {'analyze', 'approach'}
+    assert vocab['approach']['sublist'] == 1
+
+def test_edit_vocab_entry(client, vocab_dir):
     """Test editing an existing vocabulary entry."""
     with client.session_transaction() as sess:
         sess['user_id'] = 'creator1'
 
-    mock_data = {
-        "analyze": {
-            "definition": "To examine in detail...",
-            "sublist": 1
-        }
-    }
-
-    m = mock_open(read_data=str(mock_data))
-    with patch('builtins.open', m):
-        with patch('json.dump') as mock_dump:
-            response = client.post('/vocabulary/edit/analyze', data={
-                'original_word': 'analyze',
-                'word': 'analyze',
-                'definition': 'A new definition',
-                'example_sentence': 'A new sentence',
-                'genai_image_prompt': 'A new image prompt',
-                'genai_audio_prompt': 'A new audio prompt',
-                'sublist': '2'
-            }, follow_redirects=True)
-
-            assert response.status_code == 200
-            mock_dump.assert_called_once()
-            # More detailed assertions can be added here
+    response = client.post('/vocabulary/edit/analyze', data={
+        'original_word': 'analyze',
+        'word': 'analyse',
+        'definition': 'A new definition',
+        'example_sentence': 'A new sentence',
+        'genai_image_prompt': 'A new image prompt',
+        'genai_audio_prompt': 'A new audio prompt',
+        'sublist': '2'
+    }, follow_redirects=True)
+
+    assert response.status_code == 200
+    vocab = load_vocabulary_from_file()
+    assert set(vocab) == {'analyse'}
+    assert vocab['analyse']['definition'] == 'A new definition'
+
+def test_journal_compaction(tmp_path):
+    base = tmp_path / 'list.json'
+    base.write_text(json.dumps({"a": {"sublist": 1}}), encoding='utf-8')
+    journal = VocabularyJournal(str(base), compact_threshold=1000)
+    journal.put("b", {"sublist": 2})
+    journal.put("c", {"sublist": 3}, replaces="a")
+    journal.delete("b")
+    assert journal.load() == {"c": {"sublist": 3}}
+
+    journal.compact()
+    assert json.loads(base.read_text(encoding='utf-8')) == {"c": {"sublist": 3}}
+    assert (tmp_path / 'list.json.journal').stat().st_size == 0
+    # A fresh reader (e.g. another worker) sees the same view
+    assert VocabularyJournal(str(base)).load() == {"c": {"sublist": 3}}
+
+def test_append_after_a_torn_record(tmp_path):
+    base = tmp_path / 'list.json'
+    base.write_text(json.dumps({"a": {"sublist": 1}}), encoding='utf-8')
+    journal = VocabularyJournal(str(base), compact_threshold=1000)
+    journal.put("b", {"sublist": 2})
+    # A crash mid-append leaves a partial last line
+    with open(journal.journal_path, 'ab') as f:
+        f.write(b'{"op": "put", "word": "x", "ent')
+
+    journal.put("c", {"sublist": 3})
+    assert VocabularyJournal(str(base)).load() == {"a": {"sublist": 1}, "b": {"sublist": 2}, "c": {"sublist": 3}}
+    assert (tmp_path / 'list.json.journal').read_bytes().count(b'\n') == 2
+
+def test_registry_picks_up_edits(client, vocab_dir):
+    """Edits reach calculate_xp and the snapshot without a restart."""
+    from daydream.vocabulary.core import calculate_xp, get_vocabulary_snapshot
+    before = get_vocabulary_snapshot()
+    assert calculate_xp("We approach it.", set()) == (0, set())
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'creator1'
+    client.post('/vocabulary/create', data={'word': 'approach', 'sublist': '9'})
+
+    after = get_vocabulary_snapshot()
+    assert after is not before and 'approach' in after.words
+    assert calculate_xp("We approach it.", set()) == (10, {'approach'})
+    # Snapshots are immutable and unchanged once handed out
+    assert 'approach' not in before.words
@@ -0,0 +1,67 @@
+import json
+import os
+from daydream.vocabulary.store import build_vocabulary_store, open_vocabulary_store, VocabularyStore
+from daydream.vocabulary.registry import VocabularyRegistry
+from daydream.vocabulary.journal import VocabularyJournal
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return str(path)
+
+def make_sources(tmp_path):
+    return {
+        'awl': write_json(tmp_path / 'awl.json', {
+            "analyze": {"definition": "To examine.", "sublist": 1},
+            "énoncé": {"definition": "Non-ASCII key.", "sublist": 9},
+            "approach": {"definition": "To come near."},
+        }),
+        'definitions': write_json(tmp_path / 'defs.json', {"analyse": "To examine methodically."}),
+        'lore': write_json(tmp_path / 'lore.json', {"thetopia": {"display_term": "Thetopia", "lore_path": ["locations"]}}),
+    }
+
+def test_store_round_trip(tmp_path):
+    sources = make_sources(tmp_path)
+    store = VocabularyStore(build_vocabulary_store(str(tmp_path / 'vocab.ddvs'), sources))
+
+    assert sorted(store.words) == sorted(["analyze", "énoncé", "approach"])
+    assert store.words["énoncé"] == {"definition": "Non-ASCII key.", "sublist": 9}
+    assert "missing" not in store.words and store.words.get("missing") is None
+    assert dict(store.sublists) == {"analyze": 1, "approach": 0, "énoncé": 9}
+    categorized = store.categorized({1: 'common', 9: 'challenging'})
+    assert categorized["analyze"] == 'common' and categorized["approach"] == 'medium'
+    assert store.definitions["analyse"] == "To examine methodically."
+    assert store.lore["thetopia"]["display_term"] == "Thetopia"
+    assert dict(store.word_definitions) == {"analyze": "To examine.", "approach": "To come near.", "énoncé": "Non-ASCII key."}
+    assert dict(store.sublists.items()) == dict(store.sublists)
+    # items()/values() are reusable views, like a dict's
+    items, values = store.sublists.items(), store.sublists.values()
+    assert len(items) == len(values) == 3
+    assert list(items) == list(items) and sorted(values) == sorted(values) == [0, 1, 9]
+    assert items == {"analyze": 1, "approach": 0, "énoncé": 9}.items()
+    assert ("analyze", 1) in items and 9 in values
+    store.close()
+
+def test_registry_builds_snapshot_without_decoding_words(tmp_path, mocker):
+    sources = make_sources(tmp_path)
+    store = VocabularyStore(build_vocabulary_store(str(tmp_path / 'vocab.ddvs'), sources))
+    mocker.patch.object(store.words, '_decode', side_effect=AssertionError("word entry decoded"))
+    registry = VocabularyRegistry(lambda filename: VocabularyJournal(sources['awl']), {1: 'common'},
+                                  definitions=store.definitions, store=store)
+
+    snapshot = registry.snapshot('awl.json')
+    assert snapshot.words is store.words
+    assert dict(snapshot.categorized) == {"analyze": 'common', "approach": 'medium', "énoncé": 'medium'}
+    assert snapshot.definitions["analyze"] == "To examine." and snapshot.definitions["analyse"] == "To examine methodically."
+    assert snapshot.forms["analyzed"] == "analyze"
+    store.close()
+
+def test_stale_store_is_ignored(tmp_path):
+    sources = make_sources(tmp_path)
+    path = build_vocabulary_store(str(tmp_path / 'vocab.ddvs'), sources)
+    assert open_vocabulary_store(path) is not None
+
+    write_json(sources['awl'], {"changed": {"sublist": 2}})
+    os.utime(sources['awl'], ns=(1, 1))
+    assert open_vocabulary_store(path) is None
+    assert open_vocabulary_store(str(tmp_path / 'missing.ddvs')) is None